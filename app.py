@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# app.py
+
+from functools import partial
+
+from textual.app import App, ComposeResult
+from textual.containers import Container, Vertical, Horizontal
+from textual.widgets import Header, Footer, Input, RichLog, Static, RadioSet, RadioButton, Button
+from textual import on
+from textual.worker import Worker, WorkerState
+from textual.binding import Binding
+
+from core.residency import ModelResidencyManager
+from core.jobs import Job, JobScheduler, DONE, FAILED, PRIORITY_HIGH, PRIORITY_LOW
+from core.job_queue_tui import JobQueuePane
+from core.metrics_tui import MetricsPane
+from core.tracing import get_tracer
+from core.settings import SettingsError
+from core.config import get_section
+from core import startup_profile
+
+
+class AI_Toolkit_App(App):
+    CSS_PATH = "style.css"
+    BINDINGS = [
+        Binding("q", "quit", "Quit"),
+        Binding("ctrl+j", "show_jobs", "Jobs"),
+        Binding("ctrl+t", "show_metrics", "Metrics"),
+    ]
+
+    PANE_CLASSES = {}
+
+    def __init__(self, plugin_manager, *args, profile_startup: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.plugin_manager = plugin_manager
+        self.profile_startup = profile_startup
+        self.prewarm_mode = get_section("startup").get("prewarm", "import")
+        self.residency = ModelResidencyManager(plugin_manager)
+        self.scheduler = JobScheduler(self.residency)
+        self.scheduler.add_listener(self._on_job_changed_threadsafe)
+        self.active_plugin_info = None
+        self.active_logic = None
+        self.active_pane_id = "llm_pane"
+        # The active pane's settings widgets, bound on first submit
+        self._settings_form = None
+
+    def compose(self) -> ComposeResult:
+        with Container(id="app_container"):
+            yield Header()
+            with Container(id="main_container"):
+                yield RichLog() # Temporary placeholder for the log.
+            yield Footer()
+
+    def on_mount(self) -> None:
+        self.title = "AI Toolkit"
+        self.sub_title = "v8.10 - CSS Fixes and Transparent Background"
+        self._generate_bindings_and_panes()
+        self.scheduler.start()
+        startup_profile.mark("app mounted")
+        self.call_after_refresh(self._on_first_paint)
+
+        first_plugin_key = next(iter(self.plugin_manager.plugins.keys()), None)
+        if first_plugin_key:
+            self.action_load_pane(first_plugin_key)
+        elif self.profile_startup:
+            self.call_after_refresh(self.exit)
+
+    def _on_first_paint(self) -> None:
+        startup_profile.mark("first paint")
+        if self.prewarm_mode in ("import", "load") and not self.profile_startup:
+            hotkey = self.plugin_manager.most_used_plugin()
+            if hotkey:
+                self.run_worker(partial(self._prewarm_plugin, hotkey), thread=True, group="plugin_import")
+
+    def _prewarm_plugin(self, hotkey: str) -> None:
+        """Imports the most used plugin in the background so its hotkey opens instantly."""
+        self.plugin_manager.get_plugin_tui(hotkey)
+        self.plugin_manager.get_plugin_logic(hotkey)
+        if self.prewarm_mode == "load":
+            self.scheduler.submit(Job(hotkey, kind="load", priority=PRIORITY_LOW, description="Pre-warm model"))
+
+    def _generate_bindings_and_panes(self):
+        # Only the manifests are read here; pane and logic modules are imported
+        # the first time their hotkey is used.
+        self.PANE_CLASSES = {}
+        new_bindings = [
+            Binding("q", "quit", "Quit"),
+            Binding("ctrl+j", "show_jobs", "Jobs"),
+            Binding("ctrl+t", "show_metrics", "Metrics"),
+        ]
+
+        for hotkey, plugin_info in self.plugin_manager.plugins.items():
+            pane_name = plugin_info["name"].lower().replace(' ', '_')
+            description = plugin_info.get("description", pane_name)
+            new_bindings.append(Binding(f"ctrl+{hotkey}", f"load_pane('{hotkey}')", description))
+
+        self.BINDINGS = new_bindings
+
+    def action_load_pane(self, hotkey: str) -> None:
+        if self.active_plugin_info and self.active_plugin_info['hotkey'] == hotkey:
+            return
+
+        if hotkey not in self.plugin_manager.plugins:
+            self.notify(f"Error: Pane for hotkey '{hotkey}' not found.", severity="error")
+            return
+
+        # Clean up the previous pane. Its model stays resident until the
+        # residency budget needs the room for another one.
+        self._clear_main_container()
+        self.active_logic = None
+
+        self.active_plugin_info = self.plugin_manager.plugins[hotkey]
+        # Widget ids can't start with a digit ("3D Model"), so the prefix comes first
+        self.active_pane_id = "pane_" + self.active_plugin_info['name'].lower().replace(' ', '_').replace('-', '_')
+        self.title = f"AI Toolkit - {self.active_plugin_info['name']}"
+        self.plugin_manager.record_usage(hotkey)
+
+        if self.plugin_manager.is_plugin_imported(hotkey):
+            self._mount_plugin_pane(hotkey)
+        else:
+            # Importing a plugin can pull in torch and friends; keep the UI responsive meanwhile
+            self.query_one("#main_container").mount(
+                Static(f"Loading {self.active_plugin_info['name']}...", id="plugin_loading_static")
+            )
+            self.run_worker(partial(self._import_plugin, hotkey), thread=True, group="plugin_import")
+
+    def _import_plugin(self, hotkey: str) -> None:
+        """Worker thread: imports a plugin's pane and logic modules, then mounts the pane."""
+        try:
+            self.plugin_manager.get_plugin_tui(hotkey)
+            self.plugin_manager.get_plugin_logic(hotkey)
+        except Exception as e:
+            self.call_from_thread(self.notify, f"Failed to import plugin '{hotkey}': {e}", severity="error")
+            return
+        self.call_from_thread(self._mount_plugin_pane, hotkey)
+
+    def _mount_plugin_pane(self, hotkey: str) -> None:
+        # The user may have switched to another pane while this one was importing
+        if not self.active_plugin_info or self.active_plugin_info['hotkey'] != hotkey:
+            return
+
+        PaneClass = self.PANE_CLASSES.get(hotkey) or self.plugin_manager.get_plugin_tui(hotkey)
+        if not PaneClass:
+            self.notify(f"Error: Pane for hotkey '{hotkey}' not found.", severity="error")
+            return
+        self.PANE_CLASSES[hotkey] = PaneClass
+
+        self._clear_main_container()
+        self.active_logic = self.plugin_manager.get_plugin_logic(hotkey)
+
+        # Pass the logic instance to the pane during initialization
+        self.query_one("#main_container").mount(PaneClass(logic=self.active_logic, id=self.active_pane_id))
+        startup_profile.mark("first pane ready")
+        if self.profile_startup:
+            self.call_after_refresh(self.exit)
+            return
+
+        # Load the model ahead of the first request, or reuse it if it is still resident.
+        # The scheduler runs this before queued work of lower priority.
+        if self.active_logic:
+            self.scheduler.submit(Job(hotkey, kind="load", priority=PRIORITY_HIGH))
+
+    def action_show_jobs(self) -> None:
+        """Shows the job queue. Jobs keep running while other panes are open."""
+        if self.active_pane_id == "job_queue_pane":
+            return
+        self._clear_main_container()
+        self.active_plugin_info = None
+        self.active_logic = None
+        self.active_pane_id = "job_queue_pane"
+        self.query_one("#main_container").mount(
+            JobQueuePane(self.scheduler, self.plugin_manager.plugins, id=self.active_pane_id)
+        )
+        self.title = "AI Toolkit - Jobs"
+
+    def action_show_metrics(self) -> None:
+        """Shows where time goes per stage: imports, loads, pre-processing, inference, saving."""
+        if self.active_pane_id == "metrics_pane":
+            return
+        self._clear_main_container()
+        self.active_plugin_info = None
+        self.active_logic = None
+        self.active_pane_id = "metrics_pane"
+        self.query_one("#main_container").mount(MetricsPane(self.plugin_manager.plugins, id=self.active_pane_id))
+        self.title = "AI Toolkit - Metrics"
+
+    def _on_job_changed_threadsafe(self, job: Job) -> None:
+        """Scheduler listener; state changes arrive from both the UI and scheduler threads."""
+        try:
+            self.call_from_thread(self._on_job_changed, job)
+        except RuntimeError:
+            self._on_job_changed(job)
+
+    def _on_job_changed(self, job: Job) -> None:
+        name = self.plugin_manager.plugins.get(job.hotkey, {}).get("name", job.hotkey)
+        if job.state == FAILED and job.error != "Cancelled":
+            self.notify(f"{name}: job failed: {job.error}", severity="error")
+        elif job.state == DONE and job.kind == "pipeline":
+            self.notify(f"{job.summary()} finished. Outputs in {job.result}")
+        elif job.state == DONE and job.kind == "load":
+            stats = self.residency.stats()
+            self.notify(
+                f"{name} model ready (hits: {stats['hits']}, misses: {stats['misses']}, "
+                f"evictions: {stats['evictions']}, RAM: {stats['ram_mb']:.0f}/{stats['ram_budget_mb']:.0f} MB)"
+            )
+
+    def collect_settings(self):
+        """
+        Reads the active pane's settings, as declared by its plugin's manifest, in
+        one pass. The widgets are looked up on first use and kept until the pane
+        is replaced. Raises SettingsError if a value is missing or out of range.
+        """
+        if self._settings_form is None:
+            schema = self.plugin_manager.settings_schema(self.active_plugin_info['hotkey'])
+            self._settings_form = schema.bind(self.query_one(f"#{self.active_pane_id}"))
+        return self._settings_form.collect()
+
+    def _clear_main_container(self):
+        self._settings_form = None
+        container = self.query_one("#main_container")
+        for child in list(container.children):
+            child.remove()
+
+    @on(Input.Submitted, "Input#input_box, Input#positive_prompt_input")
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        if not self.active_logic or not hasattr(self.active_logic, 'run_inference'):
+            self.notify("Error: No active plugin logic or run_inference method found.", severity="error")
+            return
+
+        user_prompt = event.value
+        try:
+            current_settings = self.collect_settings()
+        except SettingsError as e:
+            self.notify(str(e), severity="error")
+            return
+
+        # Stream tokens into panes that can show them; otherwise wait for the whole result.
+        active_pane = self.query_one(f"#{self.active_pane_id}")
+        runner = None
+        if hasattr(self.active_logic, 'stream_inference') and hasattr(active_pane, 'begin_reply'):
+            runner = partial(self._stream_reply, active_pane)
+
+        job = self.scheduler.submit(Job(self.active_plugin_info['hotkey'], user_prompt, current_settings, runner=runner))
+        if self.scheduler.snapshot()[0] is not job:
+            self.notify(f"Queued job {job.id}. Press Ctrl+J to see the queue.")
+        event.input.value = ""
+
+    def _stream_reply(self, pane, logic, job: Job) -> str:
+        """Job runner on the scheduler thread, handing tokens to the pane as they are generated."""
+        if not pane.is_attached:
+            # The user switched away while the job was queued
+            return logic.run_inference(job.prompt, job.settings)
+
+        self.call_from_thread(pane.begin_reply, job.prompt)
+        parts = []
+        try:
+            for token in logic.stream_inference(job.prompt, job.settings):
+                parts.append(token)
+                pane.push_token(token)
+        finally:
+            if pane.is_attached:
+                self.call_from_thread(pane.end_reply, logic.last_generation_stats)
+        return "".join(parts)
+
+    def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
+        # Printing is swallowed by the TUI; failures are shown, and both end up in the metrics pane
+        if event.state == WorkerState.SUCCESS:
+            get_tracer().event("worker finished", "worker", worker=event.worker.name)
+        elif event.state == WorkerState.ERROR:
+            get_tracer().event("worker failed", "worker", worker=event.worker.name, error=str(event.worker.error))
+            self.notify(f"{event.worker.name or 'Background task'} failed: {event.worker.error}", severity="error")
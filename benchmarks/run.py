@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# benchmarks/run.py
+"""
+Benchmarks every plugin's load_model / run_inference / unload_model.
+
+    python -m benchmarks.run                       # all plugins, offline stand-in models
+    python -m benchmarks.run --plugin LLM --iterations 50
+    python -m benchmarks.run --compare benchmarks/results/baseline.json --threshold 0.15
+    python -m benchmarks.run --real                # the real model libraries and weights
+
+Each plugin runs in its own process, so its import time, cold load and peak RSS
+are measured from a clean interpreter. Results are written as JSON; --compare
+checks them against an earlier file and exits with status 1 on a regression.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Metric name -> True when a higher value is better
+METRICS = {
+    "import_s": False,
+    "cold_load_s": False,
+    "warm_load_s": False,
+    "unload_s": False,
+    "first_inference_s": False,
+    "latency_p50_s": False,
+    "latency_p90_s": False,
+    "latency_p99_s": False,
+    "throughput_requests_per_s": True,
+    "throughput_items_per_s": True,
+    "peak_rss_mb": False,
+}
+# Timing changes smaller than this are treated as noise, whatever the ratio
+NOISE_FLOOR_S = 0.005
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _peak_rss_mb() -> float:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _count_items(result) -> int:
+    """How many outputs one call produced: images in a batch, captions in a folder, ..."""
+    if isinstance(result, (list, tuple, dict)):
+        return max(1, len(result))
+    return 1
+
+
+def benchmark_plugin(hotkey: str, iterations: int, warm_loads: int, stand_ins: bool, work_dir: str) -> dict:
+    """Runs inside the per-plugin child process and returns the plugin's metrics."""
+    if stand_ins:
+        from benchmarks import stand_ins as stand_in_modules
+        stand_in_modules.install()
+
+    from model_manager import PluginManager
+    from benchmarks.workloads import WORKLOADS
+
+    plugin_manager = PluginManager(os.path.join(PROJECT_ROOT, "plugins"))
+    # Stand-ins only exist in this interpreter, so the logic has to run here too
+    plugin_manager.isolation = "thread"
+    plugin_info = plugin_manager.plugins[hotkey]
+    workload = WORKLOADS.get(plugin_info.get("model_type"))
+    if workload is None:
+        return {"skipped": f"no benchmark workload for model type '{plugin_info.get('model_type')}'"}
+    workload = workload()
+
+    started = time.perf_counter()
+    try:
+        logic = plugin_manager.get_plugin_logic(hotkey)
+    except ImportError as e:
+        return {"skipped": f"cannot import plugin: {e}"}
+    results = {"import_s": time.perf_counter() - started}
+    workload.prepare(logic, work_dir)
+
+    started = time.perf_counter()
+    if logic.load_model() is False:
+        return {"error": "load_model() failed", **results}
+    results["cold_load_s"] = time.perf_counter() - started
+
+    prompt, settings = workload.request(0, work_dir)
+    started = time.perf_counter()
+    logic.run_inference(prompt, settings)
+    results["first_inference_s"] = time.perf_counter() - started
+
+    latencies = []
+    items = 0
+    for index in range(1, iterations + 1):
+        prompt, settings = workload.request(index, work_dir)
+        if hasattr(logic, "new_session"):
+            logic.new_session()
+        started = time.perf_counter()
+        items += _count_items(logic.run_inference(prompt, settings))
+        latencies.append(time.perf_counter() - started)
+
+    total = sum(latencies)
+    results.update({
+        "iterations": iterations,
+        "latency_mean_s": statistics.fmean(latencies),
+        "latency_p50_s": _percentile(latencies, 0.50),
+        "latency_p90_s": _percentile(latencies, 0.90),
+        "latency_p99_s": _percentile(latencies, 0.99),
+        "throughput_requests_per_s": iterations / total if total > 0 else 0.0,
+        "throughput_items_per_s": items / total if total > 0 else 0.0,
+    })
+
+    unload_times, load_times = [], []
+    for _ in range(max(1, warm_loads)):
+        started = time.perf_counter()
+        logic.unload_model()
+        unload_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        logic.load_model()
+        load_times.append(time.perf_counter() - started)
+    logic.unload_model()
+    results["unload_s"] = statistics.median(unload_times)
+    results["warm_load_s"] = statistics.median(load_times)
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def _run_child(hotkey: str, args) -> dict:
+    """Benchmarks one plugin in a fresh interpreter, inside its own scratch directory."""
+    with tempfile.TemporaryDirectory(prefix=f"bench-{hotkey}-") as work_dir:
+        result_path = os.path.join(work_dir, "result.json")
+        command = [sys.executable, "-m", "benchmarks.run", "--child", hotkey, "--result-file", result_path,
+                   "--iterations", str(args.iterations), "--warm-loads", str(args.warm_loads)]
+        if args.real:
+            command.append("--real")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_ROOT, os.environ.get("PYTHONPATH")])))
+        # The child runs in the scratch directory, so plugins that write to the CWD stay contained
+        completed = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True,
+                                   timeout=args.timeout)
+        if os.path.exists(result_path):
+            with open(result_path, "r") as f:
+                return json.load(f)
+        output = (completed.stderr or completed.stdout).strip().splitlines()
+        return {"error": output[-1] if output else f"benchmark exited with status {completed.returncode}"}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Returns (plugin, metric, baseline, current, change) for every metric that regressed past threshold."""
+    regressions = []
+    for plugin, metrics in current["results"].items():
+        previous = baseline.get("results", {}).get(plugin)
+        if not previous:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), metrics.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if metric.endswith("_s") and abs(new - old) < NOISE_FLOOR_S:
+                continue
+            if worse > threshold:
+                regressions.append((plugin, metric, old, new, change))
+    return regressions
+
+
+def _print_table(report: dict) -> None:
+    columns = ["import_s", "cold_load_s", "warm_load_s", "latency_p50_s", "latency_p99_s",
+               "throughput_items_per_s", "peak_rss_mb"]
+    print(f"{'plugin':<20}" + "".join(f"{column:>24}" for column in columns))
+    for plugin, metrics in report["results"].items():
+        if "skipped" in metrics or "error" in metrics:
+            print(f"{plugin:<20}  {metrics.get('skipped') or 'ERROR: ' + metrics['error']}")
+            continue
+        print(f"{plugin:<20}" + "".join(f"{metrics.get(column, 0):>24.4f}" for column in columns))
+
+
+def _build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark plugin load, inference and unload times.")
+    parser.add_argument("--plugin", action="append", help="Plugin hotkey or name; repeat for several. Default: all.")
+    parser.add_argument("--iterations", type=int, default=10, help="Timed run_inference calls per plugin.")
+    parser.add_argument("--warm-loads", type=int, default=3, help="Unload/reload cycles for the warm load time.")
+    parser.add_argument("--real", action="store_true", help="Use the real model libraries instead of stand-ins.")
+    parser.add_argument("--out", help="Results file. Default: benchmarks/results/<timestamp>.json")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (default 0.10 = 10%%).")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds allowed per plugin.")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    return parser
+
+
+def main() -> int:
+    args = _build_arg_parser().parse_args()
+
+    if args.child:
+        try:
+            result = benchmark_plugin(args.child, args.iterations, args.warm_loads, not args.real, os.getcwd())
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        with open(args.result_file, "w") as f:
+            json.dump(result, f)
+        return 0
+
+    from model_manager import PluginManager
+
+    plugin_manager = PluginManager(os.path.join(PROJECT_ROOT, "plugins"))
+    hotkeys = list(plugin_manager.plugins)
+    if args.plugin:
+        hotkeys = []
+        for wanted in args.plugin:
+            hotkey = plugin_manager.resolve(wanted)
+            if hotkey is None:
+                print(f"Error: No plugin matches '{wanted}'.", file=sys.stderr)
+                return 2
+            hotkeys.append(hotkey)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stand_ins": not args.real,
+            "iterations": args.iterations,
+        },
+        "results": {},
+    }
+    for hotkey in hotkeys:
+        name = plugin_manager.plugins[hotkey]["name"]
+        print(f"Benchmarking {name}...", flush=True)
+        try:
+            report["results"][name] = _run_child(hotkey, args)
+        except subprocess.TimeoutExpired:
+            report["results"][name] = {"error": f"timed out after {args.timeout:.0f}s"}
+
+    out_path = args.out or os.path.join(PROJECT_ROOT, "benchmarks", "results", f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_table(report)
+    print(f"Results written to {out_path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for plugin, metric, old, new, change in regressions:
+            print(f"REGRESSION {plugin} {metric}: {old:.4f} -> {new:.4f} ({change:+.1%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
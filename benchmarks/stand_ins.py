@@ -0,0 +1,280 @@
+# benchmarks/stand_ins.py
+"""
+Tiny offline stand-ins for the model libraries the plugins use.
+
+Each stand-in mimics just the API surface our logic classes call and does a
+small, deterministic amount of real CPU work (a few convolutions or matmuls),
+so a benchmark exercises everything around the model - batching, tiling,
+caching, streaming, encoding - without downloads or a GPU. Numbers measured
+against stand-ins are for comparing our own code between runs, not for
+comparing models.
+
+I/O libraries (Pillow, OpenCV, imageio, soundfile, scipy) are not replaced:
+their cost is part of what the benchmarks measure.
+
+torch is a prerequisite for every stand-in except llama_cpp: the plugins'
+logic modules import it and run tensors through the stand-in models, so it
+can't be replaced the way the model libraries are. A CPU-only torch build is
+enough. Without torch (or numpy or Pillow) only the LLM plugin can be
+benchmarked; the others fail to import and are skipped.
+"""
+
+import sys
+import types
+
+
+def _module(name: str, **attributes) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    module.__benchmark_stand_in__ = True
+    return module
+
+
+# --- llama_cpp ---------------------------------------------------------------
+
+class _Llama:
+    """Stands in for llama_cpp.Llama: word-level tokens and a fixed-length streamed reply."""
+
+    REPLY_TOKENS = 16
+
+    def __init__(self, model_path: str, n_ctx: int = 512, n_threads: int = None, **kwargs):
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self._evaluated = []
+
+    def reset(self) -> None:
+        self._evaluated = []
+
+    def tokenize(self, text: bytes) -> list:
+        return [hash(word) & 0xFFFF for word in text.split()]
+
+    def create_completion(self, prompt: str, max_tokens: int = 16, stream: bool = False, **kwargs):
+        tokens = self.tokenize(prompt.encode("utf-8"))
+        # Like llama.cpp, only the tokens past the longest cached prefix are evaluated
+        common = 0
+        for cached, token in zip(self._evaluated, tokens):
+            if cached != token:
+                break
+            common += 1
+        checksum = 0
+        for token in tokens[common:]:
+            for _ in range(200):
+                checksum = (checksum * 31 + token) & 0xFFFFFFFF
+        self._evaluated = tokens
+
+        count = min(max_tokens, self.REPLY_TOKENS)
+        chunks = ({"choices": [{"text": f" word{(checksum + index) % 97}"}]} for index in range(count))
+        if stream:
+            return chunks
+        return {"choices": [{"text": "".join(chunk["choices"][0]["text"] for chunk in chunks)}]}
+
+    def save_state(self) -> bytes:
+        return repr(self._evaluated).encode("utf-8")
+
+    def load_state(self, state: bytes) -> None:
+        import ast
+        self._evaluated = ast.literal_eval(state.decode("utf-8"))
+
+
+def _llama_cpp_modules() -> dict:
+    return {"llama_cpp": _module("llama_cpp", Llama=_Llama)}
+
+
+# --- torch-based stand-ins ---------------------------------------------------
+
+def _torch_modules() -> dict:
+    """Stand-ins that need torch, numpy and Pillow; empty if any of them is missing (see the module docstring)."""
+    try:
+        import numpy as np
+        import torch
+        from PIL import Image
+    except ImportError:
+        return {}
+
+    class _Batch(dict):
+        """Mimics transformers' BatchFeature: a dict of tensors with a .to()."""
+
+        def __getattr__(self, name):
+            try:
+                return self[name]
+            except KeyError:
+                raise AttributeError(name)
+
+        def to(self, device=None, dtype=None):
+            for key, value in self.items():
+                if torch.is_tensor(value):
+                    self[key] = value.to(device, dtype=dtype) if value.is_floating_point() and dtype else value.to(device)
+            return self
+
+    class _Encoding(_Batch):
+        """Mimics transformers' BatchEncoding, whose .to() takes only a device."""
+
+        def to(self, device):
+            return super().to(device)
+
+    class _Denoiser(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.conv = torch.nn.Conv2d(4, 4, 3, padding=1)
+
+        def forward(self, latents):
+            return latents - 0.1 * self.conv(latents)
+
+    class _Pipeline:
+        """Stands in for diffusers' StableDiffusionPipeline / DiffusionPipeline."""
+
+        def __init__(self, dtype):
+            self.dtype = dtype or torch.float32
+            self.unet = _Denoiser().to(self.dtype)
+            self.device = "cpu"
+
+        @classmethod
+        def from_pretrained(cls, model_id, torch_dtype=None, **kwargs):
+            return cls(torch_dtype)
+
+        def to(self, device):
+            self.device = device
+            self.unet.to(device)
+            return self
+
+        def __call__(self, prompt, num_inference_steps=2, width=64, height=64, generator=None,
+                     num_frames=None, negative_prompt=None, guidance_scale=7.5, **kwargs):
+            prompts = prompt if isinstance(prompt, list) else [prompt]
+            count = len(prompts) * (num_frames or 1)
+            generator = generator[0] if isinstance(generator, list) else generator
+            latents = torch.randn((count, 4, max(1, height // 8), max(1, width // 8)), generator=generator)
+            latents = latents.to(self.device, dtype=self.dtype)
+            with torch.no_grad():
+                for _ in range(num_inference_steps):
+                    latents = self.unet(latents)
+            # "Decode" by upsampling the first three latent channels to pixel size
+            pixels = torch.nn.functional.interpolate(latents[:, :3].float(), size=(height, width))
+            pixels = ((pixels.tanh() + 1) / 2).permute(0, 2, 3, 1).cpu().numpy()
+            if num_frames:
+                return types.SimpleNamespace(frames=pixels.reshape(len(prompts), num_frames, height, width, 3))
+            images = [Image.fromarray((frame * 255).astype(np.uint8)) for frame in pixels]
+            return types.SimpleNamespace(images=images)
+
+    class _ImageProcessor:
+        """Stands in for ViTImageProcessor: resizes to 32x32 and stacks into one tensor."""
+
+        @classmethod
+        def from_pretrained(cls, path, **kwargs):
+            return cls()
+
+        def __call__(self, images, return_tensors="pt", **kwargs):
+            arrays = [np.asarray(image.convert("RGB").resize((32, 32)), dtype=np.float32) / 255 for image in images]
+            return _Batch(pixel_values=torch.from_numpy(np.stack(arrays)).permute(0, 3, 1, 2))
+
+        def batch_decode(self, outputs, skip_special_tokens=True):
+            return [" ".join(f"token{int(token)}" for token in row) for row in outputs]
+
+    class _Classifier(torch.nn.Module):
+        """Stands in for ViTForImageClassification: one Linear over pooled pixels."""
+
+        def __init__(self):
+            super().__init__()
+            self.head = torch.nn.Linear(3 * 32 * 32, 10)
+            self.config = types.SimpleNamespace(id2label={index: f"label{index}" for index in range(10)})
+
+        @classmethod
+        def from_pretrained(cls, path, **kwargs):
+            return cls()
+
+        @classmethod
+        def can_generate(cls):
+            return False
+
+        def forward(self, pixel_values):
+            return types.SimpleNamespace(logits=self.head(pixel_values.flatten(1)))
+
+    class _AudioProcessor:
+        """Stands in for MusicGen's AutoProcessor."""
+
+        @classmethod
+        def from_pretrained(cls, path, **kwargs):
+            return cls()
+
+        def __call__(self, text, audio=None, sampling_rate=None, padding=True, return_tensors="pt"):
+            input_ids = torch.tensor([[len(word) for word in text[0].split()] or [0]])
+            if audio is None:
+                # Text alone goes through the tokenizer only, like the real processor
+                return _Encoding(input_ids=input_ids)
+            return _Batch(input_ids=input_ids,
+                          input_values=torch.from_numpy(np.asarray(audio, dtype=np.float32))[None, None])
+
+    class _MusicGen(torch.nn.Module):
+        """Stands in for MusicgenForConditionalGeneration: a Linear "decoder" run once per audio frame."""
+
+        def __init__(self):
+            super().__init__()
+            self.decoder = torch.nn.Linear(64, 64)
+            self.config = types.SimpleNamespace(audio_encoder=types.SimpleNamespace(sampling_rate=32000, frame_rate=50))
+
+        @classmethod
+        def from_pretrained(cls, path, **kwargs):
+            return cls()
+
+        @property
+        def dtype(self):
+            return next(self.parameters()).dtype
+
+        def generate(self, input_ids=None, input_values=None, max_new_tokens=50, **kwargs):
+            state = torch.zeros(1, 64, dtype=torch.float32)
+            frames = []
+            with torch.no_grad():
+                for _ in range(max_new_tokens):
+                    state = torch.tanh(self.decoder(state.to(self.dtype)).float() + 0.1)
+                    frames.append(state[0, :1].repeat(640))
+            audio = torch.cat(frames)
+            if input_values is not None:
+                audio = torch.cat([input_values.flatten().float(), audio])
+            return audio[None, None]
+
+    class _RRDBNet(torch.nn.Module):
+        """Stands in for basicsr's RRDBNet: one convolution, then nearest-neighbour upscaling."""
+
+        def __init__(self, num_in_ch=3, num_out_ch=3, num_feat=64, num_block=23, num_grow_ch=32, scale=4):
+            super().__init__()
+            self.scale = scale
+            self.conv = torch.nn.Conv2d(num_in_ch, num_out_ch, 3, padding=1)
+
+        def forward(self, x):
+            return torch.nn.functional.interpolate(x + 0.01 * self.conv(x), scale_factor=self.scale)
+
+    class _RealESRGANer:
+        def __init__(self, scale, model_path, model, tile=0, tile_pad=10, pre_pad=0, half=False, device=None):
+            self.scale = scale
+            self.device = torch.device(device or "cpu")
+            self.model = model.to(self.device).eval()
+            if half:
+                self.model = self.model.half()
+
+    diffusers = _module("diffusers", StableDiffusionPipeline=_Pipeline, DiffusionPipeline=_Pipeline)
+    transformers = _module(
+        "transformers",
+        ViTImageProcessor=_ImageProcessor,
+        ViTForImageClassification=_Classifier,
+        AutoProcessor=_AudioProcessor,
+        MusicgenForConditionalGeneration=_MusicGen,
+    )
+    rrdbnet_arch = _module("basicsr.archs.rrdbnet_arch", RRDBNet=_RRDBNet)
+    archs = _module("basicsr.archs", rrdbnet_arch=rrdbnet_arch)
+    basicsr = _module("basicsr", archs=archs)
+    realesrgan = _module("realesrgan", RealESRGANer=_RealESRGANer)
+    return {
+        "diffusers": diffusers,
+        "transformers": transformers,
+        "basicsr": basicsr,
+        "basicsr.archs": archs,
+        "basicsr.archs.rrdbnet_arch": rrdbnet_arch,
+        "realesrgan": realesrgan,
+    }
+
+
+def install() -> list:
+    """Registers every stand-in that can be built here in sys.modules. Returns their names."""
+    modules = _llama_cpp_modules()
+    modules.update(_torch_modules())
+    sys.modules.update(modules)
+    return sorted(modules)
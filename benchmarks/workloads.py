@@ -0,0 +1,101 @@
+# benchmarks/workloads.py
+"""
+What each plugin is asked to do during a benchmark, keyed by manifest model_type.
+
+prepare() points a fresh logic instance at scratch files, so nothing a benchmark
+does reaches the user's models, caches or output folders. request() returns the
+(prompt, settings) for one timed run_inference call; requests vary by index so
+caches (captions, LLM prefixes) don't turn every iteration into a hit.
+"""
+
+import os
+
+
+def _write_image(path: str, index: int, size: int = 48) -> str:
+    from PIL import Image
+
+    Image.new("RGB", (size, size), ((index * 37) % 256, (index * 91) % 256, (index * 13) % 256)).save(path)
+    return path
+
+
+class Workload:
+    def prepare(self, logic, work_dir: str) -> None:
+        if hasattr(logic, "output_dir"):
+            logic.output_dir = os.path.join(work_dir, "output")
+
+    def request(self, index: int, work_dir: str):
+        raise NotImplementedError
+
+
+class LLMWorkload(Workload):
+    def prepare(self, logic, work_dir: str) -> None:
+        super().prepare(logic, work_dir)
+        # load_model checks that the weights exist; the stand-in never reads them
+        logic.model_path = os.path.join(work_dir, "stand-in.gguf")
+        open(logic.model_path, "wb").close()
+        logic.persist_session = False
+        logic.state_cache.disk_dir = os.path.join(work_dir, "states")
+        logic.session_path = os.path.join(work_dir, "session.json")
+
+    def request(self, index: int, work_dir: str):
+        return f"Benchmark question number {index}: describe a lighthouse.", {"max_output_tokens": 16}
+
+
+class DiffusorWorkload(Workload):
+    def request(self, index: int, work_dir: str):
+        return f"a lighthouse at dusk, variation {index}", {
+            "num_inference_steps": 4, "width": 64, "height": 64, "num_images": 2, "seed": index,
+        }
+
+
+class InterrogatorWorkload(Workload):
+    def prepare(self, logic, work_dir: str) -> None:
+        from caption_cache import CaptionCache
+
+        super().prepare(logic, work_dir)
+        logic.cache = CaptionCache(os.path.join(work_dir, "captions.sqlite"))
+
+    def request(self, index: int, work_dir: str):
+        folder = os.path.join(work_dir, f"images_{index}")
+        os.makedirs(folder, exist_ok=True)
+        for offset in range(8):
+            _write_image(os.path.join(folder, f"{offset}.png"), index * 8 + offset)
+        return folder, {"top_k": 3}
+
+
+class ImageUtilitiesWorkload(Workload):
+    def prepare(self, logic, work_dir: str) -> None:
+        super().prepare(logic, work_dir)
+        # Small tiles so even the tiny test image goes through the tiling and blending path
+        logic.memory_budget_mb = 8
+        logic.max_tile_size = 64
+
+    def request(self, index: int, work_dir: str):
+        path = _write_image(os.path.join(work_dir, f"upscale_{index}.png"), index, size=96)
+        return path, {"scale_factor": 4, "upscale_type": "upscale", "output_dir": os.path.join(work_dir, "output")}
+
+
+class SoundWorkload(Workload):
+    def request(self, index: int, work_dir: str):
+        return f"rain on a tin roof {index}", {"duration": 3, "sampling_rate": 32000}
+
+
+class VideoWorkload(Workload):
+    def request(self, index: int, work_dir: str):
+        return f"waves rolling in {index}", {"num_frames": 24, "num_inference_steps": 2, "seed": index}
+
+
+class ThreeDWorkload(Workload):
+    def request(self, index: int, work_dir: str):
+        return f"a small wooden chair {index}", {"num_inference_steps": 2}
+
+
+WORKLOADS = {
+    "LLM": LLMWorkload,
+    "Diffusor": DiffusorWorkload,
+    "Image_Interrogator": InterrogatorWorkload,
+    "Image_Utilities": ImageUtilitiesWorkload,
+    "Sound_AI": SoundWorkload,
+    "Video_Diffusor": VideoWorkload,
+    "3D_Model": ThreeDWorkload,
+}
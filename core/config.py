@@ -0,0 +1,31 @@
+# core/config.py
+
+import os
+import sys
+import tomllib
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_PATH = os.path.join(PROJECT_ROOT, "config.toml")
+
+_config = None
+
+
+def load_config(path: str = CONFIG_PATH) -> dict:
+    """Reads config.toml once and returns the parsed tables."""
+    global _config
+    if _config is not None:
+        return _config
+
+    _config = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                _config = tomllib.load(f)
+        except (IOError, tomllib.TOMLDecodeError) as e:
+            print(f"Error loading config from {path}: {e}", file=sys.stderr)
+    return _config
+
+
+def get_section(name: str) -> dict:
+    """Returns a single table from config.toml, or an empty dict if it is missing."""
+    return load_config().get(name, {})
@@ -0,0 +1,130 @@
+# core/device.py
+
+import os
+import threading
+
+from core.config import get_section
+
+
+def configured_threads() -> int:
+    """CPU threads for inference from [device] threads; 0 there means one per core."""
+    threads = int(get_section("device").get("threads", 0))
+    return threads if threads > 0 else (os.cpu_count() or 1)
+
+
+def _cpu_supports_bf16(torch) -> bool:
+    """True if oneDNN has native bfloat16 kernels on this CPU (AVX512-BF16 / AMX)."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+class DevicePolicy:
+    """
+    Decides where and in which precision plugins run their models.
+
+    The device is CUDA, then Apple MPS, then the CPU, unless [device] device names
+    one. Half precision is used on GPUs; on the CPU, where float16 kernels are slow
+    or missing, bfloat16 is used if the CPU has native support and float32
+    otherwise. Thread counts and the optional int8 dynamic quantization for CPU
+    come from [device] too.
+    """
+
+    def __init__(self):
+        import torch
+
+        config = get_section("device")
+        self.device = self._pick_device(torch, config.get("device", "auto"))
+        self.dtype = self._pick_dtype(torch, config)
+        self.quantize_cpu = bool(config.get("quantize_int8", False)) and self.device == "cpu"
+
+        torch.set_num_threads(configured_threads())
+        interop_threads = int(config.get("interop_threads", 0))
+        if interop_threads > 0:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError:
+                # Only allowed before the first parallel region has run
+                pass
+
+    @staticmethod
+    def _pick_device(torch, wanted: str) -> str:
+        cuda = torch.cuda.is_available()
+        mps = getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available()
+        if wanted == "cuda" and cuda or wanted == "mps" and mps or wanted == "cpu":
+            return wanted
+        if wanted not in ("auto", "cuda", "mps"):
+            print(f"Unknown device '{wanted}' in [device]; detecting one instead.")
+        if cuda:
+            return "cuda"
+        if mps:
+            return "mps"
+        return "cpu"
+
+    def _pick_dtype(self, torch, config: dict):
+        if self.device == "cpu":
+            wanted = config.get("cpu_dtype", "auto")
+            if wanted == "bfloat16" or wanted == "auto" and _cpu_supports_bf16(torch):
+                return torch.bfloat16
+            return torch.float32
+        wanted = config.get("gpu_dtype", "float16")
+        return torch.bfloat16 if wanted == "bfloat16" else torch.float16
+
+    @property
+    def is_gpu(self) -> bool:
+        return self.device != "cpu"
+
+    @property
+    def half(self) -> bool:
+        """True when models should run in float16 (e.g. Real-ESRGAN's `half` flag)."""
+        import torch
+        return self.dtype == torch.float16
+
+    def quantize(self, model):
+        """
+        Applies int8 dynamic quantization to a model's Linear layers when running on the
+        CPU with [device] quantize_int8 on. Returns the model unchanged otherwise.
+        """
+        if not self.quantize_cpu:
+            return model
+        import torch
+
+        print(f"Quantizing {type(model).__name__} to int8 for CPU inference...")
+        return torch.ao.quantization.quantize_dynamic(model.float(), {torch.nn.Linear}, dtype=torch.qint8)
+
+    def free_memory_mb(self) -> float:
+        """Free memory on the device, or 0 if it cannot be determined."""
+        if self.device == "cuda":
+            import torch
+            free_bytes, _ = torch.cuda.mem_get_info()
+            return free_bytes / (1024 * 1024)
+        try:
+            with open("/proc/meminfo", "r") as f:
+                for line in f:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) / 1024
+        except (IOError, ValueError):
+            pass
+        return 0.0
+
+    def empty_cache(self) -> None:
+        """Returns cached allocator memory to the device after a model is unloaded."""
+        import torch
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+        elif self.device == "mps":
+            torch.mps.empty_cache()
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_device_policy() -> DevicePolicy:
+    """The policy shared by every plugin, created (and torch's threads set) on first use."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = DevicePolicy()
+        return _policy
@@ -0,0 +1,337 @@
+# core/file_scanner.py
+
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+from functools import partial
+
+from core.config import PROJECT_ROOT, get_section
+
+DEFAULT_IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff"]
+
+
+class DirectoryScanner:
+    """
+    Lists image files under a directory with os.scandir, recursively up to max_depth.
+
+    Each directory's listing (its matching files and its subdirectories) is kept in
+    an on-disk index keyed by the directory's mtime. Adding or removing an entry
+    changes only that directory's mtime, so rescanning a large, mostly unchanged
+    tree costs one stat per directory instead of one per file.
+    """
+
+    def __init__(self, extensions=None, max_depth: int = None, chunk_size: int = None,
+                 index_path: str = None, max_index_dirs: int = None):
+        config = get_section("scanner")
+        self.extensions = tuple(e.lower() for e in (extensions or config.get("extensions", DEFAULT_IMAGE_EXTENSIONS)))
+        self.max_depth = int(max_depth if max_depth is not None else config.get("max_depth", 3))
+        self.chunk_size = max(1, int(chunk_size or config.get("chunk_size", 500)))
+        self.max_index_dirs = int(max_index_dirs or config.get("max_index_dirs", 5000))
+        self.index_path = index_path or os.path.join(PROJECT_ROOT, "cache", "directory_index.json")
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+        self._dirty = False
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Rebuilding directory index, could not read {self.index_path}: {e}", file=sys.stderr)
+            return {}
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            # Keep the directories scanned most recently
+            if len(self._index) > self.max_index_dirs:
+                keep = sorted(self._index.items(), key=lambda item: item[1].get("used", 0))[-self.max_index_dirs:]
+                self._index = dict(keep)
+            data = json.dumps(self._index)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+        except IOError as e:
+            print(f"Error saving directory index to {self.index_path}: {e}", file=sys.stderr)
+
+    def _list_directory(self, path: str, used: int):
+        """Returns (files, subdirectories) of one directory, from the index when its mtime is unchanged."""
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._index.get(path)
+            if entry is not None and entry["mtime_ns"] == mtime_ns and entry.get("extensions") == list(self.extensions):
+                entry["used"] = used
+                return entry["files"], entry["dirs"]
+
+        files, dirs = [], []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            dirs.append(entry.name)
+                    elif entry.name.lower().endswith(self.extensions) and entry.is_file():
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        files.sort()
+        dirs.sort()
+        with self._lock:
+            self._index[path] = {"mtime_ns": mtime_ns, "extensions": list(self.extensions),
+                                 "files": files, "dirs": dirs, "used": used}
+            self._dirty = True
+        return files, dirs
+
+    def scan(self, root: str, cancelled=None):
+        """
+        Yields lists of at most chunk_size image paths, relative to root, breadth first.
+        `cancelled` is an optional callable; the scan stops as soon as it returns True.
+        """
+        root = os.path.abspath(root)
+        used = int(time.time())
+        chunk = []
+        pending = deque([("", 0)])
+        try:
+            while pending:
+                relative_dir, depth = pending.popleft()
+                if cancelled is not None and cancelled():
+                    return
+                try:
+                    files, dirs = self._list_directory(os.path.join(root, relative_dir), used)
+                except OSError:
+                    continue
+                for name in files:
+                    chunk.append(os.path.join(relative_dir, name) if relative_dir else name)
+                    if len(chunk) >= self.chunk_size:
+                        yield chunk
+                        chunk = []
+                if depth < self.max_depth:
+                    pending.extend((os.path.join(relative_dir, name) if relative_dir else name, depth + 1) for name in dirs)
+            if chunk:
+                yield chunk
+        finally:
+            self.save()
+
+
+class ThumbnailCache:
+    """
+    Small thumbnails generated on demand and kept in an on-disk LRU under cache/thumbnails.
+
+    A thumbnail is addressed by the source path, mtime and size, so an edited image
+    gets a new one. Reads bump the file's mtime, and the least recently used files
+    are deleted once the cache grows past max_mb.
+    """
+
+    def __init__(self, cache_dir: str = None, size: int = None, max_mb: float = None):
+        config = get_section("scanner")
+        self.cache_dir = cache_dir or os.path.join(PROJECT_ROOT, "cache", "thumbnails")
+        self.size = int(size or config.get("thumbnail_size", 96))
+        self.max_bytes = float(max_mb or config.get("thumbnail_cache_mb", 256)) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _key(self, path: str) -> str:
+        stat = os.stat(path)
+        raw = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def get(self, path: str):
+        """Returns the thumbnail (a PIL image) for an image file, making it if needed."""
+        from PIL import Image
+
+        key = self._key(path)
+        thumb_path = os.path.join(self.cache_dir, key[:2], key + ".png")
+        if os.path.exists(thumb_path):
+            os.utime(thumb_path)
+            with Image.open(thumb_path) as thumbnail:
+                return thumbnail.convert("RGB")
+
+        with Image.open(path) as image:
+            # draft() lets JPEG decode at a fraction of full size
+            image.draft("RGB", (self.size, self.size))
+            thumbnail = image.convert("RGB")
+            thumbnail.thumbnail((self.size, self.size))
+
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        tmp_path = thumb_path + ".tmp"
+        thumbnail.save(tmp_path, format="PNG")
+        os.replace(tmp_path, thumb_path)
+        self._added(os.path.getsize(thumb_path))
+        return thumbnail
+
+    def _added(self, nbytes: int) -> None:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += nbytes
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Trim to 90% so eviction doesn't run on every new thumbnail
+            for mtime, size, path in sorted(self._entries()):
+                if self._total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                    self._total_bytes -= size
+                except OSError:
+                    pass
+
+    def _entries(self):
+        for directory in os.scandir(self.cache_dir):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(".png"):
+                    stat = entry.stat()
+                    yield stat.st_mtime, stat.st_size, entry.path
+
+
+def render_thumbnail(image, width: int):
+    """
+    Renders an image as a rich Text of half-block characters, two pixels per cell,
+    so it can be shown in any terminal widget.
+    """
+    from rich.text import Text
+
+    height = max(2, round(image.height * width / image.width) // 2 * 2)
+    pixels = image.convert("RGB").resize((width, height)).load()
+    text = Text()
+    for y in range(0, height, 2):
+        for x in range(width):
+            top, bottom = pixels[x, y], pixels[x, y + 1]
+            text.append("▀", style=f"rgb({top[0]},{top[1]},{top[2]}) on rgb({bottom[0]},{bottom[1]},{bottom[2]})")
+        text.append("\n")
+    return text
+
+
+class ProgressReportingMixin:
+    """
+    Progress reports from a pane's plugin logic. The pane hands
+    _report_progress_threadsafe to its logic as a callback and implements
+    _report_progress with the same arguments; that then runs on the UI thread,
+    and only while the pane is still mounted.
+    """
+
+    def _report_progress_threadsafe(self, *args) -> None:
+        # Logic reports from the scheduler thread or its own workers, possibly after the user switched panes
+        self._call_if_attached(self._report_progress_if_attached, *args)
+
+    def _report_progress_if_attached(self, *args) -> None:
+        if self.is_attached:
+            self._report_progress(*args)
+
+    def _report_progress(self, *args) -> None:
+        raise NotImplementedError
+
+    def _call_if_attached(self, callback, *args, **kwargs) -> None:
+        """call_from_thread, skipped once the pane has been unmounted (the user switched away)."""
+        if self.is_attached:
+            self.app.call_from_thread(callback, *args, **kwargs)
+
+
+class ImageDirectoryMixin(ProgressReportingMixin):
+    """
+    Directory loading and image previews for a pane with a directory Input, a
+    Select of images and a preview Static. The pane names its widgets in the
+    class attributes below and calls load_image_directory() and
+    show_image_preview() from its event handlers.
+    """
+
+    directory_input_id = "directory_path_input"
+    image_select_id = "image_select"
+    preview_id = "image_preview"
+
+    def load_image_directory(self) -> None:
+        """Scans the directory in the background, filling the Select widget as files are found."""
+        from textual.widgets import Input, Select
+
+        directory_path = self.query_one(f"#{self.directory_input_id}", Input).value
+        if not os.path.isdir(directory_path):
+            self.notify(f"Error: Directory not found: {directory_path}", severity="error")
+            return
+
+        self.query_one(f"#{self.image_select_id}", Select).set_options([])
+        # exclusive: loading another directory cancels a scan still in progress
+        self.run_worker(partial(self._scan_directory, directory_path), thread=True, exclusive=True, group="scan")
+
+    def _scan_directory(self, directory_path: str) -> None:
+        from textual.worker import get_current_worker
+
+        worker = get_current_worker()
+        found = []
+        shown = 0
+        try:
+            for chunk in get_scanner().scan(directory_path, cancelled=lambda: worker.is_cancelled):
+                found.extend(chunk)
+                # set_options rebuilds the whole list; showing it again only once it has
+                # doubled keeps the total work linear in the number of files
+                if len(found) >= 2 * shown:
+                    shown = len(found)
+                    self._call_if_attached(self._set_image_options, list(found))
+            if shown < len(found):
+                self._call_if_attached(self._set_image_options, found)
+        except Exception as e:
+            self._call_if_attached(self.notify, f"Failed to read directory: {e}", severity="error")
+            return
+        if not worker.is_cancelled:
+            self._call_if_attached(self.notify, f"Loaded {len(found)} image(s) from {directory_path}",
+                                   severity="information")
+
+    def _set_image_options(self, files: list) -> None:
+        from textual.widgets import Select
+
+        if self.is_attached:
+            self.query_one(f"#{self.image_select_id}", Select).set_options((file, file) for file in files)
+
+    def show_image_preview(self, file_name: str) -> None:
+        """Shows a thumbnail of a file from the loaded directory in the preview box."""
+        from textual.widgets import Input, Static
+
+        directory_path = self.query_one(f"#{self.directory_input_id}", Input).value
+        # Widgets are only read here, on the UI thread; the worker gets plain values
+        preview = self.query_one(f"#{self.preview_id}", Static)
+        # Cells are about twice as tall as wide; render_thumbnail packs two pixels per cell
+        width = max(8, min(preview.size.width or 40, get_thumbnail_cache().size))
+        self.run_worker(partial(self._load_preview, os.path.join(directory_path, file_name), preview, width),
+                        thread=True, exclusive=True, group="preview")
+
+    def _load_preview(self, image_path: str, preview, width: int) -> None:
+        try:
+            text = render_thumbnail(get_thumbnail_cache().get(image_path), width)
+        except Exception as e:
+            text = f"No preview: {e}"
+        self._call_if_attached(preview.update, text)
+
+
+_shared_scanner = None
+_shared_thumbnails = None
+_shared_lock = threading.Lock()
+
+
+def get_scanner() -> DirectoryScanner:
+    """The scanner shared by every pane, so they share one directory index."""
+    global _shared_scanner
+    with _shared_lock:
+        if _shared_scanner is None:
+            _shared_scanner = DirectoryScanner()
+        return _shared_scanner
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    global _shared_thumbnails
+    with _shared_lock:
+        if _shared_thumbnails is None:
+            _shared_thumbnails = ThumbnailCache()
+        return _shared_thumbnails
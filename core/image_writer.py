@@ -0,0 +1,228 @@
+# core/image_writer.py
+
+import os
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import get_section
+from core.tracing import span
+
+# File extension for each output format PIL should use
+FORMAT_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+# EXIF ImageDescription, used to carry the metadata in JPEG and WebP files
+EXIF_IMAGE_DESCRIPTION = 0x010E
+
+
+class ImageWriteBehind:
+    """
+    Encodes and writes images on a small thread pool so inference never waits on disk.
+
+    submit() returns as soon as the image is queued. If max_pending images are
+    already waiting, it blocks until one is written, which keeps memory bounded
+    when the disk falls behind. Written files are fsynced in batches of
+    fsync_batch rather than one by one. Generation metadata is embedded in each
+    file (PNG text chunks, or the EXIF description for JPEG/WebP).
+
+    PNG and JPEG encoding release the GIL inside zlib/libjpeg, so threads are
+    enough to overlap encoding with the next generation.
+    """
+
+    def __init__(self, image_format: str = None, compress_level: int = None, quality: int = None,
+                 max_pending: int = None, workers: int = None, fsync_batch: int = None):
+        config = get_section("image_output")
+        self.image_format = (image_format or config.get("format", "png")).lower()
+        if self.image_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported image format '{self.image_format}'.")
+        self.compress_level = int(compress_level if compress_level is not None else config.get("png_compress_level", 6))
+        self.quality = int(quality if quality is not None else config.get("quality", 95))
+        self.fsync_batch = max(1, int(fsync_batch or config.get("fsync_batch", 8)))
+        max_pending = max(1, int(max_pending or config.get("max_pending", 8)))
+
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers or config.get("workers", 2))),
+                                        thread_name_prefix="image-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        # Paths queued but not written yet, so unique names also avoid those
+        self._reserved = set()
+        self._unsynced = []
+        # Batches taken off _unsynced whose fsync hasn't finished yet
+        self._syncing = 0
+        self.written = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.blocked_seconds = 0.0
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS[self.image_format]
+
+    def submit(self, image, path: str, metadata: dict = None, unique: bool = False) -> str:
+        """
+        Queues an image to be written to path, with the extension of the configured
+        format. Returns the final path. Blocks while the queue is full. With unique
+        set, a counter is added to the name when the file exists or is already queued.
+        """
+        base = os.path.splitext(path)[0]
+        path = base + self.extension
+        started = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with span("wait for image writer", "save"):
+                self._slots.acquire()
+
+        with self._lock:
+            self.blocked_seconds += time.perf_counter() - started
+            counter = 1
+            while unique and (path in self._reserved or os.path.exists(path)):
+                path = f"{base}_{counter}{self.extension}"
+                counter += 1
+            self._reserved.add(path)
+            self._pending += 1
+        self._pool.submit(self._write, image, path, dict(metadata or {}))
+        return path
+
+    def _write(self, image, path: str, metadata: dict) -> None:
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = path + ".part"
+            with span("encode image", "save", path=os.path.basename(path)):
+                with open(tmp_path, "wb") as f:
+                    image.save(f, **self._save_options(image, metadata))
+                os.replace(tmp_path, path)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += os.path.getsize(path)
+                self._unsynced.append(path)
+                to_sync = self._take_unsynced(self.fsync_batch)
+            if to_sync:
+                with span("fsync images", "save", files=len(to_sync)):
+                    self._sync_batch(to_sync)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Failed to save image {path}: {e}", file=sys.stderr)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._reserved.discard(path)
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+
+    def _save_options(self, image, metadata: dict) -> dict:
+        if self.image_format == "png":
+            from PIL.PngImagePlugin import PngInfo
+
+            info = PngInfo()
+            for key, value in metadata.items():
+                info.add_text(str(key), str(value))
+            if metadata:
+                info.add_text("parameters", json.dumps(metadata, default=str))
+            return {"format": "PNG", "pnginfo": info, "compress_level": self.compress_level}
+
+        options = {"format": self.image_format.upper(), "quality": self.quality}
+        if metadata:
+            exif = image.getexif()
+            exif[EXIF_IMAGE_DESCRIPTION] = json.dumps(metadata, default=str)
+            options["exif"] = exif
+        return options
+
+    def _take_unsynced(self, threshold: int) -> list:
+        """
+        Returns the written-but-unsynced paths once there are at least threshold of
+        them. The caller holds the lock and must pass them to _sync_batch.
+        """
+        if not self._unsynced or len(self._unsynced) < threshold:
+            return []
+        paths, self._unsynced = self._unsynced, []
+        self._syncing += 1
+        return paths
+
+    def _sync_batch(self, paths: list) -> None:
+        try:
+            self._sync(paths)
+        finally:
+            with self._lock:
+                self._syncing -= 1
+                if self._syncing == 0:
+                    self._idle.notify_all()
+
+    def _sync(self, paths: list) -> None:
+        directories = set()
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                directories.add(os.path.dirname(path) or ".")
+            except OSError as e:
+                print(f"Failed to fsync {path}: {e}", file=sys.stderr)
+        # Make the renames durable too
+        for directory in directories:
+            try:
+                fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every queued image is written and synced, including batches
+        another thread is still fsyncing. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            if not self._idle.wait_for(lambda: self._pending == 0, timeout=timeout):
+                return False
+            to_sync = self._take_unsynced(1)
+        if to_sync:
+            self._sync_batch(to_sync)
+        with self._lock:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            return self._idle.wait_for(lambda: self._syncing == 0, timeout=remaining)
+
+    def close(self) -> None:
+        self.flush()
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "written": self.written,
+                "errors": self.errors,
+                "bytes_written": self.bytes_written,
+                "blocked_seconds": self.blocked_seconds,
+            }
+
+
+_shared_writer = None
+_shared_writer_lock = threading.Lock()
+
+
+def get_image_writer() -> ImageWriteBehind:
+    """Returns the process-wide writer, so all plugins share one queue and one pool."""
+    global _shared_writer
+    with _shared_writer_lock:
+        if _shared_writer is None:
+            _shared_writer = ImageWriteBehind()
+        return _shared_writer
+
+
+def flush_pending_writes(timeout: float = None) -> bool:
+    """Flushes the shared writer if anything has used it. Safe to call at exit."""
+    with _shared_writer_lock:
+        writer = _shared_writer
+    return writer.flush(timeout) if writer is not None else True
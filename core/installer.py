@@ -0,0 +1,213 @@
+# core/installer.py
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import PROJECT_ROOT, get_section
+
+PACKAGES_MANIFEST = ".packages.json"
+
+
+class ResolvedPackage:
+    """One distribution picked by pip's resolver: a name, a version and where to get it."""
+
+    def __init__(self, name: str, version: str, url: str, sha256: str = None):
+        self.name = name
+        self.version = version
+        self.url = url
+        self.sha256 = sha256
+
+    @property
+    def store_key(self) -> str:
+        """Content address of the package in the shared store."""
+        content = self.sha256 or hashlib.sha256(f"{self.name}=={self.version}|{self.url}".encode("utf-8")).hexdigest()
+        return f"{self.name.lower().replace('-', '_')}-{self.version}-{content[:16]}"
+
+
+class DependencyInstaller:
+    """
+    Installs plugin requirements through a shared, content-addressed package store.
+
+    All requirement sets are resolved first (in parallel), then every distinct
+    package version is installed once into dependencies/_store/<name>-<version>-<hash>
+    using a bounded worker pool. Each plugin's dependency folder is made of
+    symlinks into the store, so a package pinned by seven plugins is on disk once.
+
+    If a wheel directory is configured, pip never touches the network.
+    """
+
+    def __init__(self, dependencies_root: str, store_dir: str = None, wheel_dir: str = None, max_workers: int = None):
+        config = get_section("installer")
+        self.dependencies_root = dependencies_root
+        self.store_dir = store_dir or os.path.join(dependencies_root, "_store")
+        wheel_dir = wheel_dir if wheel_dir is not None else config.get("wheel_dir", "")
+        self.wheel_dir = os.path.join(PROJECT_ROOT, wheel_dir) if wheel_dir else None
+        self.max_workers = max(1, int(max_workers or config.get("max_workers", 4)))
+
+    def _pip(self, *args) -> list:
+        command = [sys.executable, "-m", "pip", *args, "--disable-pip-version-check"]
+        if self.wheel_dir:
+            command += ["--no-index", "--find-links", self.wheel_dir]
+        return command
+
+    def resolve(self, requirements_path: str) -> list:
+        """Asks pip which distributions would satisfy a requirements file, without installing anything."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = os.path.join(tmp_dir, "report.json")
+            command = self._pip("install", "--dry-run", "--ignore-installed", "--quiet",
+                                "--report", report_path, "-r", requirements_path)
+            subprocess.run(command, check=True)
+            with open(report_path, "r") as f:
+                report = json.load(f)
+
+        packages = []
+        for item in report.get("install", []):
+            download_info = item.get("download_info", {})
+            hashes = download_info.get("archive_info", {}).get("hashes", {})
+            packages.append(ResolvedPackage(
+                item["metadata"]["name"],
+                item["metadata"]["version"],
+                download_info.get("url"),
+                hashes.get("sha256"),
+            ))
+        return packages
+
+    def _install_to_store(self, package: ResolvedPackage) -> str:
+        """Installs a single package, without its dependencies, into its store entry."""
+        target = os.path.join(self.store_dir, package.store_key)
+        if os.path.isdir(target):
+            return target
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{package.store_key}-", dir=self.store_dir)
+        try:
+            source = package.url or f"{package.name}=={package.version}"
+            print(f"Installing {package.name} {package.version} into the shared store...")
+            command = self._pip("install", "--no-deps", "--ignore-installed", "--quiet", "-t", staging, source)
+            subprocess.run(command, check=True)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another installer finished the same package first
+                if not os.path.isdir(target):
+                    raise
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return target
+
+    def _link_tree(self, source_dir: str, target_dir: str) -> None:
+        """
+        Symlinks every entry of a store package into target_dir. Directories shared by
+        several packages (namespace packages, bin/) are turned into real directories
+        whose children are linked instead.
+        """
+        for name in os.listdir(source_dir):
+            source = os.path.join(source_dir, name)
+            target = os.path.join(target_dir, name)
+            if not os.path.lexists(target):
+                os.symlink(source, target)
+                continue
+
+            if os.path.isdir(source) and os.path.isdir(target):
+                if os.path.islink(target):
+                    previous = os.path.realpath(target)
+                    os.unlink(target)
+                    os.mkdir(target)
+                    self._link_tree(previous, target)
+                self._link_tree(source, target)
+            else:
+                print(f"Warning: '{name}' is provided by more than one package in {target_dir}; keeping the first.",
+                      file=sys.stderr)
+
+    def _link_plugin(self, deps_path: str, packages: list) -> None:
+        """Rebuilds a plugin's dependency folder from store links and swaps it into place."""
+        staging = deps_path + ".new"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for package in packages:
+            self._link_tree(os.path.join(self.store_dir, package.store_key), staging)
+        with open(os.path.join(staging, PACKAGES_MANIFEST), "w") as f:
+            json.dump([package.store_key for package in packages], f, indent=2)
+
+        if os.path.lexists(deps_path):
+            # rmtree removes the links themselves, never the store entries they point to
+            shutil.rmtree(deps_path)
+        os.rename(staging, deps_path)
+
+    def install(self, requirement_sets: dict) -> dict:
+        """
+        Installs several requirement sets together.
+
+        requirement_sets maps a dependency folder name (the plugin's model_type) to
+        its requirements.txt. Returns {name: None} on success or {name: error}.
+        """
+        results = {}
+        if not requirement_sets:
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # 1. Resolve every set independently, so each keeps its own pins
+            futures = {name: pool.submit(self.resolve, path) for name, path in requirement_sets.items()}
+            resolved = {}
+            for name, future in futures.items():
+                try:
+                    resolved[name] = future.result()
+                except Exception as e:
+                    results[name] = f"Failed to resolve requirements: {e}"
+
+            # 2. Install each distinct package once
+            unique = {}
+            for packages in resolved.values():
+                for package in packages:
+                    unique.setdefault(package.store_key, package)
+            pending = [package for key, package in unique.items() if not os.path.isdir(os.path.join(self.store_dir, key))]
+            print(f"{len(unique)} distinct packages needed by {len(resolved)} plugin(s); "
+                  f"{len(unique) - len(pending)} already in the store, {len(pending)} to install.")
+            install_futures = {package.store_key: pool.submit(self._install_to_store, package) for package in pending}
+            failed = {}
+            for key, future in install_futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[key] = e
+
+        # 3. Link each plugin's folder to its packages
+        for name, packages in resolved.items():
+            missing = [package.store_key for package in packages if package.store_key in failed]
+            if missing:
+                results[name] = f"Failed to install {', '.join(missing)}: {failed[missing[0]]}"
+                continue
+            try:
+                self._link_plugin(os.path.join(self.dependencies_root, name), packages)
+                results[name] = None
+            except OSError as e:
+                results[name] = f"Failed to link dependencies: {e}"
+        return results
+
+    def prune_store(self) -> int:
+        """Deletes store entries no plugin folder links to anymore. Returns how many were removed."""
+        if not os.path.isdir(self.store_dir):
+            return 0
+
+        referenced = set()
+        for name in os.listdir(self.dependencies_root):
+            manifest_path = os.path.join(self.dependencies_root, name, PACKAGES_MANIFEST)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as f:
+                    referenced.update(json.load(f))
+
+        removed = 0
+        for key in os.listdir(self.store_dir):
+            if key.startswith(".") or key in referenced:
+                continue
+            shutil.rmtree(os.path.join(self.store_dir, key), ignore_errors=True)
+            removed += 1
+        return removed
@@ -0,0 +1,127 @@
+# core/job_queue_tui.py
+
+import os
+import time
+
+from textual.containers import Container, Horizontal, Vertical
+from textual.widgets import Static, DataTable, Button, Input, Select
+from textual.app import ComposeResult
+from textual import on
+
+from core.jobs import Job, QUEUED, PRIORITY_HIGH
+from core.pipeline import list_pipelines
+
+
+class JobQueuePane(Container):
+    """Shows the scheduler's queue and lets the user cancel or prioritize waiting jobs."""
+
+    DEFAULT_CSS = """
+    #job_table {
+        height: 1fr;
+    }
+    #job_actions {
+        height: auto;
+    }
+    #job_actions Button {
+        margin-right: 1;
+    }
+    #pipeline_actions {
+        height: auto;
+    }
+    #pipeline_select {
+        width: 30;
+    }
+    #pipeline_prompt_input {
+        width: 1fr;
+    }
+    """
+
+    REFRESH_INTERVAL = 0.5
+
+    def __init__(self, scheduler, plugins: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+        self.plugins = plugins
+
+    def compose(self) -> ComposeResult:
+        self.add_class("job_queue_pane")
+
+        with Vertical(classes="output-box"):
+            yield Static("[b]Job Queue[/b]", classes="box_header")
+            yield DataTable(id="job_table", cursor_type="row", zebra_stripes=True)
+            with Horizontal(id="job_actions"):
+                yield Button("Run Next", id="prioritize_job_button", classes="action_button")
+                yield Button("Cancel", id="cancel_job_button", classes="action_button")
+                yield Button("Clear Finished", id="clear_jobs_button", classes="action_button")
+            with Horizontal(id="pipeline_actions"):
+                yield Select(
+                    [(os.path.splitext(os.path.basename(path))[0], path) for path in list_pipelines()],
+                    prompt="Pipeline", id="pipeline_select",
+                )
+                yield Input(placeholder="Pipeline prompt", id="pipeline_prompt_input")
+                yield Button("Run Pipeline", id="run_pipeline_button", classes="action_button")
+
+    def on_mount(self) -> None:
+        table = self.query_one("#job_table", DataTable)
+        table.add_columns("ID", "Plugin", "State", "Priority", "Time", "Job")
+        self._refresh_table()
+        self.set_interval(self.REFRESH_INTERVAL, self._refresh_table)
+
+    def _refresh_table(self) -> None:
+        table = self.query_one("#job_table", DataTable)
+        cursor_row = table.cursor_row
+        table.clear()
+        now = time.time()
+        for job in self.scheduler.snapshot():
+            plugin_name = self.plugins.get(job.hotkey, {}).get("name", job.hotkey)
+            if job.started_at:
+                elapsed = f"{(job.finished_at or now) - job.started_at:.1f}s"
+            else:
+                elapsed = f"waiting {now - job.created_at:.0f}s"
+            state = job.state if not job.error else f"{job.state}: {job.error}"[:40]
+            table.add_row(job.id, plugin_name, state, str(job.priority), elapsed, job.summary(), key=job.id)
+        if table.row_count:
+            table.move_cursor(row=min(cursor_row, table.row_count - 1))
+
+    def _selected_job_id(self):
+        table = self.query_one("#job_table", DataTable)
+        if not table.row_count:
+            return None
+        return table.coordinate_to_cell_key(table.cursor_coordinate).row_key.value
+
+    @on(Button.Pressed, "#prioritize_job_button")
+    def on_prioritize_pressed(self, event: Button.Pressed) -> None:
+        job_id = self._selected_job_id()
+        job = self.scheduler.get(job_id) if job_id else None
+        if job is None or job.state != QUEUED:
+            self.notify("Only queued jobs can be reprioritized.", severity="warning")
+            return
+        self.scheduler.reprioritize(job_id, max(job.priority, PRIORITY_HIGH) + 1)
+        self._refresh_table()
+
+    @on(Button.Pressed, "#cancel_job_button")
+    def on_cancel_pressed(self, event: Button.Pressed) -> None:
+        job_id = self._selected_job_id()
+        if not job_id or not self.scheduler.cancel(job_id):
+            self.notify("Only queued jobs can be cancelled.", severity="warning")
+            return
+        self._refresh_table()
+
+    @on(Button.Pressed, "#run_pipeline_button")
+    @on(Input.Submitted, "#pipeline_prompt_input")
+    def on_run_pipeline(self, event) -> None:
+        pipeline_path = self.query_one("#pipeline_select", Select).value
+        prompt_input = self.query_one("#pipeline_prompt_input", Input)
+        if pipeline_path == Select.BLANK or not prompt_input.value.strip():
+            self.notify("Choose a pipeline and enter a prompt.", severity="warning")
+            return
+        # Stages load their own models, so the job is not tied to one plugin
+        job = self.scheduler.submit(Job("pipeline", prompt_input.value, {"pipeline": pipeline_path}, kind="pipeline"))
+        self.notify(f"Queued pipeline job {job.id}.")
+        prompt_input.value = ""
+        self._refresh_table()
+
+    @on(Button.Pressed, "#clear_jobs_button")
+    def on_clear_pressed(self, event: Button.Pressed) -> None:
+        self.scheduler.clear_finished()
+        self._refresh_table()
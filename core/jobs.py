@@ -0,0 +1,320 @@
+# core/jobs.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+
+from core.config import PROJECT_ROOT, get_section
+from core.tracing import get_tracer
+from core.result_cache import run_inference as cached_inference
+
+QUEUED = "queued"
+LOADING = "loading"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+
+class Job:
+    """A unit of work for the scheduler: load a plugin's model, or run inference on it."""
+
+    def __init__(self, hotkey: str, prompt=None, settings: dict = None, priority: int = PRIORITY_NORMAL,
+                 kind: str = "inference", runner=None, description: str = None):
+        self.id = uuid.uuid4().hex[:8]
+        self.hotkey = hotkey
+        self.kind = kind
+        self.prompt = prompt
+        self.settings = settings or {}
+        self.priority = priority
+        self.description = description
+        # Optional callable(logic, job) used instead of logic.run_inference; not persisted
+        self.runner = runner
+
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    def summary(self) -> str:
+        """Returns a short, single-line description of the job for the queue view."""
+        if self.description:
+            return self.description
+        if self.kind == "load":
+            return "Load model"
+        if self.kind == "pipeline":
+            name = os.path.splitext(os.path.basename(self.settings.get("pipeline", "")))[0]
+            return f"Pipeline {name}: {self.prompt}".replace("\n", " ")[:80]
+        return str(self.prompt).replace("\n", " ")[:80]
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "hotkey": self.hotkey,
+            "kind": self.kind,
+            "prompt": self.prompt if isinstance(self.prompt, str) else None,
+            "settings": dict(self.settings),
+            "priority": self.priority,
+            "description": self.description,
+            "state": self.state,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result if isinstance(self.result, str) else None,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        job = cls(data["hotkey"], data.get("prompt"), data.get("settings"), data.get("priority", PRIORITY_NORMAL),
+                  data.get("kind", "inference"), description=data.get("description"))
+        job.id = data["id"]
+        job.state = data.get("state", QUEUED)
+        job.created_at = data.get("created_at", job.created_at)
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        job.result = data.get("result")
+        job.error = data.get("error")
+        return job
+
+
+class JobScheduler:
+    """
+    Runs jobs one at a time on a single background thread.
+
+    All model loads, unloads and inference go through this thread, so a pane switch
+    can never race a running job. Higher priority jobs run first; among equal
+    priorities, jobs for the model that is already loaded are preferred so loads
+    are amortized, then jobs are taken in submission order. The queue is written
+    to disk on every change and reloaded on the next start.
+    """
+
+    def __init__(self, residency, persist_path: str = None):
+        config = get_section("jobs")
+        self.residency = residency
+        self.persist_path = persist_path or os.path.join(PROJECT_ROOT, "cache", "jobs.json")
+        self.history_limit = int(config.get("history_limit", 100))
+
+        self._jobs = []
+        self._listeners = []
+        self._current_hotkey = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._load()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None) -> bool:
+        """
+        Stops taking jobs and waits for the one running to finish. Returns False if
+        it is still running after timeout seconds; callers must not unload models then.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return False
+            self._thread = None
+        return True
+
+    def add_listener(self, callback) -> None:
+        """Registers callback(job), called whenever a job changes state."""
+        self._listeners.append(callback)
+
+    def submit(self, job: Job) -> Job:
+        with self._condition:
+            self._jobs.append(job)
+            self._save()
+            self._condition.notify_all()
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Fails a job that has not started yet. Running jobs cannot be interrupted."""
+        with self._condition:
+            job = self._find(job_id)
+            if job is None or job.state != QUEUED:
+                return False
+            job.state = FAILED
+            job.error = "Cancelled"
+            job.finished_at = time.time()
+            self._save()
+        self._notify(job)
+        return True
+
+    def reprioritize(self, job_id: str, priority: int) -> bool:
+        with self._condition:
+            job = self._find(job_id)
+            if job is None or job.state != QUEUED:
+                return False
+            job.priority = priority
+            self._save()
+        self._notify(job)
+        return True
+
+    def clear_finished(self) -> None:
+        with self._condition:
+            self._jobs = [job for job in self._jobs if not job.is_finished]
+            self._save()
+
+    def snapshot(self) -> list:
+        """Returns the jobs in display order: unfinished first, by run order, then recent history."""
+        with self._condition:
+            pending = sorted((job for job in self._jobs if not job.is_finished), key=self._order_key)
+            finished = sorted((job for job in self._jobs if job.is_finished), key=lambda job: -(job.finished_at or 0))
+            return pending + finished
+
+    def get(self, job_id: str):
+        with self._condition:
+            return self._find(job_id)
+
+    def _find(self, job_id: str):
+        for job in self._jobs:
+            if job.id == job_id:
+                return job
+        return None
+
+    def _order_key(self, job: Job):
+        running = job.state in (LOADING, RUNNING)
+        same_model = job.hotkey == self._current_hotkey
+        resident = self.residency.is_resident(job.hotkey)
+        return (not running, -job.priority, not same_model, not resident, job.created_at)
+
+    def _next_job(self):
+        queued = [job for job in self._jobs if job.state == QUEUED]
+        if not queued:
+            return None
+        return min(queued, key=self._order_key)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._condition.wait()
+                    job = self._next_job()
+                if self._stopping:
+                    return
+                job.state = LOADING
+                job.started_at = time.time()
+                self._save()
+            self._notify(job)
+            self._execute(job)
+
+    def _execute(self, job: Job) -> None:
+        if job.kind == "pipeline":
+            self._execute_pipeline(job)
+            return
+        try:
+            logic = self.residency.acquire(job.hotkey)
+            if logic is None:
+                raise RuntimeError(f"No logic available for plugin '{job.hotkey}'.")
+            self._current_hotkey = job.hotkey
+
+            if job.kind != "load":
+                self._set_state(job, RUNNING)
+                with get_tracer().span("run job", "inference", plugin=job.hotkey, job=job.id, kind=job.kind):
+                    if job.runner is not None:
+                        job.result = job.runner(logic, job)
+                    else:
+                        job.result = cached_inference(self.residency.plugin_manager, job.hotkey, logic,
+                                                      job.prompt, job.settings)
+            self._set_state(job, DONE)
+        except Exception as e:
+            job.error = str(e)
+            # Printing would draw over the TUI; the Job Queue pane shows the error
+            get_tracer().event("job failed", "inference", plugin=job.hotkey, job=job.id, error=job.error)
+            self._set_state(job, FAILED)
+
+    def _execute_pipeline(self, job: Job) -> None:
+        """
+        Runs a pipeline job: settings["pipeline"] is the definition file, and the
+        outputs are saved to settings["out_dir"] (a fresh folder if unset). Stages
+        load their models through the residency manager as they start.
+        """
+        # Imported on first use so plain inference jobs don't pay for it
+        from core.pipeline import Pipeline, PipelineRunner, default_output_dir
+
+        try:
+            self._set_state(job, RUNNING)
+            pipeline = Pipeline.load(job.settings["pipeline"], self.residency.plugin_manager)
+            out_dir = job.settings.get("out_dir") or default_output_dir(pipeline.name)
+            PipelineRunner(self.residency).run(pipeline, job.prompt, job.settings.get("overrides"), out_dir=out_dir)
+            job.result = out_dir
+            self._set_state(job, DONE)
+        except Exception as e:
+            job.error = str(e)
+            get_tracer().event("job failed", "pipeline", job=job.id, error=job.error)
+            self._set_state(job, FAILED)
+
+    def _set_state(self, job: Job, state: str) -> None:
+        with self._condition:
+            job.state = state
+            if job.is_finished:
+                job.finished_at = time.time()
+                self._trim_history()
+            self._save()
+        self._notify(job)
+
+    def _trim_history(self) -> None:
+        finished = [job for job in self._jobs if job.is_finished]
+        if len(finished) > self.history_limit:
+            finished.sort(key=lambda job: job.finished_at or 0)
+            stale = set(job.id for job in finished[:len(finished) - self.history_limit])
+            self._jobs = [job for job in self._jobs if job.id not in stale]
+
+    def _notify(self, job: Job) -> None:
+        for callback in self._listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                get_tracer().event("job listener failed", "app", job=job.id, error=str(e))
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.persist_path), exist_ok=True)
+            tmp_path = self.persist_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump([job.to_dict() for job in self._jobs], f, indent=2)
+            os.replace(tmp_path, self.persist_path)
+        except (IOError, TypeError) as e:
+            get_tracer().event("save job queue failed", "save", path=self.persist_path, error=str(e))
+
+    def _load(self) -> None:
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Error loading job queue from {self.persist_path}: {e}", file=sys.stderr)
+            return
+
+        for entry in data:
+            job = Job.from_dict(entry)
+            # Model loads are only meaningful for the session that asked for them
+            if job.kind == "load" and not job.is_finished:
+                continue
+            # Jobs interrupted by the last shutdown go back in the queue
+            if job.state in (LOADING, RUNNING):
+                job.state = QUEUED
+                job.started_at = None
+            self._jobs.append(job)
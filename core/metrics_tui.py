@@ -0,0 +1,108 @@
+# core/metrics_tui.py
+
+from textual.containers import Container, Horizontal, Vertical
+from textual.widgets import Static, DataTable, Button
+from textual.app import ComposeResult
+from textual import on
+
+from core.tracing import get_tracer
+from core.result_cache import get_result_cache
+from core.weights import get_warm_cache
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+class MetricsPane(Container):
+    """Summarizes the tracer's spans per stage, and lists the most recent ones."""
+
+    DEFAULT_CSS = """
+    #metrics_summary_table {
+        height: 1fr;
+    }
+    #metrics_recent_table {
+        height: 1fr;
+    }
+    #metrics_actions {
+        height: auto;
+    }
+    #metrics_actions Button {
+        margin-right: 1;
+    }
+    """
+
+    REFRESH_INTERVAL = 1.0
+    RECENT_SPANS = 50
+
+    def __init__(self, plugins: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.plugins = plugins
+        self.tracer = get_tracer()
+
+    def compose(self) -> ComposeResult:
+        self.add_class("metrics_pane")
+
+        with Vertical(classes="output-box"):
+            yield Static("[b]Stages[/b] (times in ms)", classes="box_header")
+            yield DataTable(id="metrics_summary_table", zebra_stripes=True)
+            yield Static("[b]Recent spans[/b]", classes="box_header")
+            yield DataTable(id="metrics_recent_table", zebra_stripes=True)
+            yield Static("", id="metrics_cache_static")
+            with Horizontal(id="metrics_actions"):
+                yield Button("Export Trace", id="export_trace_button", classes="action_button")
+                yield Button("Clear", id="clear_metrics_button", classes="action_button")
+
+    def on_mount(self) -> None:
+        self.query_one("#metrics_summary_table", DataTable).add_columns(
+            "Category", "Stage", "Count", "Total", "Mean", "p95", "Max", "Last"
+        )
+        self.query_one("#metrics_recent_table", DataTable).add_columns(
+            "Category", "Stage", "Duration", "Thread", "Details"
+        )
+        if not self.tracer.enabled:
+            self.notify("Tracing is disabled; set [tracing] enabled = true in config.toml.", severity="warning")
+        self._refresh_tables()
+        self.set_interval(self.REFRESH_INTERVAL, self._refresh_tables)
+
+    def _details(self, span) -> str:
+        args = dict(span.args)
+        hotkey = args.pop("plugin", None)
+        parts = [self.plugins.get(hotkey, {}).get("name", hotkey)] if hotkey else []
+        parts.extend(f"{key}={value}" for key, value in args.items())
+        if span.error:
+            parts.append(f"error: {span.error}")
+        return ", ".join(parts)[:80]
+
+    def _refresh_tables(self) -> None:
+        summary_table = self.query_one("#metrics_summary_table", DataTable)
+        summary_table.clear()
+        for row in self.tracer.summary():
+            summary_table.add_row(
+                row["category"], row["name"], str(row["count"]), _ms(row["total_s"]), _ms(row["mean_s"]),
+                _ms(row["p95_s"]), _ms(row["max_s"]), _ms(row["last_s"]),
+            )
+
+        recent_table = self.query_one("#metrics_recent_table", DataTable)
+        recent_table.clear()
+        for span in reversed(self.tracer.spans()[-self.RECENT_SPANS:]):
+            duration = _ms(span.duration) if span.duration is not None else "-"
+            recent_table.add_row(span.category, span.name, duration, span.thread_name, self._details(span))
+
+        self.query_one("#metrics_cache_static", Static).update(
+            f"{get_result_cache().report()}\n{get_warm_cache().report()}"
+        )
+
+    @on(Button.Pressed, "#export_trace_button")
+    def on_export_pressed(self, event: Button.Pressed) -> None:
+        try:
+            path = self.tracer.export_chrome_trace()
+        except (IOError, OSError) as e:
+            self.notify(f"Failed to export trace: {e}", severity="error")
+            return
+        self.notify(f"Trace written to {path}. Open it in chrome://tracing or ui.perfetto.dev.")
+
+    @on(Button.Pressed, "#clear_metrics_button")
+    def on_clear_pressed(self, event: Button.Pressed) -> None:
+        self.tracer.clear()
+        self._refresh_tables()
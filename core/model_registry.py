@@ -0,0 +1,400 @@
+# core/model_registry.py
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import time
+import threading
+from collections import Counter
+
+from core.config import PROJECT_ROOT, get_section
+from core.plugin_index import hash_file
+from core.tracing import span
+
+INDEX_VERSION = 1
+
+WEIGHT_SUFFIXES = {
+    ".gguf": "gguf",
+    ".safetensors": "safetensors",
+    ".pth": "pytorch",
+    ".pt": "pytorch",
+    ".bin": "pytorch",
+    ".ckpt": "pytorch",
+}
+
+# general.file_type in a GGUF header
+GGUF_FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1", 10: "Q2_K",
+    11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M", 16: "Q5_K_S",
+    17: "Q5_K_M", 18: "Q6_K", 32: "BF16",
+}
+
+# struct formats of GGUF metadata value types; 8 is a string, 9 an array
+_GGUF_SCALARS = {0: "<B", 1: "<b", 2: "<H", 3: "<h", 4: "<I", 5: "<i", 6: "<f", 7: "<?", 10: "<Q", 11: "<q", 12: "<d"}
+
+
+def _read(f, fmt: str):
+    size = struct.calcsize(fmt)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("truncated header")
+    return struct.unpack(fmt, data)[0]
+
+
+def _read_gguf_string(f) -> str:
+    return f.read(_read(f, "<Q")).decode("utf-8", errors="replace")
+
+
+def _read_gguf_value(f, value_type: int):
+    if value_type in _GGUF_SCALARS:
+        return _read(f, _GGUF_SCALARS[value_type])
+    if value_type == 8:
+        return _read_gguf_string(f)
+    if value_type == 9:
+        item_type = _read(f, "<I")
+        count = _read(f, "<Q")
+        if item_type in _GGUF_SCALARS:
+            # Arrays such as token scores are not needed; step over them
+            f.seek(struct.calcsize(_GGUF_SCALARS[item_type]) * count, os.SEEK_CUR)
+        else:
+            for _ in range(count):
+                _read_gguf_value(f, item_type)
+        return None
+    raise ValueError(f"unknown GGUF value type {value_type}")
+
+
+def read_gguf_header(path: str) -> dict:
+    """Parameter count and quantization from a GGUF file's header, without reading the tensors."""
+    with open(path, "rb") as f:
+        if f.read(4) != b"GGUF":
+            raise ValueError("not a GGUF file")
+        version = _read(f, "<I")
+        count_format = "<I" if version == 1 else "<Q"
+        tensor_count = _read(f, count_format)
+        kv_count = _read(f, count_format)
+        metadata = {}
+        for _ in range(kv_count):
+            key = _read_gguf_string(f)
+            metadata[key] = _read_gguf_value(f, _read(f, "<I"))
+        parameters = 0
+        for _ in range(tensor_count):
+            _read_gguf_string(f)
+            elements = 1
+            for _ in range(_read(f, "<I")):
+                elements *= _read(f, "<Q")
+            f.seek(4 + 8, os.SEEK_CUR)  # tensor type and data offset
+            parameters += elements
+    return {
+        "parameters": parameters,
+        "quantization": GGUF_FILE_TYPES.get(metadata.get("general.file_type")),
+        "architecture": metadata.get("general.architecture"),
+    }
+
+
+def read_safetensors_header(path: str) -> dict:
+    """Parameter count and dtype counts from a safetensors file's JSON header."""
+    with open(path, "rb") as f:
+        header = json.loads(f.read(_read(f, "<Q")))
+    parameters = 0
+    dtypes = Counter()
+    for name, tensor in header.items():
+        if name == "__metadata__":
+            continue
+        elements = 1
+        for dim in tensor["shape"]:
+            elements *= dim
+        parameters += elements
+        dtypes[tensor["dtype"]] += elements
+    return {"parameters": parameters, "dtypes": dtypes}
+
+
+def _tree_signature(path: str):
+    """(newest mtime, total size, file count) of a file or a model folder; None if it is gone."""
+    try:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return [stat.st_mtime_ns, stat.st_size, 1]
+        if not os.path.isdir(path):
+            return None
+        newest, total, count = os.stat(path).st_mtime_ns, 0, 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                newest = max(newest, stat.st_mtime_ns)
+                total += stat.st_size
+                count += 1
+        return [newest, total, count]
+    except OSError:
+        # Removed or replaced while we looked; the next refresh sees the new state
+        return None
+
+
+def _weight_files(path: str) -> list:
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, name) for name in sorted(files))
+    return sorted(found)
+
+
+def describe_model(path: str) -> dict:
+    """Reads what the index stores about one model file or folder: format, quantization and parameter count."""
+    info = {"format": None, "quantization": None, "parameters": None}
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, "model_index.json")):
+            info["format"] = "diffusers"
+        elif os.path.exists(os.path.join(path, "config.json")):
+            info["format"] = "transformers"
+        else:
+            info["format"] = "folder"
+    else:
+        info["format"] = WEIGHT_SUFFIXES.get(os.path.splitext(path)[1].lower())
+        if info["format"] is None:
+            return info
+
+    try:
+        if info["format"] == "gguf":
+            header = read_gguf_header(path)
+            info["parameters"] = header["parameters"]
+            info["quantization"] = header["quantization"]
+            return info
+        # Folders and single files alike: count what their safetensors headers declare
+        dtypes = Counter()
+        parameters = 0
+        for weight_file in _weight_files(path):
+            if weight_file.endswith(".safetensors"):
+                header = read_safetensors_header(weight_file)
+                parameters += header["parameters"]
+                dtypes.update(header["dtypes"])
+        if parameters:
+            info["parameters"] = parameters
+            info["quantization"] = dtypes.most_common(1)[0][0]
+    except (IOError, ValueError, KeyError, TypeError) as e:
+        print(f"Could not read the header of {path}: {e}", file=sys.stderr)
+    return info
+
+
+def content_hash(path: str) -> str:
+    """sha256 of a model file, or of a folder's relative file names and their hashes."""
+    if os.path.isfile(path):
+        return hash_file(path)
+    digest = hashlib.sha256()
+    for weight_file in _weight_files(path):
+        digest.update(os.path.relpath(weight_file, path).encode())
+        digest.update(hash_file(weight_file).encode())
+    return digest.hexdigest()
+
+
+def plugin_models_folder(plugin_path: str) -> str:
+    """The models_folder in a plugin's plugin.json: the folder under models/ its models are indexed in."""
+    config_file = os.path.join(plugin_path, "plugin.json")
+    try:
+        with open(config_file, "r") as f:
+            folder = json.load(f).get("models_folder")
+    except (IOError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read the models_folder of {config_file}: {e}")
+    if not folder:
+        raise ValueError(f"{config_file} declares no models_folder.")
+    return folder
+
+
+class ModelRegistry:
+    """
+    An index of the models under models/<folder>/, one entry per file or model folder,
+    with its format, size, quantization, parameter count and content hash.
+
+    Like the plugin index, entries are revalidated by mtime and size, so an unchanged
+    tree costs a few stats; headers are only read for models that changed. Lookups
+    revalidate a folder at most every [models] refresh_seconds, so asking often (a
+    result cache key per request) doesn't walk the tree each time. Hashing
+    multi-gigabyte weights is slow, so content hashes are filled in on request
+    (content_hash(), or `python main.py models --hash`) and kept until the file changes.
+    """
+
+    def __init__(self, models_dir: str = None, cache_path: str = None):
+        config = get_section("models")
+        self.models_dir = models_dir or os.path.join(PROJECT_ROOT, config.get("dir", "models"))
+        self.cache_path = cache_path or os.path.join(PROJECT_ROOT, "cache", "model_index.json")
+        self.selected = dict(config.get("selected", {}))
+        self.refresh_seconds = float(config.get("refresh_seconds", 5))
+        # folder -> time.monotonic() of its last refresh
+        self._refreshed = {}
+        self._lock = threading.RLock()
+        self._data = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict:
+        empty = {"version": INDEX_VERSION, "models_dir": os.path.abspath(self.models_dir), "folders": {}}
+        if not os.path.exists(self.cache_path):
+            return empty
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Rebuilding model index, could not read {self.cache_path}: {e}", file=sys.stderr)
+            return empty
+        if data.get("version") != INDEX_VERSION or data.get("models_dir") != os.path.abspath(self.models_dir):
+            return empty
+        return data
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+                tmp_path = self.cache_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self._data, f, indent=2)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+            except IOError as e:
+                print(f"Error saving model index to {self.cache_path}: {e}", file=sys.stderr)
+
+    def refresh(self, folder: str) -> None:
+        """Brings the entries of models/<folder> up to date with the disk."""
+        folder_path = os.path.join(self.models_dir, folder)
+        with self._lock, span("refresh model index", "discovery", folder=folder):
+            folders = self._data["folders"]
+            if not os.path.isdir(folder_path):
+                if folders.pop(folder, None) is not None:
+                    self._dirty = True
+                self._refreshed[folder] = time.monotonic()
+                return
+
+            index = folders.setdefault(folder, {"signature": None, "models": {}})
+            models = index["models"]
+            signature = os.stat(folder_path).st_mtime_ns
+            if signature != index["signature"]:
+                names = {name for name in os.listdir(folder_path) if not name.startswith(".")}
+                for stale in set(models) - names:
+                    del models[stale]
+                for name in names:
+                    models.setdefault(name, {"signature": None})
+                index["signature"] = signature
+                self._dirty = True
+
+            for name, entry in list(models.items()):
+                path = os.path.join(folder_path, name)
+                signature = _tree_signature(path)
+                if signature is None:
+                    del models[name]
+                    self._dirty = True
+                elif signature != entry["signature"]:
+                    entry.clear()
+                    entry.update(describe_model(path))
+                    entry["signature"] = signature
+                    entry["size_bytes"] = signature[1]
+                    entry["sha256"] = None
+                    self._dirty = True
+            self._refreshed[folder] = time.monotonic()
+        self.save()
+
+    def models(self, folder: str, refresh: bool = False) -> list:
+        """
+        Every model in models/<folder> the plugins can load, as dicts sorted by name.
+        The folder is revalidated if refresh is set or its last check is older than
+        refresh_seconds.
+        """
+        with self._lock:
+            checked = self._refreshed.get(folder)
+        if refresh or checked is None or time.monotonic() - checked >= self.refresh_seconds:
+            self.refresh(folder)
+        with self._lock:
+            models = self._data["folders"].get(folder, {}).get("models", {})
+            return [dict(entry, name=name, path=os.path.join(self.models_dir, folder, name))
+                    for name, entry in sorted(models.items()) if entry.get("format")]
+
+    def model_path(self, folder: str, default: str, formats: tuple = None) -> str:
+        """
+        The model a plugin should load: the one named for this folder in
+        [models.selected], else the first one in a format the plugin reads, else
+        default (a bundled path or a hub id). Raises FileNotFoundError if the
+        folder itself is missing, since a misnamed folder would otherwise go
+        unnoticed and the plugin would quietly fall back to the hub.
+        """
+        folder_path = os.path.join(self.models_dir, folder)
+        if not os.path.isdir(folder_path):
+            raise FileNotFoundError(f"Model folder {folder_path} does not exist. Create it, or fix "
+                                    f"'models_folder' in the plugin's plugin.json.")
+        candidates = [entry for entry in self.models(folder) if not formats or entry["format"] in formats]
+        wanted = self.selected.get(folder)
+        if wanted:
+            for entry in candidates:
+                if entry["name"] == wanted:
+                    return entry["path"]
+            print(f"Model '{wanted}' selected for {folder} is not in {self.models_dir}; "
+                  f"using {candidates[0]['name'] if candidates else default}.", file=sys.stderr)
+        return candidates[0]["path"] if candidates else default
+
+    def entry_for(self, path: str):
+        """The indexed entry of a model path, or None if it is not under the models folder."""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.models_dir))
+        parts = relative.split(os.sep)
+        if len(parts) != 2 or parts[0] == "..":
+            return None
+        folder, name = parts
+        for entry in self.models(folder):
+            if entry["name"] == name:
+                return entry
+        return None
+
+    def content_hash(self, path: str):
+        """The sha256 of an indexed model, hashing it now if it is new or changed. None if not indexed."""
+        entry = self.entry_for(path)
+        if entry is None:
+            return None
+        if entry["sha256"] is None:
+            with span("hash model", "discovery", model=entry["name"]):
+                digest = content_hash(entry["path"])
+            folder = os.path.basename(os.path.dirname(entry["path"]))
+            with self._lock:
+                stored = self._data["folders"].get(folder, {}).get("models", {}).get(entry["name"])
+                if stored is not None and stored["signature"] == entry["signature"]:
+                    stored["sha256"] = digest
+                    self._dirty = True
+            self.save()
+            entry["sha256"] = digest
+        return entry["sha256"]
+
+    def folders(self) -> list:
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(name for name in os.listdir(self.models_dir) if os.path.isdir(os.path.join(self.models_dir, name)))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """The model registry shared by the app, the plugins and headless runs."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def format_model(entry: dict) -> str:
+    """One line describing a registry entry, e.g. 'llama-2-7b-chat.Q4_K_M.gguf (gguf, Q4_K_M, 6.7B params, 3.8 GB)'."""
+    details = [entry["format"]]
+    if entry.get("quantization"):
+        details.append(entry["quantization"])
+    if entry.get("parameters"):
+        details.append(f"{entry['parameters'] / 1e9:.1f}B params" if entry["parameters"] >= 1e8
+                       else f"{entry['parameters'] / 1e6:.0f}M params")
+    details.append(f"{entry['size_bytes'] / (1024 ** 3):.1f} GB" if entry["size_bytes"] >= 1024 ** 3
+                   else f"{entry['size_bytes'] / (1024 ** 2):.0f} MB")
+    return f"{entry['name']} ({', '.join(details)})"
+
+
+def model_label(path: str) -> str:
+    """format_model() for an indexed model; the file name or hub id for anything else."""
+    if not os.path.exists(path):
+        return path
+    entry = get_model_registry().entry_for(path)
+    return format_model(entry) if entry else os.path.basename(path)
@@ -0,0 +1,20 @@
+# core/outputs.py
+
+import os
+import re
+import time
+
+
+def unique_output_path(output_dir: str, prompt: str, extension: str, fallback: str = "output") -> str:
+    """
+    <output_dir>/<timestamp>_<prompt words><extension>, with a counter added when
+    that file already exists, so an earlier output is never overwritten.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "_", str(prompt).lower()).strip("_")[:40] or fallback
+    base = os.path.join(output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{slug}")
+    path = f"{base}{extension}"
+    counter = 1
+    while os.path.exists(path):
+        path = f"{base}_{counter}{extension}"
+        counter += 1
+    return path
@@ -0,0 +1,264 @@
+# core/pipeline.py
+
+import os
+import sys
+import json
+import time
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from core.config import PROJECT_ROOT, get_section
+from core.tracing import span
+from core.result_cache import run_inference as cached_inference
+
+# Where pipeline definitions live, and what a stage's "input" names to take the job's prompt
+PIPELINES_DIR = os.path.join(PROJECT_ROOT, "pipelines")
+PROMPT = "prompt"
+
+
+def list_pipelines() -> list:
+    """Returns the paths of the pipeline definitions in pipelines/, sorted by name."""
+    if not os.path.isdir(PIPELINES_DIR):
+        return []
+    return sorted(os.path.join(PIPELINES_DIR, name) for name in os.listdir(PIPELINES_DIR) if name.endswith(".json"))
+
+
+class Stage:
+    """One step of a pipeline: a plugin, where its input comes from, and its settings."""
+
+    def __init__(self, definition: dict, hotkey: str):
+        self.id = definition["id"]
+        self.hotkey = hotkey
+        self.input = definition.get("input", PROMPT)
+        # Optional str.format template for the input; may name {input}, {prompt} and any earlier stage
+        self.template = definition.get("template")
+        self.settings = dict(definition.get("settings", {}))
+        # A list input is run item by item unless the plugin takes the whole list at once
+        self.batch = bool(definition.get("batch", False))
+
+        self.depends_on = set() if self.input == PROMPT else {self.input}
+        if self.template:
+            fields = {field for _, field, _, _ in string.Formatter().parse(self.template) if field}
+            self.depends_on.update(fields - {"input", PROMPT})
+
+
+class Pipeline:
+    """
+    A directed acyclic graph of plugin stages, read from a JSON definition:
+
+        {
+          "name": "Imagine",
+          "stages": [
+            {"id": "expand", "plugin": "LLM", "template": "Describe a picture of: {input}"},
+            {"id": "images", "plugin": "Diffusor", "input": "expand", "settings": {"num_images": 4}},
+            {"id": "upscaled", "plugin": "Image Utilities", "input": "images", "settings": {"scale_factor": 2}},
+            {"id": "captions", "plugin": "Image Interrogator", "input": "upscaled"}
+          ],
+          "outputs": ["upscaled", "captions"]
+        }
+
+    Plugins are named by hotkey, name or model type. Stages without an "input"
+    take the job's prompt. "outputs" lists the stages whose results are saved;
+    by default, every stage no other stage consumes.
+    """
+
+    def __init__(self, definition: dict, plugin_manager, name: str = None):
+        self.name = definition.get("name") or name or "pipeline"
+        self.stages = {}
+        for stage_definition in definition.get("stages", []):
+            stage_id = stage_definition.get("id")
+            if not stage_id or stage_id in self.stages or stage_id == PROMPT:
+                raise ValueError(f"Pipeline '{self.name}': stage ids must be unique and not '{PROMPT}', got {stage_id!r}.")
+            hotkey = plugin_manager.resolve(str(stage_definition.get("plugin", "")))
+            if hotkey is None:
+                raise ValueError(f"Pipeline '{self.name}': no plugin matches '{stage_definition.get('plugin')}' "
+                                 f"(stage '{stage_id}').")
+            self.stages[stage_id] = Stage(stage_definition, hotkey)
+        if not self.stages:
+            raise ValueError(f"Pipeline '{self.name}' has no stages.")
+
+        for stage in self.stages.values():
+            unknown = stage.depends_on - set(self.stages)
+            if unknown:
+                raise ValueError(f"Pipeline '{self.name}': stage '{stage.id}' uses unknown stage(s) {sorted(unknown)}.")
+        self._check_acyclic()
+
+        consumed = set().union(*(stage.depends_on for stage in self.stages.values()))
+        self.outputs = definition.get("outputs") or [stage_id for stage_id in self.stages if stage_id not in consumed]
+        unknown = set(self.outputs) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Pipeline '{self.name}': unknown output stage(s) {sorted(unknown)}.")
+
+    @classmethod
+    def load(cls, path: str, plugin_manager) -> "Pipeline":
+        with open(path, "r") as f:
+            definition = json.load(f)
+        return cls(definition, plugin_manager, name=os.path.splitext(os.path.basename(path))[0])
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(stage_id):
+            if stage_id in done:
+                return
+            if stage_id in visiting:
+                raise ValueError(f"Pipeline '{self.name}' has a cycle through stage '{stage_id}'.")
+            visiting.add(stage_id)
+            for dependency in self.stages[stage_id].depends_on:
+                visit(dependency)
+            visiting.discard(stage_id)
+            done.add(stage_id)
+
+        for stage_id in self.stages:
+            visit(stage_id)
+
+
+class PipelineRunner:
+    """
+    Runs pipelines on plugin logic instances, handing results between stages in memory.
+
+    A stage starts as soon as the stages it depends on have finished, so
+    independent branches run concurrently on a small thread pool. Each stage
+    acquires its model from the residency manager just before it runs, which
+    loads it on first use and pins it against eviction while the stage is busy.
+    Two stages of the same plugin share one logic instance, so they take turns.
+    """
+
+    def __init__(self, residency, max_workers: int = None):
+        config = get_section("pipeline")
+        self.residency = residency
+        self.max_workers = max(1, int(max_workers or config.get("max_workers", 2)))
+        self._plugin_locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _plugin_lock(self, hotkey: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._plugin_locks.setdefault(hotkey, threading.Lock())
+
+    def run(self, pipeline: Pipeline, prompt: str, overrides: dict = None, out_dir: str = None,
+            progress_callback=None) -> dict:
+        """
+        Runs every stage and returns {"outputs": {stage_id: result}, "seconds": {stage_id: seconds}}.
+
+        overrides maps stage ids to settings merged over the definition's. With
+        out_dir, the pipeline's output stages are saved there along with a
+        pipeline.json describing the run. progress_callback(stage_id, state) is
+        called as stages start ("running") and finish ("done" or "failed").
+        """
+        overrides = overrides or {}
+        values = {PROMPT: prompt}
+        seconds = {}
+        pending = dict(pipeline.stages)
+        running = {}
+        started = time.perf_counter()
+
+        with span("run pipeline", "pipeline", pipeline=pipeline.name), \
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as pool:
+            while pending or running:
+                for stage_id, stage in list(pending.items()):
+                    if stage.depends_on.issubset(values):
+                        settings = dict(stage.settings, **overrides.get(stage_id, {}))
+                        # Each stage gets its own view of the finished results
+                        future = pool.submit(self._run_stage, pipeline, stage, dict(values), settings, progress_callback)
+                        running[future] = stage
+                        del pending[stage_id]
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    try:
+                        values[stage.id], seconds[stage.id] = future.result()
+                    except Exception as e:
+                        for other in running:
+                            other.cancel()
+                        raise RuntimeError(f"Pipeline '{pipeline.name}' failed at stage '{stage.id}': {e}") from e
+
+        outputs = {stage_id: values[stage_id] for stage_id in pipeline.stages}
+        result = {"outputs": outputs, "seconds": seconds}
+        if out_dir:
+            result["saved"] = self._save(pipeline, prompt, outputs, seconds, out_dir, time.perf_counter() - started)
+        return result
+
+    def _run_stage(self, pipeline: Pipeline, stage: Stage, values: dict, settings: dict, progress_callback):
+        if progress_callback:
+            progress_callback(stage.id, "running")
+        source = values[stage.input]
+        mapped = isinstance(source, (list, tuple)) and not stage.batch
+        items = list(source) if mapped else [source]
+
+        started = time.perf_counter()
+        try:
+            with self._plugin_lock(stage.hotkey):
+                self.residency.pin(stage.hotkey)
+                try:
+                    with span("pipeline stage", "pipeline", pipeline=pipeline.name, stage=stage.id, plugin=stage.hotkey,
+                              items=len(items)):
+                        logic = self.residency.acquire(stage.hotkey)
+                        if logic is None:
+                            raise RuntimeError(f"No logic available for plugin '{stage.hotkey}'.")
+                        outputs = [self._call(logic, stage, item, values, settings) for item in items]
+                finally:
+                    self.residency.unpin(stage.hotkey)
+        except Exception:
+            if progress_callback:
+                progress_callback(stage.id, "failed")
+            raise
+
+        if progress_callback:
+            progress_callback(stage.id, "done")
+        return (outputs if mapped else outputs[0]), time.perf_counter() - started
+
+    def _call(self, logic, stage: Stage, item, values: dict, settings: dict):
+        if stage.template:
+            text_values = {key: value for key, value in values.items() if isinstance(value, str)}
+            item = stage.template.format(**dict(text_values, input=item))
+        # Keep pipeline prompts out of the user's chat history (local LLM logic only)
+        plugin_manager = self.residency.plugin_manager
+        if hasattr(type(logic), "isolated_session"):
+            with logic.isolated_session():
+                output = cached_inference(plugin_manager, stage.hotkey, logic, item, dict(settings))
+        else:
+            output = cached_inference(plugin_manager, stage.hotkey, logic, item, dict(settings))
+        if output is None:
+            raise RuntimeError(f"Plugin '{stage.hotkey}' returned no result.")
+        return output.strip() if isinstance(output, str) else output
+
+    def _save(self, pipeline: Pipeline, prompt: str, outputs: dict, seconds: dict, out_dir: str, elapsed: float) -> dict:
+        # Imported here: the TUI only needs it once a pipeline actually saves something
+        from headless import store_output
+        from core.image_writer import get_image_writer
+
+        os.makedirs(out_dir, exist_ok=True)
+        saved = {}
+        with span("save pipeline outputs", "save", pipeline=pipeline.name):
+            for stage_id in pipeline.outputs:
+                saved[stage_id] = store_output(outputs[stage_id], out_dir, stage_id)
+            get_image_writer().flush()
+
+        summary = {
+            "pipeline": pipeline.name,
+            "prompt": prompt,
+            "seconds": round(elapsed, 3),
+            "stages": {stage_id: {"plugin": stage.hotkey, "seconds": round(seconds[stage_id], 3)}
+                       for stage_id, stage in pipeline.stages.items()},
+            "outputs": saved,
+        }
+        try:
+            with open(os.path.join(out_dir, "pipeline.json"), "w") as f:
+                json.dump(summary, f, indent=2)
+        except (IOError, TypeError) as e:
+            print(f"Failed to write pipeline summary to {out_dir}: {e}", file=sys.stderr)
+        return saved
+
+
+def default_output_dir(pipeline_name: str) -> str:
+    """A fresh folder under the configured pipeline output directory for one run."""
+    base = os.path.join(PROJECT_ROOT, get_section("pipeline").get("output_dir", "output/pipelines"))
+    path = os.path.join(base, f"{time.strftime('%Y%m%d-%H%M%S')}_{pipeline_name}")
+    counter = 1
+    unique = path
+    while os.path.exists(unique):
+        unique = f"{path}_{counter}"
+        counter += 1
+    return unique
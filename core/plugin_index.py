@@ -0,0 +1,150 @@
+# core/plugin_index.py
+
+import os
+import sys
+import json
+import hashlib
+
+from core.config import PROJECT_ROOT
+
+INDEX_VERSION = 1
+
+
+def _stat_signature(path: str):
+    """Returns (mtime_ns, size) for a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PluginIndex:
+    """
+    A compiled index of every plugin's manifest, requirements.txt hash and install state,
+    stored in a single cache file.
+
+    Entries are revalidated by mtime and size, so an unchanged tree costs one stat per
+    file: manifests are only parsed, and requirements only hashed, when they change.
+    The plugins directory itself is only listed when its own mtime changes.
+    """
+
+    def __init__(self, plugins_dir: str, cache_path: str = None):
+        self.plugins_dir = plugins_dir
+        self.cache_path = cache_path or os.path.join(PROJECT_ROOT, "cache", "plugin_index.json")
+        self._data = self._read()
+        self._dirty = False
+
+    def _read(self) -> dict:
+        empty = {"version": INDEX_VERSION, "plugins_dir": None, "dir_signature": None, "entries": {}}
+        if not os.path.exists(self.cache_path):
+            return empty
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (IOError, json.JSONDecodeError) as e:
+            print(f"Rebuilding plugin index, could not read {self.cache_path}: {e}", file=sys.stderr)
+            return empty
+        if data.get("version") != INDEX_VERSION or data.get("plugins_dir") != os.path.abspath(self.plugins_dir):
+            return empty
+        return data
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._data, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+        except IOError as e:
+            print(f"Error saving plugin index to {self.cache_path}: {e}", file=sys.stderr)
+
+    def refresh(self) -> None:
+        """Brings the index up to date with the plugins directory."""
+        entries = self._data["entries"]
+        dir_signature = _stat_signature(self.plugins_dir)
+        if dir_signature is None:
+            if entries:
+                self._data["entries"] = {}
+                self._dirty = True
+            return
+
+        if dir_signature != self._data.get("dir_signature"):
+            plugin_dirs = sorted(d for d in os.listdir(self.plugins_dir) if os.path.isdir(os.path.join(self.plugins_dir, d)))
+            for stale in set(entries) - set(plugin_dirs):
+                del entries[stale]
+            for plugin_dir in plugin_dirs:
+                entries.setdefault(plugin_dir, {})
+            self._data["plugins_dir"] = os.path.abspath(self.plugins_dir)
+            self._data["dir_signature"] = dir_signature
+            self._dirty = True
+
+        for plugin_dir, entry in entries.items():
+            self._revalidate(plugin_dir, entry)
+
+    def _revalidate(self, plugin_dir: str, entry: dict) -> None:
+        plugin_path = os.path.join(self.plugins_dir, plugin_dir)
+
+        config_file = os.path.join(plugin_path, "plugin.json")
+        signature = _stat_signature(config_file)
+        if signature != entry.get("manifest_signature"):
+            entry["manifest_signature"] = signature
+            entry["config"] = None
+            if signature is not None:
+                try:
+                    with open(config_file, "r") as f:
+                        entry["config"] = json.load(f)
+                except (IOError, json.JSONDecodeError) as e:
+                    print(f"Error loading plugin config from {config_file}: {e}", file=sys.stderr)
+            self._dirty = True
+
+        requirements_path = os.path.join(plugin_path, "requirements.txt")
+        signature = _stat_signature(requirements_path)
+        if signature != entry.get("requirements_signature"):
+            entry["requirements_signature"] = signature
+            entry["requirements_sha256"] = hash_file(requirements_path) if signature is not None else None
+            self._dirty = True
+
+    def plugins(self) -> dict:
+        """Returns {hotkey: config} for every plugin with a valid manifest, sorted by hotkey."""
+        plugins = {}
+        for plugin_dir, entry in sorted(self._data["entries"].items()):
+            config = entry.get("config")
+            if not config or not config.get("hotkey"):
+                continue
+            config = dict(config)
+            config["plugin_path"] = os.path.join(self.plugins_dir, plugin_dir)
+            config["plugin_dir"] = plugin_dir
+            plugins[config["hotkey"]] = config
+        return dict(sorted(plugins.items(), key=lambda item: int(item[0]) if item[0].isdigit() else float('inf')))
+
+    def requirements_hash(self, plugin_dir: str):
+        return self._data["entries"].get(plugin_dir, {}).get("requirements_sha256")
+
+    def installed_hash(self, plugin_dir: str):
+        return self._data["entries"].get(plugin_dir, {}).get("installed_sha256")
+
+    def needs_install(self, plugin_dir: str, deps_path: str) -> bool:
+        """True if the plugin has requirements that differ from what was last installed into deps_path."""
+        requirements_hash = self.requirements_hash(plugin_dir)
+        if requirements_hash is None:
+            return False
+        if not os.path.isdir(deps_path):
+            return True
+        return self.installed_hash(plugin_dir) != requirements_hash
+
+    def mark_installed(self, plugin_dir: str, requirements_hash: str = None) -> None:
+        entry = self._data["entries"].setdefault(plugin_dir, {})
+        entry["installed_sha256"] = requirements_hash or entry.get("requirements_sha256")
+        self._dirty = True
@@ -0,0 +1,348 @@
+# core/plugin_worker.py
+
+import os
+import sys
+import inspect
+import threading
+import traceback
+import importlib.util
+import multiprocessing
+from functools import partial
+from multiprocessing import shared_memory, resource_tracker
+
+# Outputs at least this large travel through shared memory instead of the pipe
+SHARED_MEMORY_THRESHOLD = 64 * 1024
+
+
+class SharedBuffer:
+    """A small, picklable handle to an image or array left in a shared memory block."""
+
+    def __init__(self, kind: str, name: str, shape=None, dtype=None, mode=None, size=None, info=None,
+                 palette=None):
+        self.kind = kind
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.mode = mode
+        self.size = size
+        # Image metadata (PNG text, dpi, transparency...) and, for P/PA images, (palette mode, palette bytes)
+        self.info = info
+        self.palette = palette
+
+
+def _to_shared_memory(data) -> shared_memory.SharedMemory:
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    block.buf[:len(data)] = data
+    # The parent unlinks the block once it has read it; stop this process's
+    # resource tracker from unlinking it (and warning) when the worker exits.
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return block
+
+
+def _rebuild_sequence(value, items):
+    """A list or tuple of the same type as value holding items; namedtuples take them positionally."""
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        return type(value)(*items)
+    return type(value)(items)
+
+
+def encode_result(value):
+    """Replaces large images and arrays in a result with shared memory handles."""
+    if isinstance(value, (list, tuple)):
+        return _rebuild_sequence(value, [encode_result(item) for item in value])
+    if isinstance(value, dict):
+        return {key: encode_result(item) for key, item in value.items()}
+
+    numpy = sys.modules.get("numpy")
+    if numpy is not None and isinstance(value, numpy.ndarray) and value.nbytes >= SHARED_MEMORY_THRESHOLD:
+        array = numpy.ascontiguousarray(value)
+        block = _to_shared_memory(memoryview(array).cast("B"))
+        return SharedBuffer("array", block.name, shape=array.shape, dtype=array.dtype.str)
+
+    if hasattr(value, "tobytes") and hasattr(value, "mode") and hasattr(value, "size") and callable(getattr(value, "save", None)):
+        data = value.tobytes()
+        if len(data) >= SHARED_MEMORY_THRESHOLD:
+            block = _to_shared_memory(data)
+            palette = None
+            if value.mode in ("P", "PA") and value.palette is not None:
+                palette = (value.palette.mode, bytes(value.palette.tobytes()))
+            return SharedBuffer("image", block.name, mode=value.mode, size=value.size, info=dict(value.info),
+                                palette=palette)
+    return value
+
+
+def decode_result(value):
+    """Copies shared memory handles back into images and arrays and frees the blocks."""
+    if isinstance(value, (list, tuple)):
+        return _rebuild_sequence(value, [decode_result(item) for item in value])
+    if isinstance(value, dict):
+        return {key: decode_result(item) for key, item in value.items()}
+    if not isinstance(value, SharedBuffer):
+        return value
+
+    block = shared_memory.SharedMemory(name=value.name)
+    try:
+        if value.kind == "array":
+            import numpy
+            result = numpy.ndarray(value.shape, dtype=numpy.dtype(value.dtype), buffer=block.buf).copy()
+        else:
+            from PIL import Image
+            result = Image.frombytes(value.mode, tuple(value.size), bytes(block.buf[:]))
+            if value.palette is not None:
+                result.putpalette(value.palette[1], rawmode=value.palette[0])
+            result.info.update(value.info or {})
+    finally:
+        block.close()
+        block.unlink()
+    return result
+
+
+def _worker_main(conn, plugin_path: str, logic_file: str, logic_class: str, deps_path: str,
+                 project_root: str, log_path: str) -> None:
+    """Entry point of a plugin worker process: builds the logic instance and serves calls."""
+    # Plugin output would draw over the TUI, so it goes to a log file instead
+    log_file = open(log_path, "a", buffering=1)
+    sys.stdout = sys.stderr = log_file
+    os.dup2(log_file.fileno(), 1)
+    os.dup2(log_file.fileno(), 2)
+
+    # This process only ever sees its own plugin's dependencies
+    for path in (project_root, plugin_path, deps_path):
+        if path and os.path.isdir(path) and path not in sys.path:
+            sys.path.insert(0, path)
+    os.chdir(project_root)
+
+    try:
+        spec = importlib.util.spec_from_file_location("plugin_worker_logic", os.path.join(plugin_path, logic_file))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["plugin_worker_logic"] = module
+        spec.loader.exec_module(module)
+        logic = getattr(module, logic_class)(plugin_path)
+    except Exception as e:
+        conn.send(("raise", type(e).__name__, str(e), traceback.format_exc()))
+        return
+
+    methods = [name for name, member in inspect.getmembers(logic) if callable(member) and not name.startswith("_")]
+    conn.send(("ready", methods))
+
+    # Callbacks may fire from the logic's own threads while a reply is being sent
+    send_lock = threading.Lock()
+
+    def send(message) -> None:
+        with send_lock:
+            conn.send(message)
+
+    def forward_callback(name: str, *args, **kwargs) -> None:
+        send(("callback", name, encode_result(args), encode_result(kwargs)))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+
+        op = request[0]
+        try:
+            if op == "shutdown":
+                send(("result", None))
+                return
+            elif op == "getattr":
+                send(("result", encode_result(getattr(logic, request[1]))))
+            elif op == "setattr":
+                setattr(logic, request[1], request[2])
+                send(("result", None))
+            elif op == "setcallback":
+                # The app keeps the real callable; calls to this stand-in are sent back to it
+                setattr(logic, request[1], partial(forward_callback, request[1]))
+                send(("result", None))
+            elif op == "call":
+                _, method, args, kwargs = request
+                result = getattr(logic, method)(*args, **kwargs)
+                if inspect.isgenerator(result):
+                    for item in result:
+                        send(("yield", encode_result(item)))
+                    send(("end", None))
+                else:
+                    send(("result", encode_result(result)))
+        except AttributeError as e:
+            send(("raise", "AttributeError", str(e), traceback.format_exc()))
+        except Exception as e:
+            send(("raise", type(e).__name__, str(e), traceback.format_exc()))
+
+
+class PluginWorkerError(RuntimeError):
+    """Raised in the app when a call inside a plugin worker process fails."""
+
+
+class _RemoteStream:
+    """
+    The items of a remote generator. The proxy's pipe stays reserved until the
+    stream ends, is closed, or is dropped; stopping early drains what the worker
+    still sends, so the next call starts clean. Unlike a generator function, this
+    owns the lock from the moment it is created, even if it is never iterated.
+    """
+
+    def __init__(self, proxy: "RemoteLogic", first_reply):
+        self._proxy = proxy
+        # A reply received but not yet handed out, or None to receive the next one
+        self._reply = first_reply
+        self._open = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._open:
+            raise StopIteration
+        try:
+            reply = self._reply if self._reply is not None else self._proxy._receive()
+        except BaseException:
+            # The worker ended the stream by raising; nothing is left to drain
+            self._release()
+            raise
+        self._reply = None
+        if reply[0] == "yield":
+            return decode_result(reply[1])
+        self._release()
+        raise StopIteration
+
+    def close(self) -> None:
+        if not self._open:
+            return
+        try:
+            reply = self._reply if self._reply is not None else self._proxy._receive()
+            while reply[0] == "yield":
+                # Decoding frees any shared memory the item arrived in
+                decode_result(reply[1])
+                reply = self._proxy._receive()
+        except (PluginWorkerError, AttributeError):
+            pass
+        finally:
+            self._release()
+
+    def __del__(self):
+        self.close()
+
+    def _release(self) -> None:
+        if self._open:
+            self._open = False
+            self._reply = None
+            self._proxy._lock.release()
+
+
+class RemoteLogic:
+    """
+    Stands in for a plugin's logic instance that lives in its own worker process.
+
+    Method calls and attribute reads are forwarded over a pipe. Generators are
+    streamed item by item. Large images and arrays come back through shared memory.
+    Callables assigned to the proxy (e.g. progress callbacks set by a pane) stay
+    in this process; the worker gets a stand-in that sends each call back over the
+    pipe, and the real callable runs on whichever thread is waiting on the worker.
+    Their return values are dropped, so only fire-and-forget callbacks work.
+    """
+
+    def __init__(self, hotkey: str, plugin_info: dict, deps_path: str, project_root: str):
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        log_path = os.path.join(project_root, "logs", f"plugin_{hotkey}.log")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+        process = context.Process(
+            target=_worker_main,
+            args=(child_conn, os.path.abspath(plugin_info["plugin_path"]), plugin_info["logic_file"],
+                  plugin_info["logic_class"], deps_path, project_root, log_path),
+            name=f"plugin-{hotkey}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+
+        object.__setattr__(self, "_hotkey", hotkey)
+        object.__setattr__(self, "_conn", parent_conn)
+        object.__setattr__(self, "_process", process)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_local", {})
+
+        reply = self._receive()
+        object.__setattr__(self, "_methods", set(reply[1]))
+
+    def _receive(self):
+        while True:
+            try:
+                reply = self._conn.recv()
+            except EOFError:
+                raise PluginWorkerError(f"Worker process for plugin '{self._hotkey}' exited unexpectedly.")
+            if reply[0] != "callback":
+                break
+            self._run_callback(*reply[1:])
+        if reply[0] == "raise":
+            _, error_type, message, remote_traceback = reply
+            if error_type == "AttributeError":
+                raise AttributeError(message)
+            raise PluginWorkerError(f"{error_type}: {message}\n{remote_traceback}")
+        return reply
+
+    def _run_callback(self, name: str, args, kwargs) -> None:
+        callback = self._local.get(name)
+        if callback is None:
+            return
+        try:
+            callback(*decode_result(args), **decode_result(kwargs))
+        except Exception as e:
+            # Raising here would leave the rest of the reply unread in the pipe
+            from core.tracing import get_tracer
+            get_tracer().event("plugin callback failed", "worker", plugin=self._hotkey, callback=name, error=str(e))
+
+    def _request(self, *request):
+        with self._lock:
+            self._conn.send(request)
+            return decode_result(self._receive()[1])
+
+    def _call(self, method: str, *args, **kwargs):
+        self._lock.acquire()
+        try:
+            self._conn.send(("call", method, args, kwargs))
+            reply = self._receive()
+        except BaseException:
+            self._lock.release()
+            raise
+        if reply[0] == "result":
+            self._lock.release()
+            return decode_result(reply[1])
+        if reply[0] == "end":
+            self._lock.release()
+            return iter(())
+        return _RemoteStream(self, reply)
+
+    def __getattr__(self, name: str):
+        if name in self._local:
+            return self._local[name]
+        if name in self._methods:
+            return partial(self._call, name)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._request("getattr", name)
+
+    def __setattr__(self, name: str, value) -> None:
+        if name.startswith("_"):
+            self._local[name] = value
+        elif callable(value):
+            self._local[name] = value
+            self._request("setcallback", name)
+        else:
+            self._local.pop(name, None)
+            self._request("setattr", name, value)
+
+    def shutdown(self) -> None:
+        """Stops the worker process, waiting briefly for it to exit cleanly."""
+        if not self._process.is_alive():
+            return
+        try:
+            self._request("shutdown")
+        except (PluginWorkerError, OSError, EOFError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
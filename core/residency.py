@@ -0,0 +1,187 @@
+# core/residency.py
+
+import sys
+import threading
+from collections import OrderedDict
+
+from core.config import get_section
+from core.tracing import span
+from core.weights import get_warm_cache
+
+
+def _current_ram_mb() -> float:
+    """Returns the resident set size of this process in MB, or 0 if it cannot be read."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        import resource
+        return resident_pages * resource.getpagesize() / (1024 * 1024)
+    except (IOError, ValueError, IndexError, ImportError):
+        return 0.0
+
+
+def _current_vram_mb() -> float:
+    """Returns the CUDA memory allocated by torch in MB, if torch is already imported."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0.0
+    try:
+        if torch.cuda.is_available():
+            return torch.cuda.memory_allocated() / (1024 * 1024)
+    except Exception:
+        pass
+    return 0.0
+
+
+class ModelResidencyManager:
+    """
+    Keeps several plugin logic instances loaded at once, within a RAM/VRAM budget.
+
+    Models are tracked in least-recently-used order. A model is only unloaded when
+    loading another one would push the resident total over a budget. Models kept
+    in the warm weight cache live in host memory too, so they count against the
+    RAM budget and are dropped before any loaded model is unloaded.
+    """
+
+    def __init__(self, plugin_manager, ram_budget_mb: float = None, vram_budget_mb: float = None):
+        config = get_section("residency")
+        self.plugin_manager = plugin_manager
+        self.ram_budget_mb = float(ram_budget_mb if ram_budget_mb is not None else config.get("ram_budget_mb", 0))
+        self.vram_budget_mb = float(vram_budget_mb if vram_budget_mb is not None else config.get("vram_budget_mb", 0))
+
+        # hotkey -> {"ram_mb": float, "vram_mb": float}, oldest first
+        self._resident = OrderedDict()
+        self._lock = threading.RLock()
+        # hotkey -> number of callers using the model right now; pinned models are never evicted
+        self._pins = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_resident(self, hotkey: str) -> bool:
+        # Deliberately lock-free: a membership test is atomic, and callers such as
+        # the job scheduler must not block behind a model load holding the lock.
+        return hotkey in self._resident
+
+    def acquire(self, hotkey: str):
+        """
+        Returns the logic instance for a plugin with its model loaded.
+        Blocks while loading, so call it from a worker thread.
+        """
+        with self._lock:
+            logic = self.plugin_manager.get_plugin_logic(hotkey)
+            if logic is None:
+                return None
+
+            if hotkey in self._resident:
+                self._resident.move_to_end(hotkey)
+                self.hits += 1
+                return logic
+
+            self.misses += 1
+            footprint = self._estimate_footprint(hotkey)
+            self._make_room(footprint, exclude=hotkey)
+
+            ram_before = _current_ram_mb()
+            vram_before = _current_vram_mb()
+            if hasattr(logic, "load_model"):
+                with span("load model", "model", plugin=hotkey):
+                    loaded = logic.load_model()
+                if loaded is False:
+                    print(f"Model for plugin '{hotkey}' failed to load; not marking it resident.")
+                    return logic
+
+            # Memory-mapped weights are paged in lazily, so the measured delta can
+            # undershoot; keep whichever of the estimate and the measurement is larger.
+            footprint = {
+                "ram_mb": max(footprint["ram_mb"], _current_ram_mb() - ram_before),
+                "vram_mb": max(footprint["vram_mb"], _current_vram_mb() - vram_before),
+            }
+
+            self._resident[hotkey] = footprint
+            return logic
+
+    def pin(self, hotkey: str) -> None:
+        """Keeps a model from being evicted until unpin(); pipelines pin models while stages use them."""
+        with self._lock:
+            self._pins[hotkey] = self._pins.get(hotkey, 0) + 1
+
+    def unpin(self, hotkey: str) -> None:
+        with self._lock:
+            count = self._pins.get(hotkey, 0) - 1
+            if count > 0:
+                self._pins[hotkey] = count
+            else:
+                self._pins.pop(hotkey, None)
+
+    def release(self, hotkey: str) -> None:
+        """Unloads a plugin's model immediately, regardless of the budget."""
+        with self._lock:
+            if hotkey in self._resident:
+                self._unload(hotkey)
+
+    def release_all(self) -> None:
+        with self._lock:
+            for hotkey in list(self._resident):
+                self._unload(hotkey)
+
+    def stats(self) -> dict:
+        """Returns the hit/miss/evict counters and the current resident set."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "resident": list(self._resident.keys()),
+                "ram_mb": self._total("ram_mb"),
+                "warm_mb": get_warm_cache().size_mb(),
+                "vram_mb": self._total("vram_mb"),
+                "ram_budget_mb": self.ram_budget_mb,
+                "vram_budget_mb": self.vram_budget_mb,
+            }
+
+    def _estimate_footprint(self, hotkey: str) -> dict:
+        plugin_info = self.plugin_manager.plugins.get(hotkey, {})
+        return {
+            "ram_mb": float(plugin_info.get("ram_mb", 0)),
+            "vram_mb": float(plugin_info.get("vram_mb", 0)),
+        }
+
+    def _total(self, pool: str) -> float:
+        return sum(footprint[pool] for footprint in self._resident.values())
+
+    def _ram_fits(self, footprint: dict) -> bool:
+        if not self.ram_budget_mb:
+            return True
+        return self._total("ram_mb") + get_warm_cache().size_mb() + footprint["ram_mb"] <= self.ram_budget_mb
+
+    def _fits(self, footprint: dict) -> bool:
+        if not self._ram_fits(footprint):
+            return False
+        if self.vram_budget_mb and self._total("vram_mb") + footprint["vram_mb"] > self.vram_budget_mb:
+            return False
+        return True
+
+    def _make_room(self, footprint: dict, exclude: str) -> None:
+        while not self._fits(footprint):
+            # Warm models are the cheapest to give up: nothing is using them
+            if not self._ram_fits(footprint) and get_warm_cache().drop_oldest():
+                continue
+            evictable = [hotkey for hotkey in self._resident if hotkey != exclude and hotkey not in self._pins]
+            if not evictable:
+                break
+            self._unload(evictable[0])
+            self.evictions += 1
+
+    def _unload(self, hotkey: str) -> None:
+        self._resident.pop(hotkey, None)
+        logic = self.plugin_manager.loaded_plugins.get(hotkey)
+        if logic is not None and hasattr(logic, "unload_model"):
+            try:
+                with span("unload model", "model", plugin=hotkey):
+                    logic.unload_model()
+            except Exception as e:
+                print(f"Failed to unload model for plugin '{hotkey}': {e}", file=sys.stderr)
+        print(f"Unloaded model for plugin '{hotkey}'.")
@@ -0,0 +1,394 @@
+# core/result_cache.py
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from collections.abc import Mapping
+
+from core.config import PROJECT_ROOT, get_section
+from core.tracing import get_tracer
+from core.model_registry import get_model_registry
+
+# Settings that only affect how a request is shown, never what it produces
+IGNORED_SETTINGS = {"batch_size"}
+
+# Numbers typed into an Input arrive as text; headless runs and pipelines pass them as numbers
+_NUMBER = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+
+
+def _file_fingerprint(path: str) -> str:
+    """sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _normalize(value):
+    """Makes equal settings hash equally: sorted keys, 7.0 == 7 == "7", trimmed strings."""
+    if isinstance(value, Mapping):
+        return {str(key): _normalize(item) for key, item in sorted(value.items()) if key not in IGNORED_SETTINGS}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        value = value.strip()
+        if _NUMBER.fullmatch(value):
+            return _normalize(float(value)) if any(c in value for c in ".eE") else int(value)
+        return value
+    return value
+
+
+def _input_digest(value, digest) -> bool:
+    """Feeds a request input into digest. Returns False for inputs that can't be addressed by content."""
+    if isinstance(value, str):
+        if os.path.isdir(value):
+            # Directory runs keep their own manifests; their content is not one artifact
+            return False
+        if os.path.isfile(value):
+            digest.update(b"file:" + _file_fingerprint(value).encode())
+        else:
+            digest.update(b"text:" + value.encode("utf-8"))
+        return True
+    if isinstance(value, (list, tuple)):
+        digest.update(f"list:{len(value)}".encode())
+        return all(_input_digest(item, digest) for item in value)
+    if hasattr(value, "tobytes") and hasattr(value, "mode"):
+        digest.update(f"image:{value.mode}:{value.size}".encode())
+        digest.update(value.tobytes())
+        return True
+    if hasattr(value, "tobytes") and hasattr(value, "dtype"):
+        digest.update(f"array:{value.dtype}:{value.shape}".encode())
+        digest.update(value.tobytes())
+        return True
+    return False
+
+
+def model_version(logic) -> str:
+    """The model id, plus the size and mtime of local weights so replacing them invalidates entries."""
+    model_id = getattr(logic, "model_id", None) or ""
+    model_path = getattr(logic, "model_path", None)
+    for path in (model_path, model_id):
+        # Models in the registry carry a signature over every file of a model folder. Only
+        # the signature: a content hash filled in later must not change the key of the same weights.
+        entry = get_model_registry().entry_for(path) if path and os.path.exists(path) else None
+        if entry is not None:
+            return f"{model_id}|{entry['name']}|{entry['signature']}"
+    if model_path and os.path.exists(model_path):
+        stat = os.stat(model_path)
+        return f"{model_id}|{os.path.basename(model_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return model_id
+
+
+class ResultCache:
+    """
+    A content-addressed cache of plugin results, shared by every plugin.
+
+    Entries are keyed by a sha256 over the plugin id, model id and version, the
+    request input (prompt text, or the content of an input file or image) and the
+    normalized settings. Results are stored as artifacts on disk: images as PNG
+    with their metadata, files by copy, text and JSON-friendly values inline. The
+    total size is kept under max_size_mb by evicting the least recently used
+    entries. An index in SQLite tracks sizes, access times and hit counts.
+    """
+
+    def __init__(self, root: str = None, max_size_mb: float = None, enabled: bool = None):
+        config = get_section("result_cache")
+        self.root = root or os.path.join(PROJECT_ROOT, config.get("path", "cache/results"))
+        self.max_size_bytes = int(float(max_size_mb if max_size_mb is not None else config.get("max_size_mb", 2048))
+                                  * 1024 * 1024)
+        self.enabled = bool(config.get("enabled", True) if enabled is None else enabled)
+
+        self._lock = threading.Lock()
+        self._connection = None
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use, so a disabled cache never touches the disk
+        if self._connection is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(self.root, "index.sqlite"), check_same_thread=False)
+            with self._connection:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " key TEXT PRIMARY KEY, plugin TEXT, size INTEGER, created REAL, last_access REAL,"
+                    " hits INTEGER DEFAULT 0)"
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+                )
+        return self._connection
+
+    def key_for(self, hotkey: str, plugin_info: dict, logic, prompt, settings: dict):
+        """
+        Returns the cache key for a request, or None if it must not be cached: the
+        plugin is not marked "cacheable" in its plugin.json, the request asks for a
+        random seed, or the input can't be addressed by content.
+        """
+        if not self.enabled or not plugin_info.get("cacheable", False):
+            return None
+        seed_setting = plugin_info.get("seed_setting")
+        if seed_setting:
+            try:
+                if int(settings.get(seed_setting, -1)) < 0:
+                    return None
+            except (TypeError, ValueError):
+                return None
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([hotkey, plugin_info.get("model_type"), model_version(logic)]).encode())
+        if not _input_digest(prompt, digest):
+            return None
+        digest.update(json.dumps(_normalize(settings), sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str):
+        """Returns (True, result) for a cached entry, or (False, None)."""
+        entry_dir = self._entry_dir(key)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            result = self._restore(manifest["result"], entry_dir)
+        except (IOError, OSError, ValueError, KeyError) as e:
+            if os.path.exists(manifest_path):
+                print(f"Discarding unreadable cache entry {key}: {e}", file=sys.stderr)
+                self._remove(key)
+            self._count("misses")
+            return False, None
+
+        with self._lock, self._db():
+            self._db().execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        self._count("hits")
+        return True, result
+
+    def put(self, key: str, hotkey: str, result) -> bool:
+        """Stores a result. Returns False if it holds something that can't be stored."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp{threading.get_ident()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            manifest = {"plugin": hotkey, "created": time.time(), "result": self._store(result, tmp_dir, [0])}
+        except (TypeError, IOError, OSError) as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not isinstance(e, TypeError):
+                print(f"Failed to cache result: {e}", file=sys.stderr)
+            return False
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+
+        size = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        now = time.time()
+        with self._lock, self._db():
+            self._db().execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, 0)", (key, hotkey, size, now, now))
+            self.stores += 1
+        self._evict()
+        return True
+
+    def _store(self, value, directory: str, counter: list):
+        """Writes the artifacts of a result into directory and returns a JSON description of it."""
+        if isinstance(value, (list, tuple)):
+            return {"list": [self._store(item, directory, counter) for item in value]}
+        if hasattr(value, "save") and hasattr(value, "mode"):
+            name = f"{counter[0]}.png"
+            counter[0] += 1
+            info = {key: item for key, item in value.info.items() if isinstance(item, (str, int, float, bool))}
+            value.save(os.path.join(directory, name), format="PNG")
+            return {"image": name, "info": info}
+        if hasattr(value, "dtype") and hasattr(value, "shape"):
+            import numpy as np
+
+            name = f"{counter[0]}.npy"
+            counter[0] += 1
+            np.save(os.path.join(directory, name), value)
+            return {"array": name}
+        if isinstance(value, str) and os.path.isfile(value):
+            name = f"{counter[0]}{os.path.splitext(value)[1]}"
+            counter[0] += 1
+            shutil.copy2(value, os.path.join(directory, name))
+            return {"file": name, "path": os.path.abspath(value)}
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return {"value": value}
+        if isinstance(value, dict):
+            json.dumps(value)
+            return {"value": value}
+        raise TypeError(f"cannot cache a {type(value).__name__}")
+
+    def _restore(self, description: dict, directory: str):
+        if "list" in description:
+            return [self._restore(item, directory) for item in description["list"]]
+        if "image" in description:
+            from PIL import Image
+
+            with Image.open(os.path.join(directory, description["image"])) as image:
+                image.load()
+                restored = image.copy()
+            restored.info.update(description.get("info", {}))
+            return restored
+        if "array" in description:
+            import numpy as np
+
+            return np.load(os.path.join(directory, description["array"]))
+        if "file" in description:
+            # Put the file back where the plugin wrote it, unless it is still there
+            path = description["path"]
+            artifact = os.path.join(directory, description["file"])
+            if not os.path.isfile(path) or os.path.getsize(path) != os.path.getsize(artifact):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copy2(artifact, path)
+            return path
+        return description["value"]
+
+    def _evict(self) -> None:
+        with self._lock:
+            total = self._db().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_size_bytes:
+                return
+            rows = self._db().execute("SELECT key, size FROM entries ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        with self._lock, self._db():
+            self._db().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def _count(self, name: str) -> None:
+        with self._lock, self._db():
+            setattr(self, name, getattr(self, name) + 1)
+            self._db().execute(
+                "INSERT INTO counters VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+            )
+
+    def clear(self) -> int:
+        """Deletes every entry. Returns how many there were."""
+        with self._lock, self._db():
+            keys = [row[0] for row in self._db().execute("SELECT key FROM entries")]
+            self._db().execute("DELETE FROM entries")
+            self._db().execute("DELETE FROM counters")
+        for key in keys:
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Session and lifetime hit rates, plus the entry count and size on disk."""
+        session_lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / session_lookups if session_lookups else 0.0,
+            "max_size_mb": self.max_size_bytes / (1024 * 1024),
+        }
+        if not self.enabled and self._connection is None:
+            return stats
+        with self._lock:
+            entries, size = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            counters = dict(self._db().execute("SELECT name, value FROM counters"))
+            per_plugin = dict(self._db().execute("SELECT plugin, SUM(hits) FROM entries GROUP BY plugin"))
+        lifetime_lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        stats.update({
+            "entries": entries,
+            "size_mb": size / (1024 * 1024),
+            "lifetime_hits": counters.get("hits", 0),
+            "lifetime_misses": counters.get("misses", 0),
+            "lifetime_hit_rate": counters.get("hits", 0) / lifetime_lookups if lifetime_lookups else 0.0,
+            "hits_by_plugin": per_plugin,
+        })
+        return stats
+
+    def report(self) -> str:
+        stats = self.stats()
+        if not stats["enabled"]:
+            return "Result cache: disabled."
+        lines = [
+            f"Result cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['bypassed']} not cacheable "
+            f"this run (hit rate {stats['hit_rate']:.0%})."
+        ]
+        if "entries" in stats:
+            lines.append(
+                f"  {stats['entries']} entries, {stats['size_mb']:.1f} of {stats['max_size_mb']:.0f} MB; "
+                f"lifetime hit rate {stats['lifetime_hit_rate']:.0%} "
+                f"({stats['lifetime_hits']} of {stats['lifetime_hits'] + stats['lifetime_misses']})."
+            )
+        return "\n".join(lines)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide result cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
+
+
+def disable_result_cache() -> None:
+    """Turns the cache off for this process, e.g. for --no-cache."""
+    get_result_cache().enabled = False
+
+
+def run_inference(plugin_manager, hotkey: str, logic, prompt, settings: dict):
+    """
+    logic.run_inference(prompt, settings) through the result cache.
+
+    On a hit the stored result is returned without running the model; plugins
+    with side effects (such as saving images to output_dir) get them replayed
+    through an optional logic.cached_result(result, settings) hook.
+    """
+    cache = get_result_cache()
+    plugin_info = plugin_manager.plugins.get(hotkey, {})
+    key = cache.key_for(hotkey, plugin_info, logic, prompt, settings)
+    if key is None:
+        if cache.enabled:
+            cache.bypassed += 1
+        return logic.run_inference(prompt, settings)
+
+    tracer = get_tracer()
+    with tracer.span("result cache lookup", "cache", plugin=hotkey):
+        hit, result = cache.get(key)
+    if hit:
+        tracer.event("result cache hit", "cache", plugin=hotkey)
+        if hasattr(type(logic), "cached_result"):
+            logic.cached_result(result, settings)
+        return result
+
+    result = logic.run_inference(prompt, settings)
+    if result is not None:
+        with tracer.span("result cache store", "cache", plugin=hotkey):
+            try:
+                cache.put(key, hotkey, result)
+            except Exception as e:
+                print(f"Failed to cache result for plugin '{hotkey}': {e}", file=sys.stderr)
+    return result
@@ -0,0 +1,177 @@
+# core/settings.py
+
+from collections.abc import Mapping
+
+
+class SettingsError(ValueError):
+    """A pane's widgets don't hold values its plugin's settings schema accepts."""
+
+
+def _parse_bool(raw) -> bool:
+    if isinstance(raw, bool):
+        return raw
+    text = str(raw).strip().lower()
+    if text in ("true", "yes", "on", "1"):
+        return True
+    if text in ("false", "no", "off", "0"):
+        return False
+    raise ValueError(f"expected true or false, got {raw!r}")
+
+
+def _parse_choice(raw) -> str:
+    # Radio buttons report their label: "Face Restore" -> "face_restore"
+    return str(raw).strip().lower().replace(" ", "_")
+
+
+PARSERS = {
+    "int": lambda raw: int(str(raw).strip()),
+    "float": lambda raw: float(str(raw).strip()),
+    "str": str,
+    "bool": _parse_bool,
+    "choice": _parse_choice,
+}
+
+
+class Setting:
+    """One entry of a plugin's settings schema: the key the logic reads and the widget that holds it."""
+
+    __slots__ = ("key", "widget", "type", "default", "min", "max", "choices", "_parse")
+
+    def __init__(self, definition: dict):
+        self.key = definition["key"]
+        self.widget = definition.get("widget") or f"{self.key}_input"
+        self.type = definition.get("type", "str")
+        if self.type not in PARSERS:
+            raise ValueError(f"Setting '{self.key}' has unknown type '{self.type}'.")
+        self._parse = PARSERS[self.type]
+        self.min = definition.get("min")
+        self.max = definition.get("max")
+        self.choices = tuple(definition.get("choices", ()))
+        if self.type == "choice" and not self.choices:
+            raise ValueError(f"Setting '{self.key}' is a choice without any choices.")
+        self.default = self.parse(definition["default"]) if "default" in definition else None
+
+    def parse(self, raw):
+        """Converts a widget value to this setting's type, raising ValueError if it is out of bounds."""
+        if raw is None:
+            raise ValueError("no value")
+        value = self._parse(raw)
+        if self.min is not None and value < self.min:
+            raise ValueError(f"must be at least {self.min}")
+        if self.max is not None and value > self.max:
+            raise ValueError(f"must be at most {self.max}")
+        if self.choices and value not in self.choices:
+            raise ValueError(f"must be one of {', '.join(self.choices)}")
+        return value
+
+
+class Settings(Mapping):
+    """
+    The values of one request's settings, in schema order.
+
+    Holds a shared tuple of keys and a list of values sized to the schema, so
+    building one is a single allocation. It reads like a dict (settings.get,
+    settings["seed"], dict(settings)), which is all plugin logic relies on.
+    """
+
+    __slots__ = ("_keys", "_index", "_values")
+
+    def __init__(self, keys: tuple, index: dict, values: list):
+        self._keys = keys
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"Settings({dict(self)!r})"
+
+    def __reduce__(self):
+        # Sent to plugin worker processes
+        return Settings, (self._keys, self._index, list(self._values))
+
+
+class SettingsSchema:
+    """
+    The typed settings a plugin declares in its manifest:
+
+        "settings": [
+            {"key": "num_inference_steps", "widget": "inference_steps_input", "type": "int",
+             "default": 50, "min": 1, "max": 500},
+            {"key": "upscale_type", "widget": "upscale_type_radio", "type": "choice",
+             "choices": ["upscale", "face_restore"], "default": "upscale"}
+        ]
+
+    Types are int, float, str, bool and choice; min, max and choices are checked
+    when the values are collected. The default is what a fresh Settings holds.
+    """
+
+    def __init__(self, definitions: list, plugin_name: str = "plugin"):
+        self.plugin_name = plugin_name
+        self.fields = tuple(Setting(definition) for definition in definitions or ())
+        self.keys = tuple(field.key for field in self.fields)
+        if len(set(self.keys)) != len(self.keys):
+            raise ValueError(f"Plugin '{plugin_name}' declares a setting twice.")
+        self._index = {key: position for position, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_manifest(cls, plugin_info: dict) -> "SettingsSchema":
+        return cls(plugin_info.get("settings", []), plugin_info.get("name", "plugin"))
+
+    def new(self) -> Settings:
+        """A Settings holding every default."""
+        return Settings(self.keys, self._index, [field.default for field in self.fields])
+
+    def bind(self, pane) -> "SettingsForm":
+        """Looks up the pane's widgets for every setting once; collect() then only reads them."""
+        from textual.css.query import NoMatches
+
+        widgets = []
+        missing = []
+        for field in self.fields:
+            try:
+                widgets.append(pane.query_one(f"#{field.widget}"))
+            except NoMatches:
+                missing.append(f"#{field.widget}")
+        if missing:
+            raise SettingsError(f"{self.plugin_name} pane has no widget(s) {', '.join(missing)} for its settings.")
+        return SettingsForm(self, tuple(widgets))
+
+
+def _widget_value(widget):
+    if hasattr(widget, "pressed_button"):
+        # RadioSet: the label of the pressed button, if any
+        button = widget.pressed_button
+        return button.label.plain if button is not None else None
+    return widget.value
+
+
+class SettingsForm:
+    """A schema bound to the widgets of one mounted pane."""
+
+    __slots__ = ("schema", "widgets")
+
+    def __init__(self, schema: SettingsSchema, widgets: tuple):
+        self.schema = schema
+        self.widgets = widgets
+
+    def collect(self) -> Settings:
+        """Reads and validates every setting in one pass. Raises SettingsError naming each bad field."""
+        settings = self.schema.new()
+        values = settings._values
+        errors = []
+        for position, (field, widget) in enumerate(zip(self.schema.fields, self.widgets)):
+            try:
+                values[position] = field.parse(_widget_value(widget))
+            except ValueError as e:
+                errors.append(f"{field.key}: {e}")
+        if errors:
+            raise SettingsError(f"Invalid {self.schema.plugin_name} settings: {'; '.join(errors)}")
+        return settings
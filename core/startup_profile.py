@@ -0,0 +1,45 @@
+# core/startup_profile.py
+
+import os
+import time
+
+# Reference point: the first import of this module, which main.py does before anything else
+_origin = time.perf_counter()
+_marks = []
+
+
+def _process_age_seconds():
+    """Seconds since the OS started this process (Linux only), or None if unknown."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # The command name may contain spaces, so split after its closing parenthesis
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (IOError, ValueError, IndexError, OSError):
+        return None
+
+
+# How long the interpreter ran before this module was imported
+_interpreter_seconds = _process_age_seconds()
+
+
+def mark(name: str) -> None:
+    """Records that a startup milestone was reached. The first mark of a name wins."""
+    if not any(existing == name for existing, _ in _marks):
+        _marks.append((name, time.perf_counter()))
+
+
+def report() -> str:
+    """Formats the milestones as a table of elapsed and per-step times in milliseconds."""
+    lines = ["Startup profile", f"{'milestone':<32}{'since start':>14}{'step':>12}"]
+    if _interpreter_seconds is not None:
+        lines.append(f"{'interpreter + site imports':<32}{'':>14}{_interpreter_seconds * 1000:>10.1f}ms")
+
+    previous = _origin
+    for name, timestamp in _marks:
+        lines.append(f"{name:<32}{(timestamp - _origin) * 1000:>12.1f}ms{(timestamp - previous) * 1000:>10.1f}ms")
+        previous = timestamp
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+# core/tracing.py
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+
+from core.config import PROJECT_ROOT, get_section
+
+# Chrome trace timestamps are microseconds from an arbitrary origin; ours is this import
+_origin = time.perf_counter()
+
+
+class Span:
+    """One timed stage: plugin discovery, a model load, an inference, a save, ..."""
+
+    __slots__ = ("name", "category", "start", "duration", "thread_id", "thread_name", "args", "error")
+
+    def __init__(self, name: str, category: str, args: dict):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = time.perf_counter()
+        self.duration = None
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.error = None
+
+    def to_event(self, pid: int) -> dict:
+        """The span as a Chrome trace "complete" event (or an instant event if it has no duration)."""
+        args = dict(self.args)
+        if self.error:
+            args["error"] = self.error
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "ts": (self.start - _origin) * 1e6,
+            "pid": pid,
+            "tid": self.thread_id,
+            "args": args,
+        }
+        if self.duration is None:
+            event.update(ph="i", s="t")
+        else:
+            event.update(ph="X", dur=self.duration * 1e6)
+        return event
+
+
+class Tracer:
+    """
+    Records spans into a fixed-size ring buffer.
+
+    Recording is a deque append under a lock, so spans are cheap enough to leave on
+    around every stage of a request. The buffer can be summarized per stage for the
+    metrics pane (Ctrl+T) or exported as Chrome trace JSON, which chrome://tracing
+    and https://ui.perfetto.dev open as a timeline per thread.
+    """
+
+    def __init__(self, buffer_size: int = None, enabled: bool = None, log_dir: str = None):
+        config = get_section("tracing")
+        self.enabled = bool(config.get("enabled", True) if enabled is None else enabled)
+        self.log_dir = log_dir or os.path.join(PROJECT_ROOT, config.get("log_dir", "logs"))
+        self._spans = deque(maxlen=max(1, int(buffer_size or config.get("buffer_size", 10000))))
+        self._lock = threading.Lock()
+        self._thread_names = {}
+
+    @contextmanager
+    def span(self, name: str, category: str = "app", **args):
+        """Times the enclosed block. Exceptions are recorded on the span and re-raised."""
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, category, args)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            self._record(span)
+
+    def traced(self, name: str = None, category: str = "app"):
+        """Decorator form of span(); the span is named after the function unless name is given."""
+        def decorator(function):
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, category):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add(self, name: str, category: str, start: float, duration: float, **args) -> None:
+        """Records a stage timed elsewhere, e.g. across the yields of a generator. start is perf_counter()."""
+        if self.enabled:
+            span = Span(name, category, args)
+            span.start = start
+            span.duration = duration
+            self._record(span)
+
+    def event(self, name: str, category: str = "app", **args) -> None:
+        """Records a point in time with no duration, such as a failed job."""
+        if self.enabled:
+            self._record(Span(name, category, args))
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            self._thread_names[span.thread_id] = span.thread_name
+
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def summary(self) -> list:
+        """
+        Aggregates the buffered spans per (category, name), slowest total first.
+        Each row has count, total, mean, p95 and max seconds, plus the last duration.
+        """
+        groups = {}
+        for span in self.spans():
+            if span.duration is not None:
+                groups.setdefault((span.category, span.name), []).append(span.duration)
+
+        rows = []
+        for (category, name), durations in groups.items():
+            ordered = sorted(durations)
+            rows.append({
+                "category": category,
+                "name": name,
+                "count": len(durations),
+                "total_s": sum(durations),
+                "mean_s": sum(durations) / len(durations),
+                "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max_s": ordered[-1],
+                "last_s": durations[-1],
+            })
+        rows.sort(key=lambda row: -row["total_s"])
+        return rows
+
+    def export_chrome_trace(self, path: str = None) -> str:
+        """Writes the buffered spans as Chrome trace JSON, by default to logs/trace-<time>.json."""
+        path = path or os.path.join(self.log_dir, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        pid = os.getpid()
+        spans = self.spans()
+        with self._lock:
+            thread_names = dict(self._thread_names)
+
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": thread_name}}
+                  for thread_id, thread_name in thread_names.items()]
+        events.extend(span.to_event(pid) for span in spans)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Returns the process-wide tracer, creating it on first use."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, category: str = "app", **args):
+    """Shorthand for get_tracer().span(); use as `with span("load model", "model", plugin=hotkey):`."""
+    return get_tracer().span(name, category, **args)
+
+
+def traced(name: str = None, category: str = "app"):
+    """Shorthand for get_tracer().traced()."""
+    def decorator(function):
+        return get_tracer().traced(name, category)(function)
+    return decorator
+
+
+def export_on_exit() -> None:
+    """Exports the trace at shutdown when [tracing] export_on_exit is set."""
+    tracer = get_tracer()
+    if not tracer.enabled or not get_section("tracing").get("export_on_exit", False) or not tracer.spans():
+        return
+    try:
+        print(f"Trace written to {tracer.export_chrome_trace()}")
+    except (IOError, OSError) as e:
+        print(f"Failed to write trace: {e}", file=sys.stderr)
@@ -0,0 +1,206 @@
+# core/weights.py
+
+import os
+import threading
+import importlib.util
+from collections import OrderedDict
+
+from core.config import get_section
+from core.tracing import span
+
+MB = 1024 * 1024
+
+
+def _has_safetensors(source: str) -> bool:
+    """True if a local model directory holds any .safetensors weights."""
+    for _, _, files in os.walk(source):
+        if any(name.endswith(".safetensors") for name in files):
+            return True
+    return False
+
+
+def _accelerate_available() -> bool:
+    # transformers refuses low_cpu_mem_usage without accelerate; diffusers only warns
+    try:
+        return importlib.util.find_spec("accelerate") is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def pretrained_kwargs(source: str) -> dict:
+    """
+    Keyword arguments for a diffusers or transformers from_pretrained call that
+    load weights without copying them: safetensors files are memory-mapped, so
+    tensors are backed by the page cache (shared by every load of the same files,
+    including worker processes), and low_cpu_mem_usage skips the randomly
+    initialized copy of the model that is otherwise built first.
+    """
+    config = get_section("weights")
+    kwargs = {}
+    if config.get("low_cpu_mem_usage", True) and _accelerate_available():
+        kwargs["low_cpu_mem_usage"] = True
+    # Hub ids already try safetensors first; a local folder is told to insist on them
+    if config.get("prefer_safetensors", True) and os.path.isdir(source) and _has_safetensors(source):
+        kwargs["use_safetensors"] = True
+    return kwargs
+
+
+def gguf_kwargs() -> dict:
+    """Keyword arguments for llama_cpp.Llama: map the GGUF file rather than read it, optionally locked in RAM."""
+    config = get_section("weights")
+    return {"use_mmap": bool(config.get("mmap", True)), "use_mlock": bool(config.get("mlock", False))}
+
+
+def _modules(model) -> list:
+    """The torch modules of a model, a diffusers pipeline, an object wrapping one in .model, or a tuple of those."""
+    import torch
+
+    if isinstance(model, torch.nn.Module):
+        return [model]
+    if isinstance(model, (list, tuple)):
+        return [module for item in model for module in _modules(item)]
+    components = getattr(model, "components", None)
+    if isinstance(components, dict):
+        return [component for component in components.values() if isinstance(component, torch.nn.Module)]
+    inner = getattr(model, "model", None)
+    return [inner] if isinstance(inner, torch.nn.Module) else []
+
+
+def model_size_mb(model) -> float:
+    """The size of a model's parameters and buffers in MB, wherever they live. Moves nothing."""
+    size = 0
+    for module in _modules(model):
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            size += tensor.numel() * tensor.element_size()
+    return size / MB
+
+
+def to_host(model, pin: bool = True) -> float:
+    """
+    Moves a model's weights to the CPU and returns their size in MB. With a CUDA
+    device present they are also pinned (page-locked), which lets them be copied
+    back to the GPU asynchronously and at full bus speed.
+    """
+    import torch
+
+    pin = pin and torch.cuda.is_available()
+    size = 0
+    for module in _modules(model):
+        module.to("cpu")
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            size += tensor.numel() * tensor.element_size()
+            if pin and not tensor.is_pinned():
+                tensor.data = tensor.data.pin_memory()
+    return size / MB
+
+
+class WarmCache:
+    """
+    Models that were recently unloaded, kept in host memory so loading one again
+    costs a copy to the device instead of a read from disk and a rebuild.
+
+    Entries are evicted least recently used first once their total size passes
+    [weights] warm_cache_mb. A budget of 0 turns the cache off, and unloading
+    frees the model as before.
+    """
+
+    def __init__(self, budget_mb: float = None):
+        config = get_section("weights")
+        self.budget_mb = float(budget_mb if budget_mb is not None else config.get("warm_cache_mb", 0))
+        self.pin_memory = bool(config.get("pin_memory", True))
+        # key -> (model, size in MB), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget_mb > 0
+
+    def put(self, key: str, model, size_mb: float = None) -> bool:
+        """
+        Keeps an unloaded model under key. Torch models and pipelines are moved to
+        (pinned) host memory first; anything else needs its size_mb. Returns False
+        if the cache is off or the model is larger than the whole budget, in which
+        case the model is left where it is.
+        """
+        if not self.enabled:
+            return False
+        offload = size_mb is None
+        if offload:
+            size_mb = model_size_mb(model)
+        if size_mb > self.budget_mb:
+            return False
+        if offload:
+            with span("offload to warm cache", "model", model=key):
+                to_host(model, self.pin_memory)
+        with self._lock:
+            self._entries[key] = (model, size_mb)
+            self._entries.move_to_end(key)
+            while self._size_mb() > self.budget_mb:
+                evicted, _ = self._entries.popitem(last=False)
+                print(f"Dropped '{evicted}' from the warm weight cache.")
+        return True
+
+    def take(self, key: str):
+        """Removes and returns the model kept under key, or None. The caller moves it to its device."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def drop_oldest(self) -> bool:
+        """Drops the least recently unloaded model. False if the cache was already empty."""
+        with self._lock:
+            if not self._entries:
+                return False
+            evicted, _ = self._entries.popitem(last=False)
+        print(f"Dropped '{evicted}' from the warm weight cache.")
+        return True
+
+    def size_mb(self) -> float:
+        with self._lock:
+            return self._size_mb()
+
+    def _size_mb(self) -> float:
+        return sum(size_mb for _, size_mb in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": list(self._entries),
+                "size_mb": self._size_mb(),
+                "budget_mb": self.budget_mb,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        if not self.enabled:
+            return "Warm weight cache: disabled."
+        return (f"Warm weight cache: {len(stats['entries'])} model(s), {stats['size_mb']:.0f} of "
+                f"{stats['budget_mb']:.0f} MB; {stats['hits']} warm load(s), {stats['misses']} cold.")
+
+
+_warm_cache = None
+_warm_cache_lock = threading.Lock()
+
+
+def get_warm_cache() -> WarmCache:
+    """The warm weight cache shared by every plugin in this process."""
+    global _warm_cache
+    with _warm_cache_lock:
+        if _warm_cache is None:
+            _warm_cache = WarmCache()
+        return _warm_cache
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# headless.py
+
+import os
+import sys
+import json
+import time
+import shutil
+
+from core.image_writer import get_image_writer
+from core.result_cache import get_result_cache, run_inference as cached_inference
+
+
+def read_prompts(prompts_path: str):
+    """
+    Yields (line_number, record) from a JSONL file without reading it all at once.
+    A line may be a JSON object with a "prompt" key, or a bare JSON string.
+    """
+    with open(prompts_path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_number} of {prompts_path}: {e}", file=sys.stderr)
+                continue
+            if isinstance(record, str):
+                record = {"prompt": record}
+            if not isinstance(record, dict) or "prompt" not in record:
+                print(f"Skipping line {line_number} of {prompts_path}: no 'prompt' key.", file=sys.stderr)
+                continue
+            yield line_number, record
+
+
+def _completed_ids(results_path: str) -> set:
+    completed = set()
+    if not os.path.exists(results_path):
+        return completed
+    with open(results_path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get("status") == "ok":
+                completed.add(entry.get("id"))
+    return completed
+
+
+def store_output(output, out_dir: str, record_id: str):
+    """
+    Turns a plugin result into something JSON can hold. Images are queued on the
+    shared write-behind writer next to the results file, and files a plugin
+    returns are copied there. Never moved: the path may be the request's own
+    input, or an artifact owned by the result cache.
+    """
+    if isinstance(output, (list, tuple)):
+        return [store_output(item, out_dir, f"{record_id}_{index}") for index, item in enumerate(output)]
+    if hasattr(output, "save") and hasattr(output, "size"):
+        path = get_image_writer().submit(output, os.path.join(out_dir, record_id),
+                                         metadata=getattr(output, "info", None))
+        return {"file": path}
+    if isinstance(output, str) and os.path.isfile(output):
+        path = os.path.join(out_dir, f"{record_id}_{os.path.basename(output)}")
+        shutil.copy2(output, path)
+        return {"file": path}
+    if output is None or isinstance(output, (str, int, float, bool, dict)):
+        return output
+    return repr(output)
+
+
+def run_batch(plugin_manager, hotkey: str, prompts_path: str, out_dir: str,
+              default_settings: dict = None, resume: bool = True) -> dict:
+    """
+    Streams a JSONL file of prompts through one plugin's run_inference, appending
+    a line to <out_dir>/results.jsonl as each prompt finishes. With resume on,
+    prompts whose id already finished successfully are skipped.
+    """
+    plugin_info = plugin_manager.plugins[hotkey]
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, "results.jsonl")
+    completed = _completed_ids(results_path) if resume else set()
+
+    logic = plugin_manager.get_plugin_logic(hotkey)
+    if logic is None:
+        print(f"Error: Plugin '{plugin_info['name']}' has no logic class.", file=sys.stderr)
+        return {"ok": 0, "failed": 0, "skipped": 0}
+
+    # Batch prompts are independent; keep them out of the user's saved chat session
+    if hasattr(logic, "persist_session"):
+        logic.persist_session = False
+
+    print(f"Loading model for '{plugin_info['name']}'...")
+    if hasattr(logic, "load_model") and logic.load_model() is False:
+        print(f"Error: Model for '{plugin_info['name']}' failed to load.", file=sys.stderr)
+        return {"ok": 0, "failed": 0, "skipped": 0}
+
+    summary = {"ok": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+    try:
+        with open(results_path, "a") as results:
+            for line_number, record in read_prompts(prompts_path):
+                record_id = str(record.get("id", line_number))
+                if record_id in completed:
+                    summary["skipped"] += 1
+                    continue
+
+                settings = dict(default_settings or {})
+                settings.update(record.get("settings", {}))
+                if hasattr(logic, "new_session") and not record.get("continue_session"):
+                    logic.new_session()
+
+                entry = {"id": record_id, "prompt": record["prompt"], "settings": settings}
+                item_started = time.perf_counter()
+                try:
+                    output = cached_inference(plugin_manager, hotkey, logic, record["prompt"], settings)
+                    entry["output"] = store_output(output, out_dir, record_id)
+                    entry["status"] = "ok"
+                    summary["ok"] += 1
+                except Exception as e:
+                    entry["error"] = str(e)
+                    entry["status"] = "error"
+                    summary["failed"] += 1
+                entry["seconds"] = round(time.perf_counter() - item_started, 3)
+
+                results.write(json.dumps(entry) + "\n")
+                results.flush()
+                print(f"[{record_id}] {entry['status']} in {entry['seconds']}s")
+    finally:
+        # Images are written in the background; don't report the batch done before they are on disk
+        writer = get_image_writer()
+        writer.flush()
+        if hasattr(logic, "unload_model"):
+            logic.unload_model()
+        if writer.errors:
+            print(f"Warning: {writer.errors} image(s) failed to save.", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"Finished: {summary['ok']} ok, {summary['failed']} failed, {summary['skipped']} skipped "
+          f"in {elapsed:.1f}s. Results in {results_path}")
+    print(get_result_cache().report())
+    return summary
+
+
+def run_pipeline(plugin_manager, pipeline_path: str, prompt: str, out_dir: str, overrides: dict = None) -> dict:
+    """
+    Runs one prompt through a pipeline definition and saves its outputs to out_dir.
+    Models are loaded as their stages start and all unloaded at the end.
+    """
+    # Imported here so plain batches don't pay for the pipeline machinery
+    from core.pipeline import Pipeline, PipelineRunner
+    from core.residency import ModelResidencyManager
+
+    pipeline = Pipeline.load(pipeline_path, plugin_manager)
+    residency = ModelResidencyManager(plugin_manager)
+    started = time.perf_counter()
+    try:
+        result = PipelineRunner(residency).run(
+            pipeline, prompt, overrides, out_dir=out_dir,
+            progress_callback=lambda stage_id, state: print(f"[{stage_id}] {state}"),
+        )
+    finally:
+        residency.release_all()
+
+    print(f"Pipeline '{pipeline.name}' finished in {time.perf_counter() - started:.1f}s. "
+          f"Outputs in {os.path.join(out_dir, 'pipeline.json')}")
+    print(get_result_cache().report())
+    return result
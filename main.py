@@ -3,23 +3,22 @@
 
 import os
 import sys
-import subprocess
-import importlib.util
-
-from textual.app import App, ComposeResult
-from textual.containers import Container, Vertical, Horizontal
-from textual.widgets import Header, Footer, Input, RichLog, Static, RadioSet, RadioButton, Button
-from textual import on
-from textual.worker import Worker, WorkerState
-from textual.binding import Binding
+import json
+import argparse
 
+from core import startup_profile
 from model_manager import PluginManager
-from plugins.Diffusor.image_diffusor_logic import ImageDiffusorLogic
+from core.installer import DependencyInstaller
+from core.image_writer import flush_pending_writes
+from core.tracing import traced, span, export_on_exit
+from core.result_cache import disable_result_cache
 
-def _ensure_dependencies(plugin_manager):
+@traced("check dependencies", "dependencies")
+def _ensure_dependencies(plugin_manager, hotkeys=None):
     """
     Checks for and installs dependencies for each plugin into its own folder.
     This prevents dependency version conflicts between plugins.
+    If hotkeys is given, only those plugins are checked.
     """
     dependencies_root = os.path.join(os.path.dirname(__file__), 'dependencies')
 
@@ -30,9 +29,14 @@ def _ensure_dependencies(plugin_manager):
         print("No plugins found. Skipping dependency check.")
         return
 
-    # Check and install dependencies for each plugin
+    # Check and install dependencies for each plugin. The plugin index knows the hash of
+    # every requirements.txt and what was last installed, so no directories are scanned.
+    index = plugin_manager.index
+    pending = {}
     for hotkey, plugin_info in plugins.items():
-        plugin_path = plugin_info.get("plugin_path")
+        if hotkeys is not None and hotkey not in hotkeys:
+            continue
+        plugin_dir = plugin_info.get("plugin_dir")
         model_type = plugin_info.get("model_type")
 
         # Gracefully handle missing model_type
@@ -40,223 +44,203 @@ def _ensure_dependencies(plugin_manager):
             print(f"Skipping dependency check for plugin '{plugin_info.get('name', hotkey)}' due to missing 'model_type' in plugin.json.")
             continue
 
-        requirements_path = os.path.join(plugin_path, 'requirements.txt')
-
-        if os.path.exists(requirements_path):
-            plugin_deps_path = os.path.join(dependencies_root, model_type)
-            os.makedirs(plugin_deps_path, exist_ok=True)
-
-            # Simple check to see if the folder is empty
-            if not os.listdir(plugin_deps_path):
-                print(f"Installing dependencies for '{model_type}'...")
-                try:
-                    command = [
-                        sys.executable,
-                        "-m",
-                        "pip",
-                        "install",
-                        "-t",
-                        plugin_deps_path,
-                        "-r",
-                        requirements_path
-                    ]
-
-                    subprocess.run(command, check=True)
-                    print(f"Dependencies for '{model_type}' installed successfully.")
-                except Exception as e:
-                    print(f"Error installing dependencies for '{model_type}': {e}", file=sys.stderr)
-                    sys.exit(1)
-            else:
-                print(f"Dependencies for '{model_type}' already exist. Skipping installation.")
-        else:
+        requirements_hash = index.requirements_hash(plugin_dir)
+        if requirements_hash is None:
             print(f"No requirements.txt found for '{model_type}'.")
+            continue
 
+        plugin_deps_path = os.path.join(dependencies_root, model_type)
+        if index.installed_hash(plugin_dir) is None and os.path.isdir(plugin_deps_path) and os.listdir(plugin_deps_path):
+            # Installed before the index tracked install state; trust it once
+            index.mark_installed(plugin_dir, requirements_hash)
+
+        if not index.needs_install(plugin_dir, plugin_deps_path):
+            print(f"Dependencies for '{model_type}' are up to date. Skipping installation.")
+            continue
+
+        if index.installed_hash(plugin_dir) is not None:
+            print(f"requirements.txt for '{model_type}' changed. Reinstalling dependencies...")
+        else:
+            print(f"Installing dependencies for '{model_type}'...")
+        pending[model_type] = (plugin_dir, requirements_hash, os.path.join(plugin_info.get("plugin_path"), 'requirements.txt'))
+
+    if pending:
+        # Resolve all plugins together so shared packages (torch, transformers, ...) are installed once
+        installer = DependencyInstaller(dependencies_root)
+        with span("install dependencies", "dependencies", plugins=sorted(pending)):
+            results = installer.install({model_type: entry[2] for model_type, entry in pending.items()})
+        failed = False
+        for model_type, error in results.items():
+            plugin_dir, requirements_hash, _ = pending[model_type]
+            if error:
+                print(f"Error installing dependencies for '{model_type}': {error}", file=sys.stderr)
+                failed = True
+            else:
+                index.mark_installed(plugin_dir, requirements_hash)
+                print(f"Dependencies for '{model_type}' installed successfully.")
+        index.save()
+        if failed:
+            sys.exit(1)
+        removed = installer.prune_store()
+        if removed:
+            print(f"Removed {removed} unused package(s) from the shared store.")
+
+    index.save()
+
+
+def _build_arg_parser():
+    parser = argparse.ArgumentParser(description="AI Toolkit. Starts the TUI when no command is given.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Start the TUI, exit once the first pane is ready and print a timing report.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always run the models; neither read nor write the result cache.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="Run a batch of prompts through a plugin without the TUI.")
+    run_parser.add_argument("--plugin", required=True, help="Plugin hotkey (e.g. 2) or name (e.g. Diffusor).")
+    run_parser.add_argument("--prompts", required=True, help="JSONL file with one prompt object per line.")
+    run_parser.add_argument("--out", required=True, help="Directory for results.jsonl and generated files.")
+    run_parser.add_argument("--settings", default="{}", help="JSON object of settings applied to every prompt.")
+    run_parser.add_argument("--no-resume", action="store_true", help="Rerun prompts already present in results.jsonl.")
+    run_parser.add_argument("--skip-deps-check", action="store_true", help="Do not check plugin dependencies first.")
+    run_parser.add_argument("--no-cache", action="store_true", default=argparse.SUPPRESS,
+                            help="Always run the model; neither read nor write the result cache.")
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Run a prompt through a pipeline of plugins.")
+    pipeline_parser.add_argument("--file", required=True, help="Pipeline definition, e.g. pipelines/imagine.json.")
+    pipeline_parser.add_argument("--prompt", required=True, help="Prompt fed to the pipeline's first stages.")
+    pipeline_parser.add_argument("--out", required=True, help="Directory for the saved outputs and pipeline.json.")
+    pipeline_parser.add_argument("--settings", default="{}",
+                                 help="JSON object of per-stage settings, e.g. '{\"images\": {\"seed\": 1}}'.")
+    pipeline_parser.add_argument("--skip-deps-check", action="store_true", help="Do not check plugin dependencies first.")
+    pipeline_parser.add_argument("--no-cache", action="store_true", default=argparse.SUPPRESS,
+                                 help="Always run the models; neither read nor write the result cache.")
+
+    cache_parser = subparsers.add_parser("cache", help="Show result cache statistics, or clear the cache.")
+    cache_parser.add_argument("--clear", action="store_true", help="Delete every cached result.")
+
+    models_parser = subparsers.add_parser("models", help="List the models indexed under models/.")
+    models_parser.add_argument("--folder", help="Only this folder, e.g. LLM.")
+    models_parser.add_argument("--hash", action="store_true", help="Also compute missing content hashes (slow).")
+    return parser
+
+
+def _run_cache_command(args):
+    from core.result_cache import get_result_cache
+
+    cache = get_result_cache()
+    if args.clear:
+        print(f"Removed {cache.clear()} cached result(s) from {cache.root}.")
+        return
+    stats = cache.stats()
+    print(f"Result cache at {cache.root} ({'enabled' if stats['enabled'] else 'disabled'})")
+    print(f"  {stats.get('entries', 0)} entries, {stats.get('size_mb', 0.0):.1f} of {stats['max_size_mb']:.0f} MB")
+    lookups = stats.get("lifetime_hits", 0) + stats.get("lifetime_misses", 0)
+    print(f"  Lifetime hit rate: {stats.get('lifetime_hit_rate', 0.0):.1%} ({stats.get('lifetime_hits', 0)} of {lookups})")
+    for hotkey, hits in sorted(stats.get("hits_by_plugin", {}).items()):
+        print(f"  Plugin {hotkey}: {hits or 0} hit(s) on stored entries")
+
+
+def _run_models_command(args):
+    from core.model_registry import get_model_registry, format_model
+
+    registry = get_model_registry()
+    for folder in [args.folder] if args.folder else registry.folders():
+        entries = registry.models(folder, refresh=True)
+        print(f"{folder}: {len(entries) or 'no'} model(s)")
+        for entry in entries:
+            digest = registry.content_hash(entry["path"]) if args.hash else entry["sha256"]
+            print(f"  {format_model(entry)}" + (f" sha256 {digest[:16]}" if digest else ""))
+
+
+def _run_pipeline(plugin_manager, args):
+    import headless
+    from core.pipeline import Pipeline
+
+    try:
+        overrides = json.loads(args.settings)
+        pipeline = Pipeline.load(args.file, plugin_manager)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if not args.skip_deps_check:
+        _ensure_dependencies(plugin_manager, hotkeys={stage.hotkey for stage in pipeline.stages.values()})
+
+    try:
+        headless.run_pipeline(plugin_manager, args.file, args.prompt, args.out, overrides)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        flush_pending_writes()
+        plugin_manager.shutdown()
+        export_on_exit()
+    sys.exit(0)
+
+
+def _run_headless(plugin_manager, args):
+    # Imported here so the TUI path does not pay for it, and vice versa
+    import headless
+
+    hotkey = plugin_manager.resolve(args.plugin)
+    if hotkey is None:
+        print(f"Error: No plugin matches '{args.plugin}'.", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        default_settings = json.loads(args.settings)
+    except json.JSONDecodeError as e:
+        print(f"Error: --settings is not valid JSON: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    if not args.skip_deps_check:
+        _ensure_dependencies(plugin_manager, hotkeys={hotkey})
+
+    try:
+        summary = headless.run_batch(
+            plugin_manager, hotkey, args.prompts, args.out,
+            default_settings=default_settings, resume=not args.no_resume,
+        )
+    finally:
+        plugin_manager.shutdown()
+        export_on_exit()
+    sys.exit(0 if summary["failed"] == 0 else 1)
 
-class AI_Toolkit_App(App):
-    CSS_PATH = "style.css"
-    BINDINGS = [
-        Binding("q", "quit", "Quit"),
-    ]
-
-    PANE_CLASSES = {}
-
-    def __init__(self, plugin_manager, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.plugin_manager = plugin_manager
-        self.active_plugin_info = None
-        self.active_logic = None
-        self.active_pane_id = "llm_pane"
-
-    def compose(self) -> ComposeResult:
-        with Container(id="app_container"):
-            yield Header()
-            with Container(id="main_container"):
-                yield RichLog() # Temporary placeholder for the log.
-            yield Footer()
-
-    def on_mount(self) -> None:
-        self.title = "AI Toolkit"
-        self.sub_title = "v8.10 - CSS Fixes and Transparent Background"
-        self._generate_bindings_and_panes()
-
-        first_plugin_key = next(iter(self.plugin_manager.plugins.keys()), None)
-        if first_plugin_key:
-            self.action_load_pane(first_plugin_key)
-
-    def _generate_bindings_and_panes(self):
-        # Clear existing bindings and panes to prevent duplicates
-        self.PANE_CLASSES = {}
-        new_bindings = [Binding("q", "quit", "Quit")]
-
-        for hotkey, plugin_info in self.plugin_manager.plugins.items():
-            pane_name = plugin_info["name"].lower().replace(' ', '_')
-            description = plugin_info.get("description", pane_name)
-            self.PANE_CLASSES[hotkey] = self.plugin_manager.get_plugin_tui(hotkey)
-            new_bindings.append(Binding(f"ctrl+{hotkey}", f"load_pane('{hotkey}')", description))
-
-        self.BINDINGS = new_bindings
-
-    def action_load_pane(self, hotkey: str) -> None:
-        if self.active_plugin_info and self.active_plugin_info['hotkey'] == hotkey:
-            return
-
-        PaneClass = self.PANE_CLASSES.get(hotkey)
-        if not PaneClass:
-            self.notify(f"Error: Pane for hotkey '{hotkey}' not found.", severity="error")
-            return
-
-        # Clean up the previous pane and logic
-        self._clear_main_container()
-        if self.active_logic:
-            self.unload_model_in_background(self.active_logic)
-            self.active_logic = None
-
-        # Load the new pane and logic
-        self.active_plugin_info = self.plugin_manager.plugins[hotkey]
-        self.active_logic = self.plugin_manager.get_plugin_logic(hotkey)
-        self.active_pane_id = self.active_plugin_info['name'].lower().replace(' ', '_').replace('-', '_') + "_pane"
-
-        # Pass the logic instance to the pane during initialization
-        self.query_one("#main_container").mount(PaneClass(logic=self.active_logic))
-
-        self.title = f"AI Toolkit - {self.active_plugin_info['name']}"
-
-        # Initialize the model in the background
-        if self.active_logic and hasattr(self.active_logic, 'load_model'):
-            self.run_worker(self.active_logic.load_model, exclusive=True, thread=True)
-
-    def _get_current_settings(self) -> dict:
-        """
-        Retrieves the current settings from the widgets in the active pane.
-        Returns a dictionary of settings or an empty dictionary if no settings are found.
-        """
-        settings = {}
-        active_pane = self.query_one(f"#{self.active_pane_id}")
-
-        # Check for LLM settings
-        if active_pane.query_one("#temperature_input", False):
-            try:
-                settings["temperature"] = float(active_pane.query_one("#temperature_input").value)
-                settings["top_k"] = int(active_pane.query_one("#top_k_input").value)
-                settings["top_p"] = float(active_pane.query_one("#top_p_input").value)
-                settings["max_output_tokens"] = int(active_pane.query_one("#max_output_tokens_input").value)
-            except Exception as e:
-                self.notify(f"Invalid LLM settings: {e}", severity="error")
-
-        # Check for Image Diffusor settings
-        if active_pane.query_one("#num_inference_steps_input", False):
-            try:
-                settings["num_inference_steps"] = int(active_pane.query_one("#num_inference_steps_input").value)
-                settings["guidance_scale"] = float(active_pane.query_one("#guidance_scale_input").value)
-                settings["seed"] = int(active_pane.query_one("#seed_input").value)
-            except Exception as e:
-                self.notify(f"Invalid Image Diffusor settings: {e}", severity="error")
-
-        # Check for Interrogator settings
-        if active_pane.query_one("#max_new_tokens_input", False):
-            try:
-                settings["max_new_tokens"] = int(active_pane.query_one("#max_new_tokens_input").value)
-                settings["beam_size"] = int(active_pane.query_one("#beam_size_input").value)
-            except Exception as e:
-                self.notify(f"Invalid Interrogator settings: {e}", severity="error")
-
-        # Check for Image Utilities settings
-        if active_pane.query_one("#upscale_type_radio", False):
-            try:
-                # Assuming `upscale_type_radio` is the ID of the RadioSet
-                upscale_type = active_pane.query_one("#upscale_type_radio").pressed_button.label.plain.lower().replace(" ", "_")
-                settings["upscale_type"] = upscale_type
-                settings["scale_factor"] = int(active_pane.query_one("#scale_factor_input").value)
-            except Exception as e:
-                self.notify(f"Invalid Image Utilities settings: {e}", severity="error")
-
-        # Check for Sound AI settings
-        if active_pane.query_one("#duration_input", False):
-            try:
-                settings["duration"] = int(active_pane.query_one("#duration_input").value)
-                settings["sampling_rate"] = int(active_pane.query_one("#sampling_rate_input").value)
-            except Exception as e:
-                self.notify(f"Invalid Sound AI settings: {e}", severity="error")
-
-        # Check for 3D Model settings
-        if active_pane.query_one("#3d_num_inference_steps_input", False):
-            try:
-                settings["num_inference_steps"] = int(active_pane.query_one("#3d_num_inference_steps_input").value)
-                settings["guidance_scale"] = float(active_pane.query_one("#3d_guidance_scale_input").value)
-            except Exception as e:
-                self.notify(f"Invalid 3D Model settings: {e}", severity="error")
-
-        # Check for Video Diffusor settings
-        if active_pane.query_one("#video_num_frames_input", False):
-            try:
-                settings["num_frames"] = int(active_pane.query_one("#video_num_frames_input").value)
-                settings["num_inference_steps"] = int(active_pane.query_one("#video_num_inference_steps_input").value)
-                settings["guidance_scale"] = float(active_pane.query_one("#video_guidance_scale_input").value)
-            except Exception as e:
-                self.notify(f"Invalid Video Diffusor settings: {e}", severity="error")
-
-        return settings
-
-    def _get_available_models(self, model_type: str) -> list[str]:
-        if not model_type:
-            return []
-        model_dir = os.path.join(os.getcwd(), 'models', model_type)
-        if not os.path.exists(model_dir):
-            return []
-
-        models = [d for d in os.listdir(model_dir) if os.path.isdir(os.path.join(model_dir, d))]
-        return models
-
-    def unload_model_in_background(self, logic_instance):
-        if logic_instance and hasattr(logic_instance, 'unload_model'):
-            self.run_worker(logic_instance.unload_model, exclusive=True, thread=True)
-
-    def _clear_main_container(self):
-        container = self.query_one("#main_container")
-        for child in list(container.children):
-            child.remove()
-
-    @on(Input.Submitted, "Input#input_box")
-    def on_input_submitted(self, event: Input.Submitted) -> None:
-        if not self.active_logic or not hasattr(self.active_logic, 'run_inference'):
-            self.notify("Error: No active plugin logic or run_inference method found.", severity="error")
-            return
-
-        user_prompt = event.value
-        current_settings = self._get_current_settings()
-
-        # Now pass both the prompt and the settings to the model.
-        self.run_worker(self.active_logic.run_inference, user_prompt, current_settings, exclusive=True, thread=True)
-        event.input.value = ""
-
-    def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
-        if event.state == WorkerState.SUCCESS:
-            print(f"Worker succeeded with result: {event.worker.result}")
-        elif event.state == WorkerState.ERROR:
-            print(f"Worker failed with error: {event.worker.error}")
 
 if __name__ == "__main__":
+    args = _build_arg_parser().parse_args()
+    if args.no_cache:
+        disable_result_cache()
+    if args.command == "cache":
+        _run_cache_command(args)
+        sys.exit(0)
+    if args.command == "models":
+        _run_models_command(args)
+        sys.exit(0)
     plugin_manager = PluginManager()
-    _ensure_dependencies(plugin_manager)
-    app = AI_Toolkit_App(plugin_manager)
-    app.run()
+    startup_profile.mark("plugins discovered")
+
+    if args.command == "run":
+        _run_headless(plugin_manager, args)
+    elif args.command == "pipeline":
+        _run_pipeline(plugin_manager, args)
+    else:
+        _ensure_dependencies(plugin_manager)
+        startup_profile.mark("dependencies checked")
+        from app import AI_Toolkit_App
+        startup_profile.mark("textual and app imported")
+
+        app = AI_Toolkit_App(plugin_manager, profile_startup=args.profile_startup)
+        app.run()
+        if args.profile_startup:
+            print(startup_profile.report())
+        # Unload resident models so plugins can persist state (e.g. the LLM chat session),
+        # but only once the scheduler thread is done with them
+        if not app.scheduler.stop(timeout=1):
+            print("Waiting for the running job to finish...")
+            app.scheduler.stop()
+        app.residency.release_all()
+        flush_pending_writes()
+        plugin_manager.shutdown()
+        export_on_exit()
@@ -6,43 +6,37 @@ import json
 import importlib.util
 import importlib
 import sys
+import threading
+
+from core.config import PROJECT_ROOT, get_section
+from core.plugin_index import PluginIndex
+from core.tracing import span
+from core.settings import SettingsSchema
 
 class PluginManager:
     """Manages the discovery and loading of plugins and their dependencies."""
 
     def __init__(self, plugins_dir="plugins"):
         self.plugins_dir = plugins_dir
+        self.index = PluginIndex(plugins_dir)
         self.plugins = self._discover_plugins()
         self.loaded_plugins = {}
+        self.loaded_tuis = {}
+        self.settings_schemas = {}
         self.dependencies_root = os.path.join(os.path.dirname(__file__), 'dependencies')
+        self.usage_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'plugin_usage.json')
+        # Plugins may be imported from a background thread while the UI imports another
+        self._import_lock = threading.RLock()
+        # "thread" runs plugin logic in this interpreter, "process" gives each plugin its own worker
+        self.isolation = get_section("plugins").get("isolation", "thread")
 
 
     def _discover_plugins(self):
-        plugins = {}
-        if not os.path.isdir(self.plugins_dir):
-            return plugins
-
-        # Get a list of plugin directories and sort them to ensure consistent ordering
-        plugin_dirs = [d for d in os.listdir(self.plugins_dir) if os.path.isdir(os.path.join(self.plugins_dir, d))]
-        plugin_dirs.sort()
-
-        for plugin_name in plugin_dirs:
-            plugin_path = os.path.join(self.plugins_dir, plugin_name)
-            config_file = os.path.join(plugin_path, "plugin.json")
-            if os.path.exists(config_file):
-                try:
-                    with open(config_file, "r") as f:
-                        config = json.load(f)
-                        hotkey = config.get("hotkey")
-                        if hotkey:
-                            config["plugin_path"] = plugin_path
-                            plugins[hotkey] = config
-                except (IOError, json.JSONDecodeError) as e:
-                    print(f"Error loading plugin config from {config_file}: {e}", file=sys.stderr)
-
-        # Sort the plugins by hotkey to ensure a predictable order
-        sorted_plugins = dict(sorted(plugins.items(), key=lambda item: int(item[0]) if item[0].isdigit() else float('inf')))
-        return sorted_plugins
+        """Reads plugin manifests through the cached index, parsing only the ones that changed."""
+        with span("discover plugins", "discovery"):
+            self.index.refresh()
+            self.index.save()
+            return self.index.plugins()
 
     def _add_plugin_dependencies_to_path(self, model_type: str):
         """Adds the specific plugin's dependency path to sys.path."""
@@ -56,8 +50,66 @@ class PluginManager:
         if plugin_deps_path in sys.path:
             sys.path.remove(plugin_deps_path)
 
+    def resolve(self, plugin: str):
+        """Finds a plugin by hotkey, name or model type (case-insensitive). Returns its hotkey or None."""
+        if plugin in self.plugins:
+            return plugin
+        wanted = plugin.lower().replace("_", " ")
+        for hotkey, plugin_info in self.plugins.items():
+            names = (plugin_info.get("name", ""), plugin_info.get("model_type", ""))
+            if any(name.lower().replace("_", " ") == wanted for name in names):
+                return hotkey
+        return None
+
+    def settings_schema(self, hotkey: str) -> SettingsSchema:
+        """Returns the parsed settings schema from a plugin's manifest."""
+        if hotkey not in self.settings_schemas:
+            self.settings_schemas[hotkey] = SettingsSchema.from_manifest(self.plugins[hotkey])
+        return self.settings_schemas[hotkey]
+
+    def is_plugin_imported(self, hotkey: str) -> bool:
+        """True once both the TUI and logic modules of a plugin have been imported."""
+        return hotkey in self.loaded_tuis and hotkey in self.loaded_plugins
+
+    def record_usage(self, hotkey: str):
+        """Counts how often each plugin is opened, to pick which one to pre-warm."""
+        usage = self._read_usage()
+        usage[hotkey] = usage.get(hotkey, 0) + 1
+        try:
+            os.makedirs(os.path.dirname(self.usage_path), exist_ok=True)
+            with open(self.usage_path, "w") as f:
+                json.dump(usage, f)
+        except IOError as e:
+            print(f"Error saving plugin usage to {self.usage_path}: {e}", file=sys.stderr)
+
+    def most_used_plugin(self):
+        """Returns the hotkey of the most frequently opened plugin, or None if there is no history."""
+        usage = {hotkey: count for hotkey, count in self._read_usage().items() if hotkey in self.plugins}
+        if not usage:
+            return None
+        return max(usage, key=usage.get)
+
+    def _read_usage(self) -> dict:
+        if not os.path.exists(self.usage_path):
+            return {}
+        try:
+            with open(self.usage_path, "r") as f:
+                return json.load(f)
+        except (IOError, json.JSONDecodeError):
+            return {}
+
     def get_plugin_tui(self, hotkey: str):
         """Loads and returns the TUI class for a given plugin."""
+        with self._import_lock:
+            if hotkey in self.loaded_tuis:
+                return self.loaded_tuis[hotkey]
+            with span("import pane", "import", plugin=hotkey):
+                tui_class = self._import_plugin_tui(hotkey)
+            if tui_class is not None:
+                self.loaded_tuis[hotkey] = tui_class
+            return tui_class
+
+    def _import_plugin_tui(self, hotkey: str):
         plugin_info = self.plugins.get(hotkey)
         if not plugin_info:
             return None
@@ -96,6 +148,13 @@ class PluginManager:
 
     def get_plugin_logic(self, hotkey: str):
         """Loads and returns the logic class for a given plugin."""
+        with self._import_lock:
+            if hotkey in self.loaded_plugins:
+                return self.loaded_plugins[hotkey]
+            with span("import logic", "import", plugin=hotkey):
+                return self._import_plugin_logic(hotkey)
+
+    def _import_plugin_logic(self, hotkey: str):
         plugin_info = self.plugins.get(hotkey)
         if not plugin_info:
             return None
@@ -111,6 +170,15 @@ class PluginManager:
         if not logic_file or not logic_class or not plugin_path:
             return None
 
+        if plugin_info.get("isolation", self.isolation) == "process":
+            # Imported only on demand so thread mode never pays for multiprocessing
+            from core.plugin_worker import RemoteLogic
+
+            deps_path = os.path.abspath(os.path.join(self.dependencies_root, model_type)) if model_type else None
+            logic_class_instance = RemoteLogic(hotkey, plugin_info, deps_path, PROJECT_ROOT)
+            self.loaded_plugins[hotkey] = logic_class_instance
+            return logic_class_instance
+
         # Add plugin-specific dependencies to path before import
         if model_type:
             self._add_plugin_dependencies_to_path(model_type)
@@ -127,7 +195,7 @@ class PluginManager:
         sys.modules[f"plugin_{hotkey}_logic"] = module
         spec.loader.exec_module(module)
 
-        logic_class_instance = getattr(module, logic_class)()
+        logic_class_instance = getattr(module, logic_class)(plugin_path)
         self.loaded_plugins[hotkey] = logic_class_instance
 
         # Remove plugin-specific dependencies from path after import
@@ -135,3 +203,9 @@ class PluginManager:
             self._remove_plugin_dependencies_from_path(model_type)
 
         return logic_class_instance
+
+    def shutdown(self):
+        """Stops any plugin worker processes."""
+        for logic in self.loaded_plugins.values():
+            if hasattr(type(logic), "shutdown"):
+                logic.shutdown()
@@ -5,23 +5,38 @@ import torch
 from diffusers import StableDiffusionPipeline
 from PIL import Image
 
+from core.device import get_device_policy
+from core.weights import get_warm_cache, pretrained_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+from core.outputs import unique_output_path
+
 class ThreeDModelPlugin:
     def __init__(self, plugin_path):
         self.pipe = None
-        self.model_id = "stabilityai/stable-diffusion-2-1" # Or a 3D-specific model
+        # A diffusers folder from models/<models_folder>, else the hub model (or a 3D-specific one)
+        self.model_id = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default="stabilityai/stable-diffusion-2-1", formats=("diffusers",)
+        )
         self.model_path = os.path.join(plugin_path, "models", "3d_model")
+        self.policy = get_device_policy()
+
+        # Define the base output path relative to the program's root
+        self.output_dir = os.path.abspath(os.path.join(plugin_path, '../../output/3d'))
 
     def load_model(self):
         if self.pipe is None:
-            self.pipe = StableDiffusionPipeline.from_pretrained(
-                self.model_id, torch_dtype=torch.float16
-            )
-            self.pipe.to("cuda")
+            self.pipe = get_warm_cache().take(f"3d:{self.model_id}")
+            if self.pipe is None:
+                self.pipe = StableDiffusionPipeline.from_pretrained(
+                    self.model_id, torch_dtype=self.policy.dtype, **pretrained_kwargs(self.model_id)
+                )
+            self.pipe.to(self.policy.device)
 
     def unload_model(self):
         if self.pipe is not None:
-            self.pipe = self.pipe.to("cpu")
-            torch.cuda.empty_cache()
+            get_warm_cache().put(f"3d:{self.model_id}", self.pipe)
+            self.pipe = None
+            self.policy.empty_cache()
 
     def run_inference(self, user_prompt: str, settings: dict) -> str:
         """
@@ -47,6 +62,7 @@ class ThreeDModelPlugin:
         ).images[0]
 
         # Save the generated image as a placeholder for a 3D model file
-        output_path = "generated_3d_model.png"
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_path = unique_output_path(self.output_dir, user_prompt, ".png", "model")
         image.save(output_path)
         return output_path
@@ -1,10 +1,19 @@
 # plugins/diffusor_plugin/image_diffusor_logic.py
 
 import os
+import time
+import random
 import torch
 from diffusers import StableDiffusionPipeline
 from PIL import Image
 
+from core.config import PROJECT_ROOT, get_section
+from core.device import get_device_policy
+from core.image_writer import get_image_writer
+from core.tracing import span
+from core.weights import get_warm_cache, pretrained_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+
 class ImageDiffusorLogic:
     """
     Handles the backend logic for interacting with the image diffusion model.
@@ -13,56 +22,195 @@ class ImageDiffusorLogic:
     def __init__(self, plugin_path):
         self.pipeline = None
         self.plugin_path = plugin_path
-        # Hardcoding the model ID for demonstration
-        self.model_id = "runwayml/stable-diffusion-v1-5"
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # A diffusers folder from models/<models_folder>, else the hub model
+        self.model_id = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default="runwayml/stable-diffusion-v1-5", formats=("diffusers",)
+        )
+        self.policy = get_device_policy()
+        self.device = self.policy.device
 
         # Define the base output path relative to the program's root
         self.output_dir = os.path.abspath(os.path.join(self.plugin_path, '../../output/images'))
 
+        config = get_section("diffusor")
+        self.max_batch_size = int(config.get("max_batch_size", 8))
+        # Rough memory one 512x512 image needs during denoising; scaled by pixel count
+        self.image_memory_mb = float(config.get("image_memory_mb", 1200 if self.policy.is_gpu else 2500))
+        self.last_batch_stats = None
+
+    @property
+    def _warm_key(self) -> str:
+        return f"diffusor:{self.model_id}"
+
     def load_model(self):
         print("Attempting to load image diffusion model...")
         try:
-            self.pipeline = StableDiffusionPipeline.from_pretrained(self.model_id, torch_dtype=torch.float16)
-            self.pipeline = self.pipeline.to(self.device)
+            self.pipeline = get_warm_cache().take(self._warm_key)
+            if self.pipeline is None:
+                with span("read weights", "model", model=self.model_id):
+                    self.pipeline = StableDiffusionPipeline.from_pretrained(
+                        self.model_id, torch_dtype=self.policy.dtype, **pretrained_kwargs(self.model_id)
+                    )
+            with span("move to device", "model", device=str(self.device)):
+                self.pipeline = self.pipeline.to(self.device)
             print("Image diffusion model loaded successfully.")
             return True
         except Exception as e:
             print(f"Failed to load model: {e}")
             return False
 
+    def unload_model(self):
+        """Releases the diffusion pipeline and any cached GPU memory."""
+        if self.pipeline is not None:
+            # Kept in host memory if the warm cache has room, so switching back skips the disk
+            get_warm_cache().put(self._warm_key, self.pipeline)
+            self.pipeline = None
+            self.policy.empty_cache()
+            print("Image diffusion model unloaded.")
+
     def get_model_id(self):
         """Returns the ID of the currently loaded model."""
         return self.model_id
 
-    def run_inference(self, prompt: str):
-        # ... (rest of the run_inference method remains the same)
+    def _available_memory_mb(self) -> float:
+        """Free memory on the pipeline's device, or 0 if it cannot be determined."""
+        return self.policy.free_memory_mb()
+
+    def _auto_batch_size(self, width: int, height: int) -> int:
+        """Picks how many images fit through the pipeline at once at this resolution."""
+        per_image_mb = self.image_memory_mb * (width * height) / (512 * 512)
+        available_mb = self._available_memory_mb()
+        if available_mb <= 0:
+            return 1
+        return max(1, min(self.max_batch_size, int(available_mb * 0.8 / per_image_mb)))
+
+    def run_batch(self, prompts, settings: dict) -> list:
+        """
+        Generates images for a list of prompts, `num_images` per prompt, in batches
+        sized to the memory that is free. Every image gets its own seed, counting up
+        from the requested seed (or a random one when the seed is -1), so any single
+        image can be reproduced on its own. Returns the images in request order, with
+        their generation parameters in `image.info`.
+        """
+        if not self.pipeline:
+            print("Error: No model loaded. Please load a model first.")
+            return []
+        if isinstance(prompts, str):
+            prompts = [prompts]
+
+        num_images = max(1, int(settings.get("num_images", 1)))
+        steps = int(settings.get("num_inference_steps", 50))
+        guidance_scale = float(settings.get("guidance_scale", 7.5))
+        # Stable Diffusion needs dimensions divisible by 8
+        width = int(settings.get("width", 512)) // 8 * 8
+        height = int(settings.get("height", 512)) // 8 * 8
+        negative_prompt = settings.get("negative_prompt") or None
+        base_seed = int(settings.get("seed", -1))
+        if base_seed < 0:
+            base_seed = random.randrange(2 ** 31)
+
+        requests = [(prompt, base_seed + index) for index, prompt in enumerate(p for p in prompts for _ in range(num_images))]
+        batch_size = int(settings.get("batch_size", 0)) or self._auto_batch_size(width, height)
+        print(f"Generating {len(requests)} image(s) at {width}x{height}, batch size {batch_size}...")
+
+        images = []
+        started = time.perf_counter()
+        position = 0
+        while position < len(requests):
+            batch = requests[position:position + batch_size]
+            try:
+                with span("denoise batch", "inference", images=len(batch), steps=steps, size=f"{width}x{height}"):
+                    output = self.pipeline(
+                        prompt=[prompt for prompt, _ in batch],
+                        negative_prompt=[negative_prompt] * len(batch) if negative_prompt else None,
+                        num_inference_steps=steps,
+                        guidance_scale=guidance_scale,
+                        width=width,
+                        height=height,
+                        # CPU generators give the same image for a seed on any device
+                        generator=[torch.Generator(device="cpu").manual_seed(seed) for _, seed in batch],
+                    )
+            except RuntimeError as e:
+                # torch.cuda.OutOfMemoryError and CPU allocation failures are both RuntimeErrors
+                message = str(e).lower()
+                if batch_size > 1 and ("out of memory" in message or "can't allocate memory" in message):
+                    batch_size //= 2
+                    self.policy.empty_cache()
+                    print(f"Out of memory; retrying with batch size {batch_size}.")
+                    continue
+                raise
+
+            for image, (prompt, seed) in zip(output.images, batch):
+                image.info.update({
+                    "prompt": prompt,
+                    "negative_prompt": negative_prompt or "",
+                    "seed": seed,
+                    "steps": steps,
+                    "guidance_scale": guidance_scale,
+                    "model": self.model_id,
+                })
+                images.append(image)
+            position += len(batch)
+
+        elapsed = time.perf_counter() - started
+        self.last_batch_stats = {
+            "images": len(images),
+            "seconds": elapsed,
+            "batch_size": batch_size,
+            "images_per_minute": len(images) * 60 / elapsed if elapsed > 0 else 0.0,
+        }
+        print(f"Generated {len(images)} image(s) in {elapsed:.1f}s "
+              f"({self.last_batch_stats['images_per_minute']:.2f} images/minute).")
+        return images
+
+    def run_inference(self, prompt: str, settings: dict = None):
+        """Generates the images for one prompt. Returns a single image, or a list when num_images > 1."""
         if not self.pipeline:
             print("Error: No model loaded. Please load a model first.")
             return None
 
         print(f"Running inference for prompt: '{prompt}'")
+        settings = settings or {}
         try:
-            image = self.pipeline(prompt).images[0]
+            images = self.run_batch([prompt], settings)
             print("Image generated successfully.")
-            return image
+            self._save_outputs(images, settings)
+            return images[0] if len(images) == 1 else images
         except Exception as e:
             print(f"An error occurred during inference: {e}")
             return None
 
-    def save_image(self, image: Image, filename: str):
-        # ... (rest of the save_image method remains the same)
+    def _save_outputs(self, images: list, settings: dict) -> None:
+        if settings.get("output_dir"):
+            for image in images:
+                self.save_image(image, f"{time.strftime('%Y%m%d-%H%M%S')}_{image.info['seed']}.png",
+                                output_dir=settings["output_dir"])
+
+    def cached_result(self, result, settings: dict) -> None:
+        """Called with a result served from the result cache; saves it as a fresh run would."""
+        self._save_outputs(result if isinstance(result, list) else [result], settings)
+
+    def save_image(self, image: Image, filename: str, output_dir: str = None):
+        """
+        Queues an image to be written in the background, with its generation
+        parameters embedded. Returns the path it will be written to, or None; a
+        counter is added to the name rather than overwriting an earlier image.
+        Only blocks if the writer has fallen too far behind.
+        """
         if not image:
-            return False
+            return None
+        output_dir = output_dir or self.output_dir
+        if not os.path.isabs(output_dir):
+            output_dir = os.path.join(PROJECT_ROOT, output_dir)
         try:
-            full_path = os.path.join(self.output_dir, filename)
-            if not os.path.exists(self.output_dir):
-                os.makedirs(self.output_dir)
-                print(f"Created directory: {self.output_dir}")
-
-            image.save(full_path)
-            print(f"Image saved to {full_path}")
-            return True
+            full_path = get_image_writer().submit(image, os.path.join(output_dir, filename), metadata=image.info,
+                                                    unique=True)
+            print(f"Queued image for saving to {full_path}")
+            return full_path
         except Exception as e:
             print(f"Failed to save image: {e}")
-            return False
+            return None
+
+    def wait_for_writes(self, timeout: float = None) -> bool:
+        """Blocks until every queued image is on disk. Returns False on timeout."""
+        return get_image_writer().flush(timeout)
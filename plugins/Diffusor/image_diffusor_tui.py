@@ -7,6 +7,8 @@ from textual import on
 import math
 from typing import TYPE_CHECKING
 
+from core.model_registry import model_label
+
 if TYPE_CHECKING:
     from .image_diffusor_logic import ImageDiffusorLogic
 
@@ -62,6 +64,9 @@ class ImageDiffusorPane(Container):
                 with Vertical(classes="param-group"):
                     yield Static("Seed:", classes="setting_label")
                     yield Input(value="-1", id="seed_input", classes="setting_input_small")
+                with Vertical(classes="param-group"):
+                    yield Static("Images:", classes="setting_label")
+                    yield Input(value="1", id="num_images_input", classes="setting_input_small")
 
             with Horizontal(classes="param-row"):
                 with Vertical(classes="param-group"):
@@ -121,6 +126,7 @@ class ImageDiffusorPane(Container):
         # Only try to set dimensions if the logic object is available and has the method
         if self.logic and hasattr(self.logic, 'get_model_id'):
             self._set_default_dimensions_from_model()
+            self.query_one("#model_info_static", Static).update(f"Model: {model_label(self.logic.get_model_id())}")
         else:
             # Set a default size if the model isn't ready yet
             self.query_one("#width_input", Input).value = "512"
@@ -0,0 +1,90 @@
+# plugins/interregator_plugin/caption_cache.py
+
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+
+class CaptionCache:
+    """
+    Persistent captions in SQLite, keyed by (image content hash, model id, settings).
+
+    File hashes are themselves cached against each path's mtime and size, so a
+    rerun over an unchanged folder only stats the files: nothing is read or
+    hashed, and only new or changed images reach the model.
+    """
+
+    def __init__(self, db_path: str):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # The logic may be used from the scheduler thread and from pane workers
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS captions ("
+                " content_hash TEXT, model_id TEXT, settings TEXT, caption TEXT,"
+                " PRIMARY KEY (content_hash, model_id, settings))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                " path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, content_hash TEXT)"
+            )
+
+    @staticmethod
+    def settings_key(settings: dict) -> str:
+        return json.dumps(settings, sort_keys=True)
+
+    def content_hash(self, path: str) -> str:
+        """sha256 of a file, reusing the stored hash while its mtime and size are unchanged."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT mtime_ns, size, content_hash FROM file_hashes WHERE path = ?", (path,)
+            ).fetchone()
+        if row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        content_hash = digest.hexdigest()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, content_hash),
+            )
+        return content_hash
+
+    def get_many(self, content_hashes, model_id: str, settings_key: str) -> dict:
+        """Returns {content_hash: caption} for the hashes that are cached."""
+        found = {}
+        content_hashes = list(content_hashes)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(content_hashes), 500):
+                chunk = content_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT content_hash, caption FROM captions WHERE model_id = ? AND settings = ?"
+                    f" AND content_hash IN ({placeholders})",
+                    (model_id, settings_key, *chunk),
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, captions: dict, model_id: str, settings_key: str) -> None:
+        """Stores {content_hash: caption} in one transaction."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO captions VALUES (?, ?, ?, ?)",
+                [(content_hash, model_id, settings_key, caption) for content_hash, caption in captions.items()],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
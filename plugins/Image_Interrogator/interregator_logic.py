@@ -2,48 +2,172 @@
 
 import os
 import torch
+from concurrent.futures import ThreadPoolExecutor
 from transformers import ViTForImageClassification, ViTImageProcessor
 from PIL import Image
 
+from core.config import PROJECT_ROOT, get_section
+from core.device import get_device_policy
+from core.tracing import span
+from core.weights import get_warm_cache, pretrained_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+from core.result_cache import model_version
+from caption_cache import CaptionCache
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+
+def _decode(path: str) -> Image.Image:
+    with span("decode image", "preprocess", path=os.path.basename(path)), Image.open(path) as image:
+        return image.convert("RGB")
+
+
 class InterrogatorPlugin:
     def __init__(self, plugin_path):
         self.model = None
         self.processor = None
-        self.model_path = os.path.join(plugin_path, "models", "vit-base-patch16-224")
+        # A transformers folder from models/<models_folder>, else the plugin's own copy
+        self.model_path = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default=os.path.join(plugin_path, "models", "vit-base-patch16-224"),
+            formats=("transformers",)
+        )
+        self.model_id = os.path.basename(self.model_path)
+        self.policy = get_device_policy()
+        self.device = self.policy.device
+        self.dtype = self.policy.dtype
+
+        config = get_section("interrogator")
+        self.batch_size = max(1, int(config.get("batch_size", 16)))
+        self.decode_workers = max(1, int(config.get("decode_workers", 4)))
+        self.cache = CaptionCache(os.path.join(PROJECT_ROOT, config.get("cache_path", "cache/captions.sqlite")))
+        # Set by the pane; called with (images_done, images_total) while a batch is captioned
+        self.progress_callback = None
 
     def load_model(self):
         if self.model is None or self.processor is None:
+            warm = get_warm_cache().take(f"interrogator:{self.model_path}")
+            if warm is not None:
+                self.processor, self.model = warm
+                # Already quantized, or in the policy's dtype; only the device is left
+                if not self.policy.quantize_cpu:
+                    self.model.to(self.device)
+                return
             self.processor = ViTImageProcessor.from_pretrained(self.model_path)
-            self.model = ViTForImageClassification.from_pretrained(self.model_path)
-            self.model.to("cuda")
+            self.model = ViTForImageClassification.from_pretrained(self.model_path, **pretrained_kwargs(self.model_path))
+            self.model.eval()
+            if self.policy.quantize_cpu:
+                self.model = self.policy.quantize(self.model)
+                self.dtype = torch.float32
+            else:
+                self.model.to(self.device, dtype=self.policy.dtype)
+                self.dtype = self.policy.dtype
 
     def unload_model(self):
-        self.model = self.model.to("cpu")
-        torch.cuda.empty_cache()
+        if self.model is not None:
+            get_warm_cache().put(f"interrogator:{self.model_path}", (self.processor, self.model))
+            self.model = None
+            self.processor = None
+            self.policy.empty_cache()
+
+    def _caption_settings(self, settings: dict) -> dict:
+        """The settings that change a caption; also part of the cache key."""
+        if self.model.can_generate():
+            return {"max_new_tokens": int(settings.get("max_new_tokens", 128)),
+                    "beam_size": int(settings.get("beam_size", 1))}
+        return {"top_k": int(settings.get("top_k", 5))}
 
-    def run_inference(self, image: Image.Image, settings: dict) -> str:
+    def _cache_model_key(self) -> str:
         """
-        Runs image-to-text inference with user-defined settings.
+        Identifies the weights in the caption cache: the full model path plus its
+        registry signature (or size and mtime), so two folders with the same name,
+        or replaced weights, never share captions.
+        """
+        return f"{os.path.abspath(self.model_path)}|{model_version(self)}"
 
-        Args:
-            image (Image.Image): The input image.
-            settings (dict): A dictionary of user-defined settings.
+    def _caption_images(self, images: list, caption_settings: dict) -> list:
+        """Captions one batch of images. The processor resizes and pads them to one tensor shape."""
+        with span("prepare inputs", "preprocess", images=len(images)):
+            inputs = self.processor(images=images, return_tensors="pt").to(self.device, dtype=self.dtype)
+        with span("caption batch", "inference", images=len(images)), torch.no_grad():
+            if self.model.can_generate():
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=caption_settings["max_new_tokens"],
+                    num_beams=caption_settings["beam_size"]
+                )
+                return self.processor.batch_decode(outputs, skip_special_tokens=True)
+
+            # Classifiers such as ViT cannot generate text; describe the image by its top labels instead
+            logits = self.model(**inputs).logits
+            top_k = min(caption_settings["top_k"], logits.shape[-1])
+            indices = logits.topk(top_k, dim=-1).indices.cpu().tolist()
+            labels = self.model.config.id2label
+            return [", ".join(labels[index] for index in row) for row in indices]
+
+    def caption_batch(self, image_paths: list, settings: dict) -> dict:
+        """
+        Captions many image files and returns {path: caption}.
+
+        Captions are cached by image content, model and settings, so only new or
+        changed images are decoded and run through the model. Those are decoded on
+        a thread pool while the previous batch is on the model.
         """
         if self.model is None or self.processor is None:
             raise ValueError("Model and processor are not loaded.")
 
-        # Get settings with default values
-        max_new_tokens = settings.get("max_new_tokens", 128)
-        beam_size = settings.get("beam_size", 1)
+        caption_settings = self._caption_settings(settings)
+        settings_key = CaptionCache.settings_key(caption_settings)
+        model_key = self._cache_model_key()
 
-        inputs = self.processor(images=image, return_tensors="pt").to("cuda")
+        with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="interrogator-decode") as pool:
+            with span("look up cached captions", "preprocess", images=len(image_paths)):
+                hashes = dict(zip(image_paths, pool.map(self.cache.content_hash, image_paths)))
+                captions = self.cache.get_many(set(hashes.values()), model_key, settings_key)
 
-        # Run inference with the provided settings
-        outputs = self.model.generate(
-            **inputs,
-            max_new_tokens=max_new_tokens,
-            num_beams=beam_size
-        )
+            # Identical files share one computation
+            pending = {}
+            for path, content_hash in hashes.items():
+                if content_hash not in captions:
+                    pending.setdefault(content_hash, path)
+            todo = list(pending.items())
+            total = len(todo)
+            print(f"Captioning {len(image_paths)} image(s): {len(image_paths) - total} cached, {total} to compute.")
+
+            batches = [todo[start:start + self.batch_size] for start in range(0, total, self.batch_size)]
+            next_images = [pool.submit(_decode, path) for _, path in batches[0]] if batches else []
+            for index, batch in enumerate(batches):
+                images = [future.result() for future in next_images]
+                # Start decoding the next batch before running this one
+                if index + 1 < len(batches):
+                    next_images = [pool.submit(_decode, path) for _, path in batches[index + 1]]
+                results = dict(zip((content_hash for content_hash, _ in batch),
+                                   self._caption_images(images, caption_settings)))
+                self.cache.put_many(results, model_key, settings_key)
+                captions.update(results)
+                if self.progress_callback:
+                    self.progress_callback(min((index + 1) * self.batch_size, total), total)
+
+        return {path: captions[content_hash] for path, content_hash in hashes.items()}
+
+    def run_inference(self, image, settings: dict):
+        """
+        Runs image-to-text inference with user-defined settings.
+
+        Args:
+            image: A PIL image, an image file path, a directory of images, or a list of paths.
+            settings (dict): A dictionary of user-defined settings.
+
+        Returns a caption for a single image, or {path: caption} for a directory or list.
+        """
+        if self.model is None or self.processor is None:
+            raise ValueError("Model and processor are not loaded.")
 
-        caption = self.processor.decode(outputs[0], skip_special_tokens=True)
-        return caption
+        if isinstance(image, Image.Image):
+            return self._caption_images([image.convert("RGB")], self._caption_settings(settings))[0]
+        if isinstance(image, (list, tuple)):
+            return self.caption_batch(list(image), settings)
+        if os.path.isdir(image):
+            paths = sorted(os.path.join(image, name) for name in os.listdir(image)
+                           if name.lower().endswith(IMAGE_EXTENSIONS))
+            return self.caption_batch(paths, settings)
+        return self.caption_batch([image], settings)[image]
@@ -1,16 +1,20 @@
 # interregator_tui.py
 
 from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Static, Input, RichLog, Button, Select
+from textual.widgets import Static, Input, RichLog, Button, Select, ProgressBar
 from textual.app import ComposeResult
 from textual import on
 import os
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING
+
+from core.jobs import Job
+from core.settings import SettingsError
+from core.file_scanner import ImageDirectoryMixin
 
 if TYPE_CHECKING:
     from .interregator_logic import InterregatorLogic
 
-class InterrogatorPane(Container):
+class InterrogatorPane(ImageDirectoryMixin, Container):
     """The TUI pane for the Image-to-Text Interrogator."""
     DEFAULT_CSS = """
     #main_layout {
@@ -41,6 +45,13 @@ class InterrogatorPane(Container):
     #text_output {
         height: 1fr;
     }
+    #caption_progress {
+        margin-bottom: 1;
+    }
+    #input_image_box {
+        height: auto;
+        border: solid dodgerblue;
+    }
     """
     def __init__(self, logic: "InterregatorLogic", **kwargs):
         super().__init__(**kwargs)
@@ -59,10 +70,13 @@ class InterrogatorPane(Container):
                 yield Button("Load Directory", id="load_directory_button", classes="action_button")
                 yield Static("\n[b]Select Image[/b]", classes="box_header")
                 yield Select([], id="image_select", classes="setting_input")
+                with Container(id="input_image_box", classes="image_box"):
+                    yield Static("Select an image to preview it.", id="image_preview")
 
             # Second Column: Generated Caption Output
             with Vertical(id="output_panel", classes="output-box"):
                 yield Static("[b]Generated Caption[/b]", classes="box_header")
+                yield ProgressBar(id="caption_progress", show_eta=False)
                 yield RichLog(id="text_output", wrap=True)
 
             # Third Column: Settings
@@ -72,32 +86,63 @@ class InterrogatorPane(Container):
                 yield Input(value="128", id="max_new_tokens_input", classes="setting_input")
                 yield Static("Beam Size:", classes="setting_label")
                 yield Input(value="1", id="beam_size_input", classes="setting_input")
+                yield Button("Caption Selected", id="caption_selected_button", classes="action_button")
+                yield Button("Caption Directory", id="caption_directory_button", classes="action_button")
 
     @on(Button.Pressed, "#load_directory_button")
     def on_load_directory_button_pressed(self, event: Button.Pressed) -> None:
-        """Loads a list of image files from the specified directory and populates the Select widget."""
-        directory_path = self.query_one("#directory_path_input", Input).value
+        """Scans the directory in the background, filling the Select widget as files are found."""
+        self.load_image_directory()
 
-        if not os.path.isdir(directory_path):
-            self.notify(f"Error: Directory not found: {directory_path}", severity="error")
+    @on(Select.Changed, "#image_select")
+    def on_image_selected(self, event: Select.Changed) -> None:
+        """Shows a preview of the selected file in the input image box."""
+        if event.value is None or event.value == Select.BLANK:
             return
+        self.show_image_preview(event.value)
 
-        try:
-            image_extensions = (".png", ".jpg", ".jpeg")
-            image_files: List[str] = [
-                f for f in os.listdir(directory_path)
-                if os.path.isfile(os.path.join(directory_path, f)) and f.lower().endswith(image_extensions)
-            ]
+    def on_mount(self) -> None:
+        if self.logic is not None:
+            self.logic.progress_callback = self._report_progress_threadsafe
 
-            options = [(file, file) for file in image_files]
+    def _report_progress(self, done: int, total: int) -> None:
+        self.query_one("#caption_progress", ProgressBar).update(total=total, progress=done)
 
-            self.query_one("#image_select", Select).set_options(options)
-            self.notify(f"Loaded {len(image_files)} image(s) from {directory_path}", severity="information")
+    def _run_captions(self, logic, job: Job) -> dict:
+        """Job runner: captions a file or a whole directory and writes the results to the log."""
+        result = logic.run_inference(job.prompt, job.settings)
+        captions = result if isinstance(result, dict) else {job.prompt: result}
+        self._call_if_attached(self._show_captions, captions)
+        return captions
 
-        except Exception as e:
-            self.notify(f"Failed to read directory: {e}", severity="error")
+    def _show_captions(self, captions: dict) -> None:
+        text_output = self.query_one("#text_output", RichLog)
+        for path, caption in captions.items():
+            text_output.write(f"[b]{os.path.basename(path)}[/b]: {caption}")
 
-    @on(Select.Changed, "#image_select")
-    def on_image_selected(self, event: Select.Changed) -> None:
-        """Placeholder for handling when a file is selected from the list."""
-        self.notify(f"Image selected: {event.value}")
+    def _submit(self, path: str, description: str) -> None:
+        try:
+            settings = self.app.collect_settings()
+        except SettingsError as e:
+            self.notify(str(e), severity="error")
+            return
+        hotkey = self.app.active_plugin_info["hotkey"]
+        job = self.app.scheduler.submit(Job(hotkey, path, settings, runner=self._run_captions, description=description))
+        self.notify(f"Queued job {job.id}: {description}")
+
+    @on(Button.Pressed, "#caption_selected_button")
+    def on_caption_selected_button_pressed(self, event: Button.Pressed) -> None:
+        selected = self.query_one("#image_select", Select).value
+        if selected is None or selected == Select.BLANK:
+            self.notify("Select an image first.", severity="warning")
+            return
+        directory_path = self.query_one("#directory_path_input", Input).value
+        self._submit(os.path.join(directory_path, selected), f"caption {selected}")
+
+    @on(Button.Pressed, "#caption_directory_button")
+    def on_caption_directory_button_pressed(self, event: Button.Pressed) -> None:
+        directory_path = self.query_one("#directory_path_input", Input).value
+        if not os.path.isdir(directory_path):
+            self.notify(f"Error: Directory not found: {directory_path}", severity="error")
+            return
+        self._submit(directory_path, f"caption directory {directory_path}")
@@ -0,0 +1,74 @@
+# plugins/image_utilities_plugin/image_utilities_batch.py
+
+import os
+import sys
+import json
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+MANIFEST_NAME = ".upscale_manifest.json"
+
+
+def output_name(image_name: str, scale_factor, upscale_type: str = "upscale") -> str:
+    """Per-file output name, e.g. photo.jpg -> photo_x4.png; PNG keeps upscales lossless."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    suffix = f"x{scale_factor:g}" if upscale_type == "upscale" else upscale_type
+    return f"{stem}_{suffix}.png"
+
+
+def list_images(input_dir: str) -> list:
+    """Image files directly inside input_dir, sorted by name."""
+    with os.scandir(input_dir) as entries:
+        return sorted(entry.name for entry in entries
+                      if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class UpscaleManifest:
+    """
+    Records which files of a directory batch are finished, in <output_dir>/.upscale_manifest.json.
+
+    An entry remembers the source's mtime and size and the settings used, so a
+    rerun skips files that are done and redoes the ones that changed. The file is
+    rewritten atomically after every image, so an interrupted run loses at most
+    the image that was in flight.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f).get("files", {})
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _source_signature(source_path: str) -> list:
+        stat = os.stat(source_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def is_up_to_date(self, source_path: str, output_path: str, settings: dict) -> bool:
+        """True if output_path exists and was made from this version of the source with these settings."""
+        if not os.path.exists(output_path):
+            return False
+        entry = self.entries.get(os.path.basename(source_path))
+        if entry is None:
+            # Not produced by a tracked run; trust it if it is newer than its source, like make would
+            return os.stat(output_path).st_mtime_ns >= os.stat(source_path).st_mtime_ns
+        return (entry.get("source") == self._source_signature(source_path)
+                and entry.get("settings") == settings
+                and entry.get("output") == os.path.basename(output_path))
+
+    def record(self, source_path: str, output_path: str, settings: dict) -> None:
+        self.entries[os.path.basename(source_path)] = {
+            "source": self._source_signature(source_path),
+            "settings": settings,
+            "output": os.path.basename(output_path),
+        }
+        self.save()
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
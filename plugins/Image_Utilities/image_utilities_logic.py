@@ -1,20 +1,54 @@
 # plugins/image_utilities_plugin/image_utilities_logic.py
 
 import os
+import queue
+import shutil
+import tempfile
+import threading
 import torch
 import cv2
 import numpy as np
 from basicsr.archs.rrdbnet_arch import RRDBNet
 from realesrgan import RealESRGANer
-from realesrgan.utils import imwrite
+
+from core.config import PROJECT_ROOT, get_section
+from core.device import get_device_policy
+from core.tracing import span
+from core.weights import get_warm_cache
+from core.model_registry import get_model_registry, plugin_models_folder
+from image_utilities_tiling import TiledUpscaler, choose_tile_size, decode_to_memmap
+from image_utilities_batch import UpscaleManifest, list_images, output_name
 
 class ImageUtilitiesPlugin:
     def __init__(self, plugin_path):
         self.upsampler = None
-        self.model_path = os.path.join(plugin_path, "models", "RealESRGAN_x4plus.pth")
+        # Real-ESRGAN weights from models/<models_folder>, or the ones bundled with the plugin
+        self.model_path = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default=os.path.join(plugin_path, "models", "RealESRGAN_x4plus.pth"),
+            formats=("pytorch",)
+        )
+        # Define the base output path relative to the program's root
+        self.output_dir = os.path.abspath(os.path.join(plugin_path, '../../output/upscaled'))
+        self.policy = get_device_policy()
+        self.device = self.policy.device
+
+        config = get_section("upscaler")
+        self.memory_budget_mb = float(config.get("memory_budget_mb", 0))
+        self.tile_overlap = int(config.get("tile_overlap", 16))
+        self.tile_pad = int(config.get("tile_pad", 10))
+        self.max_tile_size = int(config.get("max_tile_size", 1024))
+        self.workers = int(config.get("workers", 2))
+        # Set by the pane; called with (tiles_done, tiles_total) as the upscale progresses
+        self.progress_callback = None
+        # Set by the pane; called with (files_done, files_total, file_name) during a directory batch
+        self.batch_progress_callback = None
 
     def load_model(self):
         if self.upsampler is None:
+            self.upsampler = get_warm_cache().take(f"upscaler:{self.model_path}")
+            if self.upsampler is not None:
+                self.upsampler.model.to(self.device)
+                return
             # Initialize the upsampler
             model = RRDBNet(
                 num_in_ch=3,
@@ -28,25 +62,256 @@ class ImageUtilitiesPlugin:
                 scale=4,
                 model_path=self.model_path,
                 model=model,
+                # Tiling is done by TiledUpscaler; the upsampler only loads the weights
                 tile=0,
-                tile_pad=10,
+                tile_pad=self.tile_pad,
                 pre_pad=0,
-                half=True,
-                device="cuda"
+                half=self.policy.half,
+                device=self.device
             )
+            # RealESRGANer only knows float16 vs float32; bfloat16 CPUs convert here
+            if self.policy.dtype == torch.bfloat16:
+                self.upsampler.model = self.upsampler.model.to(torch.bfloat16)
 
     def unload_model(self):
         if self.upsampler is not None:
+            get_warm_cache().put(f"upscaler:{self.model_path}", self.upsampler)
             self.upsampler = None
-            torch.cuda.empty_cache()
+            self.policy.empty_cache()
+
+    def _memory_budget_mb(self) -> float:
+        """The configured tile memory budget, or half of the memory currently free on the device."""
+        if self.memory_budget_mb > 0:
+            return self.memory_budget_mb
+        free_mb = self.policy.free_memory_mb()
+        return free_mb / 2 if free_mb > 0 else 1024.0
+
+    def _make_upscaler(self) -> TiledUpscaler:
+        half = self.policy.dtype != torch.float32
+        tile_size = choose_tile_size(self._memory_budget_mb(), self.workers, half,
+                                     self.tile_pad, max_tile=self.max_tile_size)
+        return TiledUpscaler(self.upsampler.model, self.upsampler.scale, self.upsampler.device, self.policy.dtype,
+                             tile_size, overlap=self.tile_overlap, tile_pad=self.tile_pad, workers=self.workers)
+
+    @staticmethod
+    def _encode(result, output_path: str) -> None:
+        """Writes the image under a temporary name first, so a partial file is never taken as done."""
+        directory, name = os.path.split(output_path)
+        tmp_path = os.path.join(directory, f".{name}.part{os.path.splitext(name)[1]}")
+        with span("encode image", "save", path=name):
+            if not cv2.imwrite(tmp_path, result):
+                raise IOError(f"Could not write '{output_path}'.")
+            os.replace(tmp_path, output_path)
+
+    def upscale_file(self, image_path: str, output_path: str, scale_factor: float) -> str:
+        """
+        Upscales one image file into output_path through memory-mapped scratch files,
+        so memory while upscaling is bounded by the tile size rather than the image
+        size. Decoding the input still needs the whole image in memory once.
+        """
+        upscaler = self._make_upscaler()
+
+        # Scratch space next to the output, so the memmaps stay off a small tmpfs
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=".upscale-", dir=output_dir) as work_dir:
+            with span("decode image", "preprocess", path=os.path.basename(image_path)):
+                source = decode_to_memmap(image_path, work_dir)
+            print(f"Upscaling {image_path} ({source.shape[1]}x{source.shape[0]}) x{scale_factor} "
+                  f"in {upscaler.tile_size}px tiles...")
+            with span("upscale image", "inference", tile_size=upscaler.tile_size):
+                result = upscaler.upscale(source, os.path.join(work_dir, "output.npy"), scale_factor,
+                                          progress_callback=self.progress_callback)
+            self._encode(result, output_path)
+            del source, result
+        return output_path
+
+    def upscale_image(self, image, scale_factor: float):
+        """
+        Upscales an image held in memory and returns the result in memory: a PIL
+        image for a PIL image, or a BGR array (OpenCV's layout) for an array.
+        Used by pipelines, so stages hand images over without touching the disk.
+        """
+        is_pil = hasattr(image, "convert")
+        if is_pil:
+            info = dict(getattr(image, "info", {}))
+            mode = "RGBA" if image.mode in ("RGBA", "LA") else "RGB"
+            source = np.asarray(image.convert(mode))
+            source = cv2.cvtColor(source, cv2.COLOR_RGBA2BGRA if mode == "RGBA" else cv2.COLOR_RGB2BGR)
+        else:
+            source = np.asarray(image)
+
+        upscaler = self._make_upscaler()
+        with span("upscale image", "inference", tile_size=upscaler.tile_size):
+            result = upscaler.upscale(source, None, scale_factor, progress_callback=self.progress_callback)
+        if not is_pil:
+            return result
+
+        # Pillow arrives with torchvision; only pipelines handing over PIL images need it here
+        from PIL import Image
+        result = cv2.cvtColor(result, cv2.COLOR_BGRA2RGBA if result.shape[2] == 4 else cv2.COLOR_BGR2RGB)
+        upscaled = Image.fromarray(result)
+        upscaled.info.update(info)
+        upscaled.info["upscale"] = scale_factor
+        return upscaled
+
+    def run_directory(self, input_dir: str, output_dir: str, settings: dict) -> dict:
+        """
+        Upscales every image in input_dir into output_dir as <name>_x<scale>.png.
+
+        Decoding, upscaling and encoding run as three overlapping stages: while one
+        image is on the model, the next is being decoded and the previous encoded.
+        Finished files are recorded in a manifest in output_dir, so an interrupted
+        run picks up where it stopped and unchanged files are skipped.
+        """
+        scale_factor = settings.get("scale_factor", 4)
+        upscale_type = settings.get("upscale_type", "upscale")
+        batch_settings = {"scale_factor": scale_factor, "upscale_type": upscale_type}
+        os.makedirs(output_dir, exist_ok=True)
+        manifest = UpscaleManifest(output_dir)
+
+        names = list_images(input_dir)
+        todo = []
+        for name in names:
+            output_path = os.path.join(output_dir, output_name(name, scale_factor, upscale_type))
+            if not manifest.is_up_to_date(os.path.join(input_dir, name), output_path, batch_settings):
+                todo.append((name, output_path))
+        summary = {"total": len(names), "skipped": len(names) - len(todo), "processed": 0, "failed": 0,
+                   "errors": {}, "output_dir": output_dir}
+        print(f"{len(names)} image(s) in {input_dir}: {summary['skipped']} up to date, {len(todo)} to process.")
+        if not todo:
+            return summary
+
+        upscaler = self._make_upscaler()
+        # Small queues: each item holds memory-mapped scratch files on disk, not decoded images
+        decoded = queue.Queue(maxsize=2)
+        upscaled = queue.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def decode_stage():
+            try:
+                for name, output_path in todo:
+                    if stop.is_set():
+                        break
+                    work_dir = None
+                    try:
+                        work_dir = tempfile.mkdtemp(prefix=".upscale-", dir=output_dir)
+                        with span("decode image", "preprocess", path=name):
+                            source = decode_to_memmap(os.path.join(input_dir, name), work_dir)
+                        item = (name, output_path, work_dir, source, None)
+                    except Exception as e:
+                        item = (name, output_path, work_dir, None, e)
+                    decoded.put(item)
+            finally:
+                # Whatever happened, the upscale loop must learn that nothing more is coming
+                decoded.put(None)
+
+        def encode_stage():
+            done = 0
+            while True:
+                item = upscaled.get()
+                if item is None:
+                    return
+                name, output_path, work_dir, result, error = item
+                try:
+                    if error is None:
+                        if upscale_type == "upscale":
+                            self._encode(result, output_path)
+                        else:
+                            # Face restoration is still a placeholder that passes the image through
+                            self._encode(cv2.imread(os.path.join(input_dir, name), cv2.IMREAD_UNCHANGED), output_path)
+                        manifest.record(os.path.join(input_dir, name), output_path, batch_settings)
+                except Exception as e:
+                    error = e
+                finally:
+                    del result
+                    if work_dir:
+                        shutil.rmtree(work_dir, ignore_errors=True)
 
-    def run_inference(self, image_path: str, settings: dict) -> str:
+                if error is None:
+                    summary["processed"] += 1
+                else:
+                    summary["failed"] += 1
+                    summary["errors"][name] = str(error)
+                    print(f"Failed to upscale {name}: {error}")
+                done += 1
+                if self.batch_progress_callback:
+                    # A failing callback must not take the encoder down with it
+                    try:
+                        self.batch_progress_callback(done, len(todo), name)
+                    except Exception as e:
+                        print(f"Batch progress callback failed: {e}")
+
+        def take_from_decoder():
+            # A decoder that died without its end marker would leave get() waiting forever
+            while True:
+                try:
+                    return decoded.get(timeout=0.1)
+                except queue.Empty:
+                    if not decoder.is_alive() and decoded.empty():
+                        return None
+
+        def hand_to_encoder(item) -> bool:
+            # A dead encoder never drains its queue; don't block on it forever
+            while encoder.is_alive():
+                try:
+                    upscaled.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        decoder = threading.Thread(target=decode_stage, name="upscale-decode", daemon=True)
+        encoder = threading.Thread(target=encode_stage, name="upscale-encode", daemon=True)
+        decoder.start()
+        encoder.start()
+        try:
+            while True:
+                item = take_from_decoder()
+                if item is None:
+                    break
+                name, output_path, work_dir, source, error = item
+                result = None
+                if error is None and upscale_type == "upscale":
+                    try:
+                        with span("upscale image", "inference", path=name, tile_size=upscaler.tile_size):
+                            result = upscaler.upscale(source, os.path.join(work_dir, "output.npy"), scale_factor,
+                                                      progress_callback=self.progress_callback)
+                    except Exception as e:
+                        error = e
+                del source
+                if not hand_to_encoder((name, output_path, work_dir, result, error)):
+                    if work_dir:
+                        shutil.rmtree(work_dir, ignore_errors=True)
+                    raise RuntimeError("The upscale encoder stopped unexpectedly.")
+        finally:
+            stop.set()
+            # Unblock the decoder if we stopped early, then let the encoder finish what it has
+            while decoder.is_alive():
+                try:
+                    item = decoded.get(timeout=0.1)
+                    if item is not None and item[2]:
+                        shutil.rmtree(item[2], ignore_errors=True)
+                except queue.Empty:
+                    pass
+            hand_to_encoder(None)
+            encoder.join()
+
+        print(f"Directory batch finished: {summary['processed']} upscaled, {summary['failed']} failed, "
+              f"{summary['skipped']} skipped. Output in {output_dir}")
+        return summary
+
+    def run_inference(self, image_path: str, settings: dict):
         """
         Runs image upscaling or restoration with user-defined settings.
 
         Args:
-            image_path (str): The path to the input image.
+            image_path: The path to the input image, a directory to process in batch,
+                or an image in memory (PIL image or array).
             settings (dict): A dictionary of user-defined settings.
+
+        Returns the path of the written image, run_directory's summary for a directory,
+        or the upscaled image for an image in memory.
         """
         if self.upsampler is None:
             raise ValueError("Model is not loaded. Call load_model() first.")
@@ -55,16 +320,25 @@ class ImageUtilitiesPlugin:
         scale_factor = settings.get("scale_factor", 4)
         upscale_type = settings.get("upscale_type", "upscale") # or 'face_restore'
 
-        img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+        if not isinstance(image_path, str):
+            return self.upscale_image(image_path, scale_factor) if upscale_type == "upscale" else image_path
+        output_dir = settings.get("output_dir") or self.output_dir
+        if not os.path.isabs(output_dir):
+            output_dir = os.path.join(PROJECT_ROOT, output_dir)
+
+        if os.path.isdir(image_path):
+            return self.run_directory(image_path, output_dir, settings)
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, output_name(image_path, scale_factor, upscale_type))
 
         if upscale_type == "upscale":
             # Upscale the image
-            upscaled_image, _ = self.upsampler.enhance(img, outscale=scale_factor)
+            self.upscale_file(image_path, output_path, scale_factor)
         elif upscale_type == "face_restore":
             # Assuming a different model or method for face restoration
             # Placeholder for actual face restoration logic
-            upscaled_image = img # This is a placeholder, replace with actual logic
+            img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+            self._encode(img, output_path) # This is a placeholder, replace with actual logic
 
-        output_path = "upscaled_image.png"
-        imwrite(upscaled_image, output_path)
         return output_path
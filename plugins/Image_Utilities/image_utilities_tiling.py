@@ -0,0 +1,243 @@
+# plugins/image_utilities_plugin/image_utilities_tiling.py
+
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# cv2 and torch are imported where they are used, so the tiling arithmetic only needs numpy
+
+# Rough memory the RRDB network needs per input pixel in float32: the dense blocks keep
+# up to 192 feature channels alive, and the upsampling layers run at 16x the pixel count.
+BYTES_PER_INPUT_PIXEL_FP32 = 6500
+
+
+def choose_tile_size(memory_budget_mb: float, workers: int, half: bool, tile_pad: int,
+                     min_tile: int = 64, max_tile: int = 1024) -> int:
+    """
+    Largest square tile (in input pixels, before padding) that lets every worker fit
+    in the budget. `half` means a 16-bit dtype (float16 or bfloat16).
+    """
+    bytes_per_pixel = BYTES_PER_INPUT_PIXEL_FP32 / (2 if half else 1)
+    pixels = memory_budget_mb * 1024 * 1024 / (bytes_per_pixel * max(1, workers))
+    tile = int(math.sqrt(max(pixels, 1))) - 2 * tile_pad
+    # Multiples of 8 keep the convolutions on their fast paths
+    return max(min_tile, min(max_tile, tile // 8 * 8))
+
+
+def _tile_starts(length: int, tile: int, overlap: int) -> list:
+    """Start offsets of tiles covering [0, length); the last tile is pulled back to end at length."""
+    if length <= tile:
+        return [0]
+    step = max(1, tile - overlap)
+    starts = list(range(0, length - tile + 1, step))
+    if starts[-1] + tile < length:
+        starts.append(length - tile)
+    return starts
+
+
+def _ramp(size: int) -> np.ndarray:
+    """Blend weights for the incoming tile across an overlap, rising from ~0 to ~1."""
+    return (np.arange(size, dtype=np.float32) + 0.5) / size
+
+
+def _decode_tiff_to_memmap(image_path: str, npy_path: str):
+    """
+    Decodes a TIFF segment by segment (strips or tiles) straight into a
+    memory-mapped .npy file, so the full image is never held in memory. Returns
+    None for layouts the upscaler can't take as they are (planar, palette, CMYK,
+    YCbCr, float samples); those go through OpenCV instead.
+    """
+    try:
+        import tifffile
+    except ImportError:
+        return None
+
+    with tifffile.TiffFile(image_path) as tif:
+        page = tif.pages[0]
+        if page.dtype not in (np.uint8, np.uint16) or page.photometric not in (
+                tifffile.PHOTOMETRIC.MINISBLACK, tifffile.PHOTOMETRIC.RGB):
+            return None
+        if len(page.shape) not in (2, 3) or (len(page.shape) == 3 and page.shape[2] not in (3, 4)):
+            return None
+        mapped = np.lib.format.open_memmap(npy_path, mode="w+", dtype=page.dtype, shape=page.shape)
+        page.asarray(out=mapped)
+
+    # TIFF stores RGB(A); the upscaler works in OpenCV's BGR(A), swapped a strip at a time
+    if mapped.ndim == 3:
+        rows = max(1, (16 * 1024 * 1024) // max(1, mapped.shape[1] * mapped.shape[2] * mapped.itemsize))
+        for y in range(0, mapped.shape[0], rows):
+            strip = mapped[y:y + rows]
+            strip[:, :, :3] = strip[:, :, 2::-1].copy()
+    mapped.flush()
+    return mapped
+
+
+def decode_to_memmap(image_path: str, work_dir: str) -> np.memmap:
+    """
+    Decodes an image once into a raw memory-mapped array, so tiles are later read
+    from the page cache instead of a decoded copy held for the whole run.
+
+    8/16-bit grey, RGB and RGBA TIFFs are decoded strip by strip when tifffile is
+    installed, so memory stays bounded from the start. Every other format goes
+    through OpenCV, which has no streaming decoder: the decode itself holds the
+    full image in memory for a moment, and only what comes after is bounded.
+    """
+    npy_path = os.path.join(work_dir, "input.npy")
+    if os.path.splitext(image_path)[1].lower() in (".tif", ".tiff"):
+        mapped = _decode_tiff_to_memmap(image_path, npy_path)
+        if mapped is not None:
+            del mapped
+            return np.load(npy_path, mmap_mode="r")
+
+    import cv2
+
+    image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError(f"Could not read image '{image_path}'.")
+    mapped = np.lib.format.open_memmap(npy_path, mode="w+", dtype=image.dtype, shape=image.shape)
+    mapped[:] = image
+    mapped.flush()
+    del image
+    return np.load(npy_path, mmap_mode="r")
+
+
+class TiledUpscaler:
+    """
+    Upscales an image tile by tile with a Real-ESRGAN network.
+
+    Tiles are read from a memory-mapped input and blended straight into a
+    memory-mapped output, so memory while upscaling depends on the tile size
+    and worker count, not on the size of the image (decoding a non-TIFF input is
+    the one step that is not bounded; see decode_to_memmap). Each tile is fed with tile_pad pixels
+    of extra context that are cropped away, and neighbouring tiles overlap by
+    `overlap` pixels that are feathered together to hide seams.
+
+    Tiles are inferred on a worker pool; results are blended in raster order on
+    the calling thread, so the blend never races with a neighbour.
+    """
+
+    def __init__(self, model, net_scale: int, device, dtype, tile_size: int,
+                 overlap: int = 16, tile_pad: int = 10, workers: int = 2):
+        self.model = model
+        self.net_scale = net_scale
+        self.device = device
+        self.dtype = dtype
+        self.tile_size = tile_size
+        self.overlap = min(overlap, tile_size // 2)
+        self.tile_pad = tile_pad
+        self.workers = max(1, workers)
+
+    def _infer(self, tile: np.ndarray, max_range: float) -> np.ndarray:
+        """Runs the network on one BGR tile and returns the upscaled BGR tile as float32 in [0, 1]."""
+        import torch
+
+        rgb = tile[:, :, ::-1].astype(np.float32) / max_range
+        tensor = torch.from_numpy(np.ascontiguousarray(rgb.transpose(2, 0, 1))).unsqueeze(0)
+        tensor = tensor.to(self.device, dtype=self.dtype)
+        with torch.no_grad():
+            output = self.model(tensor)
+        output = output.squeeze(0).float().clamp_(0, 1).cpu().numpy().transpose(1, 2, 0)
+        return np.ascontiguousarray(output[:, :, ::-1])
+
+    def _upscale_tile(self, source: np.ndarray, box: tuple, outscale: float, max_range: float) -> np.ndarray:
+        """Upscales the input region box=(y0, y1, x0, x1) to float32 in [0, 1], with its context cropped off."""
+        import cv2
+
+        y0, y1, x0, x1 = box
+        height, width = source.shape[:2]
+        py0, py1 = max(0, y0 - self.tile_pad), min(height, y1 + self.tile_pad)
+        px0, px1 = max(0, x0 - self.tile_pad), min(width, x1 + self.tile_pad)
+        tile = np.array(source[py0:py1, px0:px1])
+
+        alpha = None
+        if tile.ndim == 2:
+            color = cv2.cvtColor(tile, cv2.COLOR_GRAY2BGR)
+        elif tile.shape[2] == 4:
+            color, alpha = tile[:, :, :3], tile[:, :, 3]
+        else:
+            color = tile
+
+        output = self._infer(color, max_range)
+        s = self.net_scale
+        output = output[(y0 - py0) * s:(y1 - py0) * s, (x0 - px0) * s:(x1 - px0) * s]
+
+        target = (round((x1 - x0) * outscale), round((y1 - y0) * outscale))
+        if target != (output.shape[1], output.shape[0]):
+            interpolation = cv2.INTER_AREA if outscale < s else cv2.INTER_LANCZOS4
+            output = cv2.resize(output, target, interpolation=interpolation)
+
+        if tile.ndim == 2:
+            output = cv2.cvtColor(output, cv2.COLOR_BGR2GRAY)
+        elif alpha is not None:
+            alpha = alpha[y0 - py0:y1 - py0, x0 - px0:x1 - px0].astype(np.float32) / max_range
+            alpha = cv2.resize(alpha, target, interpolation=cv2.INTER_LINEAR)
+            output = np.dstack([output, alpha])
+        return output
+
+    def upscale(self, source: np.ndarray, output_path: str, outscale: float, progress_callback=None) -> np.ndarray:
+        """
+        Upscales `source` (an HxW or HxWxC array, usually a memmap) into a new
+        memory-mapped .npy file at output_path and returns it. With output_path
+        None the result is an ordinary in-memory array instead.
+        """
+        height, width = source.shape[:2]
+        max_range = 65535.0 if source.dtype == np.uint16 else 255.0
+        out_height, out_width = round(height * outscale), round(width * outscale)
+        shape = (out_height, out_width) + source.shape[2:]
+        if output_path is None:
+            output = np.zeros(shape, dtype=source.dtype)
+        else:
+            output = np.lib.format.open_memmap(output_path, mode="w+", dtype=source.dtype, shape=shape)
+
+        rows = _tile_starts(height, self.tile_size, self.overlap)
+        cols = _tile_starts(width, self.tile_size, self.overlap)
+        boxes = [(y, min(y + self.tile_size, height), x, min(x + self.tile_size, width)) for y in rows for x in cols]
+        total = len(boxes)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upscale-tile") as pool:
+            # Keep a bounded window of tiles in flight so finished tiles never pile up in memory
+            window = self.workers * 2
+            futures = [pool.submit(self._upscale_tile, source, box, outscale, max_range) for box in boxes[:window]]
+            for index, box in enumerate(boxes):
+                tile = futures[index].result()
+                futures[index] = None
+                if index + window < total:
+                    futures.append(pool.submit(self._upscale_tile, source, boxes[index + window], outscale, max_range))
+                left_box = boxes[index - 1] if index % len(cols) > 0 else None
+                above_box = boxes[index - len(cols)] if index >= len(cols) else None
+                self._blend(output, tile, box, outscale, max_range, left_box, above_box)
+                if progress_callback:
+                    progress_callback(index + 1, total)
+
+        if isinstance(output, np.memmap):
+            output.flush()
+        return output
+
+    def _blend(self, output, tile, box, outscale, max_range, left_box, above_box) -> None:
+        """Writes a tile into the output, feathering its edges into tiles already written above and to the left."""
+        y0, y1, x0, x1 = box
+        oy0, ox0 = round(y0 * outscale), round(x0 * outscale)
+        oy1, ox1 = oy0 + tile.shape[0], ox0 + tile.shape[1]
+
+        weight = np.ones(tile.shape[:2], dtype=np.float32)
+        if left_box is not None:
+            overlap = round((left_box[3] - x0) * outscale)
+            if overlap > 0:
+                weight[:, :overlap] *= _ramp(overlap)[np.newaxis, :]
+        if above_box is not None:
+            overlap = round((above_box[1] - y0) * outscale)
+            if overlap > 0:
+                weight[:overlap, :] *= _ramp(overlap)[:, np.newaxis]
+        if tile.ndim == 3:
+            weight = weight[:, :, np.newaxis]
+
+        region = output[oy0:oy1, ox0:ox1]
+        # Fractional scales can round a tile one pixel past the edge of the output
+        tile = tile[:region.shape[0], :region.shape[1]]
+        weight = weight[:region.shape[0], :region.shape[1]]
+        existing = region.astype(np.float32) / max_range
+        blended = existing * (1 - weight) + tile * weight
+        region[:] = np.clip(blended * max_range + 0.5, 0, max_range).astype(output.dtype)
+
@@ -5,14 +5,20 @@ from textual.widgets import Static, RadioSet, RadioButton, Button, Input, Select
 from textual.app import ComposeResult
 from textual import on
 import os
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING
+
+from core.jobs import Job
+from core.settings import SettingsError
+from core.file_scanner import ImageDirectoryMixin
 
 if TYPE_CHECKING:
     from .image_utilities_logic import ImageUtilitiesLogic
 
-class ImageUtilitiesPane(Container):
+class ImageUtilitiesPane(ImageDirectoryMixin, Container):
     """The TUI pane for upscaling or restoring images."""
 
+    image_select_id = "image_select_list"
+
     DEFAULT_CSS = """
     #horizontal_layout {
         height: 1fr;
@@ -59,7 +65,8 @@ class ImageUtilitiesPane(Container):
                 yield Static("Select Image:", classes="setting_label")
                 yield Select([], id="image_select_list", classes="setting_input")
 
-                yield Container(id="input_image_box", classes="image_box")
+                with Container(id="input_image_box", classes="image_box"):
+                    yield Static("Select an image to preview it.", id="image_preview")
 
             with Vertical(id="settings_box", classes="settings-box"):
                 yield Static("[b]Process[/b]", classes="box_header")
@@ -70,6 +77,11 @@ class ImageUtilitiesPane(Container):
                 yield Static("[b]Parameters[/b]", classes="box_header")
                 yield Static("Scale Factor:", classes="setting_label")
                 yield Input(value="4", id="scale_factor_input", classes="setting_input")
+                yield Static("Output Directory:", classes="setting_label")
+                yield Input(value="output/upscaled", id="upscale_output_dir_input", classes="setting_input")
+
+                yield Button("Process Selected", id="process_selected_button", classes="action_button")
+                yield Button("Process Directory", id="process_directory_button", classes="action_button")
 
                 yield Static("\n[b]Navigation[/b]", classes="box_header")
                 yield Static("1: Return to LLM", id="navigation_content")
@@ -78,31 +90,61 @@ class ImageUtilitiesPane(Container):
                 yield Static("[b]Result[/b]", classes="box_header")
                 yield Static("Result will appear here...", id="result_image_placeholder")
 
-    @on(Button.Pressed, "#load_directory_button")
-    def on_load_directory_button_pressed(self, event: Button.Pressed) -> None:
-        """Loads a list of image files from the specified directory and populates the Select widget."""
-        directory_path = self.query_one("#directory_path_input", Input).value
+    def on_mount(self) -> None:
+        """Hooks the upscaler's progress reports up to the result box."""
+        if self.logic is not None:
+            self.logic.progress_callback = self._report_progress_threadsafe
+            self.logic.batch_progress_callback = self._report_batch_progress_threadsafe
 
-        if not os.path.isdir(directory_path):
-            self.notify(f"Error: Directory not found: {directory_path}", severity="error")
+    def _report_progress(self, done: int, total: int) -> None:
+        self.query_one("#result_image_placeholder", Static).update(
+            f"Upscaling... tile {done}/{total} ({done * 100 // total}%)"
+        )
+
+    def _report_batch_progress_threadsafe(self, done: int, total: int, name: str) -> None:
+        self._call_if_attached(self._report_batch_progress, done, total, name)
+
+    def _report_batch_progress(self, done: int, total: int, name: str) -> None:
+        if not self.is_attached:
             return
+        self.query_one("#result_image_placeholder", Static).update(f"Finished {name}\n{done}/{total} file(s) done")
 
+    def _submit(self, path: str, description: str) -> None:
+        """Queues the path (an image or a whole directory) on the app's job scheduler."""
         try:
-            image_extensions = (".png", ".jpg", ".jpeg")
-            image_files: List[str] = [
-                f for f in os.listdir(directory_path)
-                if os.path.isfile(os.path.join(directory_path, f)) and f.lower().endswith(image_extensions)
-            ]
-
-            options = [(file, file) for file in image_files]
+            settings = self.app.collect_settings()
+        except SettingsError as e:
+            self.notify(str(e), severity="error")
+            return
+        hotkey = self.app.active_plugin_info["hotkey"]
+        job = self.app.scheduler.submit(Job(hotkey, path, settings, description=description))
+        self.notify(f"Queued job {job.id}: {description}")
+
+    @on(Button.Pressed, "#process_selected_button")
+    def on_process_selected_button_pressed(self, event: Button.Pressed) -> None:
+        selected = self.query_one("#image_select_list", Select).value
+        if selected is None or selected == Select.BLANK:
+            self.notify("Select an image first.", severity="warning")
+            return
+        directory_path = self.query_one("#directory_path_input", Input).value
+        self._submit(os.path.join(directory_path, selected), f"upscale {selected}")
 
-            self.query_one("#image_select_list", Select).set_options(options)
-            self.notify(f"Loaded {len(image_files)} image(s) from {directory_path}", severity="information")
+    @on(Button.Pressed, "#process_directory_button")
+    def on_process_directory_button_pressed(self, event: Button.Pressed) -> None:
+        directory_path = self.query_one("#directory_path_input", Input).value
+        if not os.path.isdir(directory_path):
+            self.notify(f"Error: Directory not found: {directory_path}", severity="error")
+            return
+        self._submit(directory_path, f"upscale directory {directory_path}")
 
-        except Exception as e:
-            self.notify(f"Failed to read directory: {e}", severity="error")
+    @on(Button.Pressed, "#load_directory_button")
+    def on_load_directory_button_pressed(self, event: Button.Pressed) -> None:
+        """Scans the directory in the background, filling the Select widget as files are found."""
+        self.load_image_directory()
 
     @on(Select.Changed, "#image_select_list")
     def on_image_selected(self, event: Select.Changed) -> None:
-        """Placeholder for handling when a file is selected from the list."""
-        self.notify(f"Image selected: {event.value}")
+        """Shows a preview of the selected file in the input image box."""
+        if event.value is None or event.value == Select.BLANK:
+            return
+        self.show_image_preview(event.value)
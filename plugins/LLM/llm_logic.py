@@ -1,15 +1,48 @@
 # llm_logic.py
 
 import os
+import time
+from contextlib import contextmanager
 from llama_cpp import Llama
 
+from core.config import get_section
+from core.device import configured_threads
+from core.tracing import get_tracer, span
+from core.weights import get_warm_cache, gguf_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+from llm_session import ChatSession, PrefixStateCache
+
 class LLMLogic:
     """Handles the backend logic for interacting with the LLM."""
 
     def __init__(self, plugin_path):
         self.llm = None
+        self.last_generation_stats = None
         self.plugin_path = plugin_path
-        self.model_path = os.path.join(self.plugin_path, "llama-2-7b-chat.Q4_K_M.gguf")
+        # A GGUF model from models/<models_folder>, or the one bundled with the plugin
+        self.model_path = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default=os.path.join(self.plugin_path, "llama-2-7b-chat.Q4_K_M.gguf"), formats=("gguf",)
+        )
+
+        config = get_section("llm")
+        self.n_ctx = int(config.get("n_ctx", 4096))
+        self.restore_last_session = bool(config.get("restore_last_session", True))
+        # Headless batches turn this off so they never touch the saved chat session
+        self.persist_session = True
+
+        # Conversation state lives next to the other program-level caches
+        self.cache_dir = os.path.abspath(os.path.join(self.plugin_path, '../../cache/llm'))
+        self.session_path = os.path.join(self.cache_dir, "session.json")
+        self.session = ChatSession(system_prompt=config.get("system_prompt", ""))
+        self.state_cache = PrefixStateCache(
+            max_entries=int(config.get("state_cache_entries", 2)),
+            disk_dir=os.path.join(self.cache_dir, "states") if config.get("disk_state_cache", True) else None,
+            max_disk_entries=int(config.get("max_disk_states", 16)),
+        )
+        # Prefix key of the conversation currently held in the model's KV cache, and
+        # whether that state still has to be saved before anything replaces it
+        self._state_key = None
+        self._state_unsaved = False
 
     def load_model(self):
         """Loads the Llama model from the specified path."""
@@ -19,28 +52,148 @@ class LLMLogic:
             return False
 
         try:
-            self.llm = Llama(model_path=self.model_path)
+            self.llm = get_warm_cache().take(f"llm:{self.model_path}:{self.n_ctx}")
+            if self.llm is None:
+                self.llm = Llama(model_path=self.model_path, n_ctx=self.n_ctx, n_threads=configured_threads(),
+                                 **gguf_kwargs())
             print("Model loaded successfully.")
+            if self.restore_last_session and self.persist_session:
+                self._restore_session()
             return True
         except Exception as e:
             print(f"Failed to load model: {e}")
             return False
 
-    def run_inference(self, prompt: str, settings: dict):
-        """Runs inference on the loaded model using the provided settings."""
+    def unload_model(self):
+        """Releases the Llama model and its context."""
+        if self.llm is not None:
+            # Keep the live conversation warm on disk for the next load, unless it must not be kept
+            if self.persist_session:
+                self._snapshot_live_state()
+                if self._state_key:
+                    self.state_cache.persist(self._state_key)
+            self.state_cache.clear_memory()
+            self._state_key = None
+            self._state_unsaved = False
+            # It comes back with an empty context, but the KV buffers stay allocated
+            self.llm.reset()
+            get_warm_cache().put(f"llm:{self.model_path}:{self.n_ctx}", self.llm, size_mb=self._footprint_mb())
+            self.llm = None
+            print("Model unloaded.")
+
+    def _footprint_mb(self) -> float:
+        """The GGUF weights plus the KV cache for n_ctx tokens: f16 keys and values in every layer."""
+        metadata = getattr(self.llm, "metadata", None) or {}
+        arch = metadata.get("general.architecture", "llama")
+        try:
+            layers = int(metadata[f"{arch}.block_count"])
+            heads = int(metadata[f"{arch}.attention.head_count"])
+            kv_width = int(metadata[f"{arch}.embedding_length"]) * int(
+                metadata.get(f"{arch}.attention.head_count_kv", heads)) // heads
+            kv_bytes = 2 * 2 * self.n_ctx * layers * kv_width
+        except (KeyError, ValueError, ZeroDivisionError):
+            # No metadata to go by: a 7B llama's 0.5 MB per token
+            kv_bytes = self.n_ctx * 512 * 1024
+        return (os.path.getsize(self.model_path) + kv_bytes) / (1024 * 1024)
+
+    def new_session(self):
+        """Starts an empty conversation. Saved states of earlier ones stay cached."""
+        self.session = ChatSession(system_prompt=self.session.system_prompt)
+        if self.persist_session:
+            self.session.save(self.session_path)
+
+    @contextmanager
+    def isolated_session(self):
+        """
+        Runs the enclosed requests in a fresh conversation that is never saved, then
+        puts the user's chat back. Pipelines use this so their prompts don't end up
+        in the chat pane's history.
+        """
+        session, persist = self.session, self.persist_session
+        self.session = ChatSession(system_prompt=session.system_prompt)
+        self.persist_session = False
+        try:
+            yield
+        finally:
+            self.session, self.persist_session = session, persist
+
+    def _restore_session(self):
+        """Reloads the last conversation and, if its state was saved, the evaluated tokens too."""
+        self.session = ChatSession.load(self.session_path)
+        if not self.session.turns:
+            return
+        if self._load_prefix_state(self.session.prefix_key(self.model_path)):
+            print(f"Restored chat session with {len(self.session.turns)} turns (warm).")
+        else:
+            print(f"Restored chat session with {len(self.session.turns)} turns (cold).")
+
+    def _load_prefix_state(self, key: str) -> bool:
+        """Puts the saved state for a prefix into the model, unless it already holds it."""
+        if self._state_key == key:
+            return True
+        # The model is about to hold another prefix; keep the one it has for later
+        self._snapshot_live_state()
+        self._state_key = None
+        state = self.state_cache.get(key)
+        if state is None:
+            return False
+        try:
+            self.llm.load_state(state)
+        except Exception as e:
+            print(f"Failed to restore saved LLM state: {e}")
+            return False
+        self._state_key = key
+        return True
+
+    def _snapshot_live_state(self) -> None:
+        """Saves the state the model holds for the current prefix, if it has not been saved yet."""
+        if self._state_key is None or not self._state_unsaved:
+            return
+        try:
+            self.state_cache.put(self._state_key, self.llm.save_state())
+        except Exception as e:
+            print(f"Failed to save LLM state: {e}")
+        self._state_unsaved = False
+
+    def _fit_history(self, max_tokens: int) -> None:
+        """Drops the oldest exchanges until the prompt and reply fit in the context window."""
+        while len(self.llm.tokenize(self.session.render().encode("utf-8"))) + max_tokens > self.n_ctx:
+            if not self.session.drop_oldest_exchange():
+                break
+
+    def stream_inference(self, prompt: str, settings: dict):
+        """
+        Runs inference and yields each token as llama.cpp produces it.
+        Timing for the finished reply is left in `last_generation_stats`.
+
+        The prompt is added to the chat session. llama.cpp only evaluates the part
+        of the conversation that is not already in its KV cache, and a saved state
+        for the previous turns is restored first if the cache holds something else.
+        """
         if not self.llm:
-            return "Error: No model loaded. Please load a model first."
+            yield "Error: No model loaded. Please load a model first."
+            return
 
         print(f"Running inference with prompt: '{prompt}'")
+        started = time.perf_counter()
+        first_token_at = None
+        token_count = 0
+        reply_parts = []
+        completed = False
         try:
             # Extract settings from the dictionary, providing default values
-            temperature = float(settings.get("temperature_input", 0.7))
-            top_k = int(settings.get("top_k_input", 40))
-            top_p = float(settings.get("top_p_input", 0.9))
-            max_tokens = int(settings.get("max_output_tokens_input", 512))
+            temperature = float(settings.get("temperature", 0.7))
+            top_k = int(settings.get("top_k", 40))
+            top_p = float(settings.get("top_p", 0.9))
+            max_tokens = int(settings.get("max_output_tokens", 512))
+
+            with span("restore prefix state", "preprocess"):
+                self._load_prefix_state(self.session.prefix_key(self.model_path))
+                self.session.add_user(prompt)
+                self._fit_history(max_tokens)
 
             stream = self.llm.create_completion(
-                prompt,
+                self.session.render(),
                 temperature=temperature,
                 top_k=top_k,
                 top_p=top_p,
@@ -48,10 +201,54 @@ class LLMLogic:
                 stream=True
             )
 
-            response = ""
             for output in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                token_count += 1
                 token = output["choices"][0]["text"]
-                response += token
-            return response
+                reply_parts.append(token)
+                yield token
+            completed = True
         except Exception as e:
-            return f"An error occurred during inference: {e}"
+            yield f"An error occurred during inference: {e}"
+        finally:
+            finished_at = time.perf_counter()
+            # Spans can't be held open across yields, so the two generation stages are recorded afterwards
+            if first_token_at:
+                get_tracer().add("evaluate prompt", "inference", started, first_token_at - started)
+                get_tracer().add("generate tokens", "inference", first_token_at, finished_at - first_token_at,
+                                 tokens=token_count)
+            with span("finish turn", "save"):
+                self._finish_turn(prompt, "".join(reply_parts), completed)
+            elapsed = time.perf_counter() - started
+            generating = finished_at - first_token_at if first_token_at else 0.0
+            self.last_generation_stats = {
+                "tokens": token_count,
+                "seconds": elapsed,
+                "time_to_first_token": (first_token_at - started) if first_token_at else None,
+                "tokens_per_second": token_count / generating if generating > 0 else 0.0,
+            }
+
+    def _finish_turn(self, prompt: str, reply: str, completed: bool) -> None:
+        """
+        Records the reply. The model's KV cache now holds the new prefix; it is only
+        snapshotted when another prefix is about to replace it, or on unload, since
+        the next turn of the same conversation simply extends it.
+        """
+        if not completed:
+            # Forget the failed or abandoned turn so the history stays consistent
+            if self.session.turns and self.session.turns[-1]["role"] == "user":
+                self.session.turns.pop()
+            self._state_key = None
+            self._state_unsaved = False
+            return
+
+        self.session.add_assistant(reply.strip())
+        self._state_key = self.session.prefix_key(self.model_path)
+        self._state_unsaved = True
+        if self.persist_session:
+            self.session.save(self.session_path)
+
+    def run_inference(self, prompt: str, settings: dict):
+        """Runs inference on the loaded model using the provided settings."""
+        return "".join(self.stream_inference(prompt, settings))
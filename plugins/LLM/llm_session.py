@@ -0,0 +1,240 @@
+# llm_session.py
+
+import os
+import json
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+
+STATE_MAGIC = b"LLMSTATE1"
+
+# What llama_cpp.LlamaState holds; "seed" only exists in older llama-cpp-python releases
+_STATE_FIELDS = ("input_ids", "scores", "n_tokens", "llama_state", "llama_state_size", "seed")
+
+
+class ChatSession:
+    """Holds the conversation history and renders it into a llama-2 chat prompt."""
+
+    def __init__(self, system_prompt: str = ""):
+        self.system_prompt = system_prompt
+        self.turns = []  # [{"role": "user" | "assistant", "content": str}, ...]
+
+    def add_user(self, content: str) -> None:
+        self.turns.append({"role": "user", "content": content})
+
+    def add_assistant(self, content: str) -> None:
+        self.turns.append({"role": "assistant", "content": content})
+
+    def drop_oldest_exchange(self) -> bool:
+        """Removes the oldest user/assistant pair. Returns False if nothing could be removed."""
+        if len(self.turns) <= 1:
+            return False
+        del self.turns[:2]
+        return True
+
+    def render(self) -> str:
+        """
+        Renders the whole history in the llama-2 chat format, one
+        `<s>[INST] user [/INST] reply </s>` per exchange, with the system prompt
+        in <<SYS>> inside the first one. When the last turn is the user's, the
+        prompt ends with an open assistant turn for the model to complete.
+
+        The very first <s> is left out: llama.cpp puts the BOS token in front of
+        every prompt itself.
+        """
+        parts = []
+        for index, turn in enumerate(self.turns):
+            if turn["role"] == "user":
+                content = turn["content"]
+                if index == 0 and self.system_prompt:
+                    content = f"<<SYS>>\n{self.system_prompt}\n<</SYS>>\n\n{content}"
+                parts.append(f"{'<s>' if parts else ''}[INST] {content} [/INST]")
+            else:
+                parts.append(f" {turn['content']} </s>")
+        return "".join(parts)
+
+    def prefix_key(self, model_path: str) -> str:
+        """Hashes the rendered history, so evaluated state can be looked up by prefix."""
+        digest = hashlib.sha256()
+        digest.update(model_path.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.render().encode("utf-8"))
+        return digest.hexdigest()
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"system_prompt": self.system_prompt, "turns": self.turns}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ChatSession":
+        session = cls()
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                session.system_prompt = data.get("system_prompt", "")
+                session.turns = data.get("turns", [])
+            except (IOError, json.JSONDecodeError) as e:
+                print(f"Error loading chat session from {path}: {e}")
+        return session
+
+
+def encode_state(state) -> bytes:
+    """
+    Serializes a llama.cpp state without pickle: a JSON header describing each
+    field, followed by the raw bytes of the byte strings and arrays. Plain bytes
+    (as the benchmark stand-in returns) are stored as they are.
+    """
+    fields = {}
+    payload = []
+    if isinstance(state, (bytes, bytearray)):
+        header = {"type": "bytes"}
+        payload.append(bytes(state))
+    else:
+        for name in _STATE_FIELDS:
+            if not hasattr(state, name):
+                continue
+            value = getattr(state, name)
+            if isinstance(value, (bytes, bytearray)):
+                fields[name] = {"kind": "bytes", "length": len(value)}
+                payload.append(bytes(value))
+            elif hasattr(value, "tobytes") and hasattr(value, "dtype"):
+                data = value.tobytes()
+                fields[name] = {"kind": "array", "dtype": value.dtype.str, "shape": list(value.shape),
+                                "length": len(data)}
+                payload.append(data)
+            else:
+                fields[name] = {"kind": "int", "value": int(value)}
+        header = {"type": "LlamaState", "fields": fields}
+    header_bytes = json.dumps(header).encode("utf-8")
+    return STATE_MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes + b"".join(payload)
+
+
+def decode_state(data: bytes):
+    """Rebuilds a state written by encode_state. Raises ValueError for anything else."""
+    if not data.startswith(STATE_MAGIC):
+        raise ValueError("not a saved LLM state")
+    offset = len(STATE_MAGIC)
+    (header_length,) = struct.unpack_from("<Q", data, offset)
+    offset += 8
+    header = json.loads(data[offset:offset + header_length].decode("utf-8"))
+    offset += header_length
+    if header["type"] == "bytes":
+        return data[offset:]
+    if header["type"] != "LlamaState":
+        raise ValueError(f"unknown state type {header['type']!r}")
+
+    values = {}
+    for name, field in header["fields"].items():
+        if name not in _STATE_FIELDS:
+            raise ValueError(f"unknown state field {name!r}")
+        if field["kind"] == "int":
+            values[name] = field["value"]
+            continue
+        chunk = data[offset:offset + field["length"]]
+        if len(chunk) != field["length"]:
+            raise ValueError("truncated state")
+        offset += field["length"]
+        if field["kind"] == "bytes":
+            values[name] = chunk
+        else:
+            import numpy as np
+            values[name] = np.frombuffer(chunk, dtype=np.dtype(field["dtype"])).reshape(field["shape"]).copy()
+
+    from llama_cpp import LlamaState
+    return LlamaState(**values)
+
+
+class PrefixStateCache:
+    """
+    Saved llama.cpp states keyed by prefix hash.
+
+    The most recent states are kept in memory in LRU order. When a disk directory
+    is given, states pushed out of memory are spilled there instead of being lost.
+    """
+
+    def __init__(self, max_entries: int = 2, disk_dir: str = None, max_disk_entries: int = 16):
+        self.max_entries = max(1, max_entries)
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max(1, max_disk_entries)
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._states:
+                self._states.move_to_end(key)
+                return self._states[key]
+
+        state = self._read_disk(key)
+        if state is not None:
+            self.put(key, state, spill=False)
+        return state
+
+    def put(self, key: str, state, spill: bool = True) -> None:
+        evicted = []
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_entries:
+                evicted.append(self._states.popitem(last=False))
+        if spill:
+            for old_key, old_state in evicted:
+                self._write_disk(old_key, old_state)
+
+    def persist(self, key: str) -> None:
+        """Writes one in-memory state to disk, e.g. the live session before unloading."""
+        with self._lock:
+            state = self._states.get(key)
+        if state is not None:
+            self._write_disk(key, state)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.state")
+
+    def _read_disk(self, key: str):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return decode_state(f.read())
+        except (IOError, ValueError, KeyError, TypeError, struct.error, ImportError) as e:
+            print(f"Discarding unreadable LLM state {path}: {e}")
+            os.remove(path)
+            return None
+
+    def _write_disk(self, key: str, state) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(encode_state(state))
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except IOError as e:
+            print(f"Failed to save LLM state to {path}: {e}")
+
+    def _prune_disk(self) -> None:
+        """Removes the least recently written states beyond max_disk_entries."""
+        entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".state")]
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            os.remove(entry.path)
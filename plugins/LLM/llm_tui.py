@@ -4,8 +4,12 @@ from textual.containers import Container, Vertical, Horizontal
 from textual.widgets import Static, Input, RichLog, Select
 from textual.app import ComposeResult
 from textual import on
+from rich.text import Text
+import threading
 from typing import TYPE_CHECKING
 
+from core.model_registry import model_label
+
 if TYPE_CHECKING:
     from .llm_logic import LlmPlugin
 
@@ -36,6 +40,11 @@ class LLMChatPane(Container):
     #chat_log_container {
         width: 2fr;
     }
+    #stream_static {
+        height: auto;
+        max-height: 50%;
+        padding: 0 1;
+    }
     #right_panel {
         width: 1fr;
         margin-left: 1;
@@ -45,9 +54,15 @@ class LLMChatPane(Container):
     }
     """
 
+    # How often tokens received from the worker thread are drawn
+    STREAM_FPS = 30
+
     def __init__(self, logic: "LlmPlugin", **kwargs):
         super().__init__(**kwargs)
         self.logic = logic
+        self._pending_tokens = []
+        self._pending_lock = threading.Lock()
+        self._reply_text = None
 
     def compose(self) -> ComposeResult:
         """
@@ -58,7 +73,8 @@ class LLMChatPane(Container):
         with Horizontal(id="main_content_area"):
             # Left side: Chat log (2/3 width)
             with Container(id="chat_log_container"):
-                yield RichLog(id="chat_log", classes="output-box", highlight=True)
+                yield RichLog(id="chat_log", classes="output-box", highlight=True, wrap=True)
+                yield Static("", id="stream_static")
 
             # Right side: Parameters and Model Info (1/3 width)
             with Vertical(id="right_panel", classes="settings-box"):
@@ -85,3 +101,61 @@ class LLMChatPane(Container):
 
         # Bottom section: User input field
         yield Input(placeholder="Ask me anything...", id="input_box", classes="prompt-box")
+
+    def on_mount(self) -> None:
+        self.set_interval(1 / self.STREAM_FPS, self._flush_tokens)
+
+        model_path = getattr(self.logic, "model_path", None)
+        if model_path:
+            self.query_one("#model_info_static", Static).update(f"Model: {model_label(model_path)}")
+
+        # Show the conversation restored from the last run
+        session = getattr(self.logic, "session", None)
+        if session:
+            chat_log = self.query_one("#chat_log", RichLog)
+            for turn in session.turns:
+                speaker = "You: " if turn["role"] == "user" else "AI: "
+                chat_log.write(Text.assemble((speaker, "bold"), turn["content"]))
+
+    def begin_reply(self, prompt: str) -> None:
+        """Echoes the user's prompt and prepares an empty reply to stream into."""
+        self.query_one("#chat_log", RichLog).write(Text.assemble(("You: ", "bold"), prompt))
+        with self._pending_lock:
+            self._pending_tokens = []
+        self._reply_text = Text()
+        self.query_one("#stream_static", Static).update(self._reply_text)
+        self.query_one("#status_static", Static).update("Status: [i]Generating...[/i]")
+
+    def push_token(self, token: str) -> None:
+        """Queues a token for the next frame. Safe to call from a worker thread."""
+        with self._pending_lock:
+            self._pending_tokens.append(token)
+
+    def _flush_tokens(self) -> None:
+        """Draws every token that arrived since the last frame in a single update."""
+        if self._reply_text is None:
+            return
+        with self._pending_lock:
+            if not self._pending_tokens:
+                return
+            chunk = "".join(self._pending_tokens)
+            self._pending_tokens = []
+        self._reply_text.append(chunk)
+        self.query_one("#stream_static", Static).update(self._reply_text)
+
+    def end_reply(self, stats: dict = None) -> None:
+        """Moves the finished reply into the chat log and reports generation speed."""
+        self._flush_tokens()
+        if self._reply_text is not None:
+            self.query_one("#chat_log", RichLog).write(Text.assemble(("AI: ", "bold"), self._reply_text))
+        self._reply_text = None
+        self.query_one("#stream_static", Static).update("")
+
+        if stats and stats.get("tokens"):
+            ttft = stats.get("time_to_first_token") or 0.0
+            self.query_one("#status_static", Static).update(
+                f"Status: [i]Idle[/i] - {stats['tokens']} tokens, "
+                f"{stats['tokens_per_second']:.1f} tok/s, first token {ttft:.2f}s"
+            )
+        else:
+            self.query_one("#status_static", Static).update("Status: [i]Idle[/i]")
@@ -2,46 +2,136 @@
 
 import os
 import torch
-import scipy
-from transformers import pipeline
+import numpy as np
+import soundfile
+from transformers import AutoProcessor, MusicgenForConditionalGeneration
+
+from core.config import get_section
+from core.device import get_device_policy
+from core.tracing import span
+from core.weights import get_warm_cache, pretrained_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+from core.outputs import unique_output_path
+from sound_resample import StreamingResampler
 
 class SoundAIPlugin:
     def __init__(self, plugin_path):
-        self.generator = None
+        self.model = None
+        self.processor = None
         self.model_id = "facebook/musicgen-small"
-        self.model_path = os.path.join(plugin_path, "models", "musicgen-small")
+        # A transformers folder from models/<models_folder>, else the plugin's own copy, else the hub model
+        self.model_path = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default=os.path.join(plugin_path, "models", "musicgen-small"), formats=("transformers",)
+        )
+        self.policy = get_device_policy()
+        self.device = self.policy.device
+
+        # Define the base output path relative to the program's root
+        self.output_dir = os.path.abspath(os.path.join(plugin_path, '../../output/sounds'))
+
+        config = get_section("sound")
+        self.chunk_seconds = float(config.get("chunk_seconds", 10))
+        self.context_seconds = float(config.get("context_seconds", 2))
+        self.output_format = config.get("format", "flac").lower()
+        # Set by the pane; called with (seconds_done, seconds_total, output_path) after every chunk
+        self.progress_callback = None
 
     def load_model(self):
-        if self.generator is None:
-            self.generator = pipeline(task="text-to-audio", model=self.model_id)
+        if self.model is None:
+            source = self.model_path if os.path.isdir(self.model_path) else self.model_id
+            warm = get_warm_cache().take(f"sound:{source}")
+            if warm is not None:
+                # Already quantized, or in the policy's dtype; only the device is left
+                self.processor, model = warm
+                self.model = model if self.policy.quantize_cpu else model.to(self.device)
+                return
+            self.processor = AutoProcessor.from_pretrained(source)
+            model = MusicgenForConditionalGeneration.from_pretrained(source, **pretrained_kwargs(source))
+            if self.policy.quantize_cpu:
+                self.model = self.policy.quantize(model)
+            else:
+                self.model = model.to(self.device, dtype=self.policy.dtype)
 
     def unload_model(self):
-        if self.generator is not None:
-            self.generator = None
-            torch.cuda.empty_cache()
+        if self.model is not None:
+            source = self.model_path if os.path.isdir(self.model_path) else self.model_id
+            get_warm_cache().put(f"sound:{source}", (self.processor, self.model))
+            self.model = None
+            self.processor = None
+            self.policy.empty_cache()
+
+    def _generate_chunk(self, user_prompt: str, seconds: float, context):
+        """
+        Generates `seconds` of new audio. With context (the tail of the previous
+        chunk), the model continues from it so chunks join without a seam; the
+        context itself is cut from the result.
+        """
+        model_rate = self.model.config.audio_encoder.sampling_rate
+        frame_rate = self.model.config.audio_encoder.frame_rate
+        with span("prepare inputs", "preprocess"):
+            if context is None:
+                inputs = self.processor(text=[user_prompt], padding=True, return_tensors="pt")
+            else:
+                inputs = self.processor(audio=context, sampling_rate=model_rate, text=[user_prompt],
+                                        padding=True, return_tensors="pt")
+            # Text alone comes back as a tokenizer BatchEncoding, whose .to() takes only a device
+            inputs = inputs.to(self.device)
+            if "input_values" in inputs:
+                inputs["input_values"] = inputs["input_values"].to(dtype=self.model.dtype)
+
+        with span("generate audio", "inference", seconds=seconds), torch.no_grad():
+            audio = self.model.generate(**inputs, do_sample=True, max_new_tokens=max(1, int(seconds * frame_rate)))
+        audio = audio[0, 0].float().cpu().numpy()
+        if context is not None:
+            audio = audio[len(context):]
+        return audio
 
     def run_inference(self, user_prompt: str, settings: dict) -> str:
         """
         Runs sound generation inference with user-defined settings.
 
+        The clip is generated in chunks of chunk_seconds, each appended to the output
+        file as soon as it is ready, so memory stays flat however long the clip is.
+        When another sampling rate is asked for, the chunks are resampled as one
+        continuous stream, so the boundaries don't click.
+
         Args:
             user_prompt (str): The text prompt for sound generation.
             settings (dict): A dictionary of user-defined settings.
         """
-        if self.generator is None:
+        if self.model is None:
             raise ValueError("Model is not loaded. Call load_model() first.")
 
         # Get settings with default values
-        duration = settings.get("duration", 5) # in seconds
-        sampling_rate = settings.get("sampling_rate", 16000)
-
-        # Run inference with the provided settings
-        audio_output = self.generator(
-            prompt=user_prompt,
-            duration=duration,
-            sampling_rate=sampling_rate
-        )
+        duration = float(settings.get("duration", 5)) # in seconds
+        model_rate = self.model.config.audio_encoder.sampling_rate
+        sampling_rate = int(settings.get("sampling_rate", model_rate))
+        resampler = StreamingResampler(model_rate, sampling_rate) if sampling_rate != model_rate else None
+        context_samples = int(self.context_seconds * model_rate)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_filename = unique_output_path(self.output_dir, user_prompt, f".{self.output_format}", "sound")
+        with soundfile.SoundFile(output_filename, mode="w", samplerate=sampling_rate, channels=1,
+                                 format=self.output_format.upper(), subtype="PCM_16") as output:
+            done = 0.0
+            context = None
+            while done < duration:
+                seconds = min(self.chunk_seconds, duration - done)
+                audio = self._generate_chunk(user_prompt, seconds, context)
+                context = audio[-context_samples:] if context_samples else None
+
+                done += seconds
+                with span("write audio", "save", seconds=seconds):
+                    if resampler is not None:
+                        # The last few samples wait for the next chunk, which they are filtered with
+                        audio = resampler.feed(audio)
+                        if done >= duration:
+                            audio = np.concatenate([audio, resampler.finish()])
+                    output.write(audio.clip(-1.0, 1.0))
+                    # Make what is written so far playable right away
+                    output.flush()
+
+                if self.progress_callback:
+                    self.progress_callback(done, duration, output_filename)
 
-        output_filename = "generated_sound.wav"
-        scipy.io.wavfile.write(output_filename, rate=sampling_rate, data=audio_output['audio'])
         return output_filename
@@ -0,0 +1,58 @@
+# plugins/sound_plugin/sound_resample.py
+
+import math
+
+import numpy as np
+from scipy.signal import resample_poly
+
+
+class StreamingResampler:
+    """
+    resample_poly over audio that arrives in pieces, giving the same samples as
+    resampling the whole clip at once.
+
+    Resampling each piece on its own treats its edges as silence, which clicks at
+    every boundary. Instead, the filter's reach of input is kept from the previous
+    piece, and the last outputs of each piece are held back until the input after
+    them has arrived (or finish() is called at the end of the stream).
+    """
+
+    def __init__(self, from_rate: int, to_rate: int):
+        divisor = math.gcd(from_rate, to_rate)
+        self.up, self.down = to_rate // divisor, from_rate // divisor
+        # resample_poly's default filter reaches 10 * max(up, down) upsampled samples to
+        # either side; rounded to whole steps of `down` so output positions line up
+        reach = math.ceil(10 * max(self.up, self.down) / self.up) + 1
+        self.context = math.ceil(reach / self.down) * self.down
+        self._buffer = np.zeros(0, dtype=np.float32)
+        # Input index of _buffer[0], always a multiple of down
+        self._start = 0
+        # Output samples returned so far
+        self._emitted = 0
+
+    def feed(self, samples) -> np.ndarray:
+        """Adds input samples and returns the output samples that are now final."""
+        self._buffer = np.concatenate([self._buffer, np.asarray(samples, dtype=np.float32)])
+        end = self._start + len(self._buffer)
+        # Output n sits at input position n * down / up; it is final once `context` input follows it
+        return self._resample_until((end - self.context) * self.up // self.down)
+
+    def finish(self) -> np.ndarray:
+        """Returns the remaining output, treating the end of the stream as silence like resample_poly does."""
+        end = self._start + len(self._buffer)
+        return self._resample_until(-(-end * self.up // self.down))
+
+    def _resample_until(self, stop: int) -> np.ndarray:
+        if stop <= self._emitted:
+            return np.zeros(0, dtype=np.float32)
+        offset = self._start * self.up // self.down
+        resampled = resample_poly(self._buffer, self.up, self.down)
+        output = resampled[self._emitted - offset:stop - offset]
+        self._emitted = stop
+
+        # Keep only the input the next outputs still need on their left
+        keep_from = (stop * self.down // self.up - self.context) // self.down * self.down
+        if keep_from > self._start:
+            self._buffer = self._buffer[keep_from - self._start:]
+            self._start = keep_from
+        return output
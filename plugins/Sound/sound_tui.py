@@ -5,10 +5,12 @@ from textual.widgets import Static, Input, RichLog, Button
 from textual.app import ComposeResult
 from typing import TYPE_CHECKING
 
+from core.file_scanner import ProgressReportingMixin
+
 if TYPE_CHECKING:
     from .sound_logic import SoundLogic
 
-class SoundPane(Container):
+class SoundPane(ProgressReportingMixin, Container):
     """
     The TUI pane for sound-related functions.
     """
@@ -33,3 +35,14 @@ class SoundPane(Container):
                 yield RichLog(id="status_log", highlight=True, markup=True)
 
             yield Input(placeholder="Describe the sound you want to generate...", id="input_box", classes="prompt-box")
+
+    def on_mount(self) -> None:
+        """Reports generation progress in the status log."""
+        if self.logic is not None:
+            self.logic.progress_callback = self._report_progress_threadsafe
+
+    def _report_progress(self, done: float, total: float, output_path: str) -> None:
+        status_log = self.query_one("#status_log", RichLog)
+        status_log.write(f"Generated {done:.1f}s of {total:.1f}s ({done * 100 / total:.0f}%)")
+        if done >= total:
+            status_log.write(f"[b]Done.[/b] Saved to {output_path}")
@@ -5,10 +5,12 @@ from textual.widgets import Static, Input, RichLog, Button
 from textual.app import ComposeResult
 from typing import TYPE_CHECKING
 
+from core.file_scanner import ProgressReportingMixin
+
 if TYPE_CHECKING:
     from .video_diffusor_logic import VideoDiffusorLogic
 
-class VideoDiffusorPane(Container):
+class VideoDiffusorPane(ProgressReportingMixin, Container):
     """
     The TUI pane for the video diffusion model.
     """
@@ -30,8 +32,21 @@ class VideoDiffusorPane(Container):
                     yield Input(value="50", id="video_num_inference_steps_input", classes="setting_input_small")
                     yield Static("CFG:", classes="setting_label")
                     yield Input(value="7.5", id="video_guidance_scale_input", classes="setting_input_small")
+                    yield Static("Seed (-1 for random):", classes="setting_label")
+                    yield Input(value="-1", id="video_seed_input", classes="setting_input_small")
 
             with Container(id="status_area", classes="output-box"):
                 yield RichLog(id="status_log", highlight=True, markup=True)
 
             yield Input(placeholder="Describe the video you want to generate...", id="input_box", classes="prompt-box")
+
+    def on_mount(self) -> None:
+        """Reports generation progress in the status log."""
+        if self.logic is not None:
+            self.logic.progress_callback = self._report_progress_threadsafe
+
+    def _report_progress(self, done: int, total: int, output_path: str) -> None:
+        status_log = self.query_one("#status_log", RichLog)
+        status_log.write(f"Encoded {done}/{total} frames ({done * 100 // total}%)")
+        if done >= total:
+            status_log.write(f"[b]Done.[/b] Saved to {output_path}")
@@ -1,30 +1,69 @@
 # plugins/video_diffusor_plugin/video_diffusor_logic.py
 
 import os
+import math
+import random
 import torch
 from diffusers import DiffusionPipeline
-import imageio
+
+from core.config import get_section
+from core.device import get_device_policy
+from core.tracing import span
+from core.weights import get_warm_cache, pretrained_kwargs
+from core.model_registry import get_model_registry, plugin_models_folder
+from core.outputs import unique_output_path
+from video_writer import StreamingVideoWriter, to_uint8
 
 class VideoDiffusorPlugin:
     def __init__(self, plugin_path):
         self.pipe = None
-        self.model_id = "damo-vilab/text-to-video-ms-1-7b"
+        # A diffusers folder from models/<models_folder>, else the hub model
+        self.model_id = get_model_registry().model_path(
+            plugin_models_folder(plugin_path), default="damo-vilab/text-to-video-ms-1-7b", formats=("diffusers",)
+        )
         self.model_path = os.path.join(plugin_path, "models", "video_model")
+        self.policy = get_device_policy()
+        self.device = self.policy.device
+
+        # Define the base output path relative to the program's root
+        self.output_dir = os.path.abspath(os.path.join(plugin_path, '../../output/videos'))
+
+        config = get_section("video")
+        self.chunk_frames = int(config.get("chunk_frames", 16))
+        self.overlap_frames = int(config.get("overlap_frames", 4))
+        self.max_buffered_frames = int(config.get("max_buffered_frames", 32))
+        self.fps = int(config.get("fps", 8))
+        # Set by the pane; called with (frames_done, frames_total, output_path) after every chunk
+        self.progress_callback = None
 
     def load_model(self):
         if self.pipe is None:
-            self.pipe = DiffusionPipeline.from_pretrained(self.model_id, torch_dtype=torch.float16)
-            self.pipe.to("cuda")
+            self.pipe = get_warm_cache().take(f"video:{self.model_id}")
+            if self.pipe is None:
+                self.pipe = DiffusionPipeline.from_pretrained(self.model_id, torch_dtype=self.policy.dtype,
+                                                              **pretrained_kwargs(self.model_id))
+            self.pipe.to(self.device)
 
     def unload_model(self):
         if self.pipe is not None:
-            self.pipe = self.pipe.to("cpu")
-            torch.cuda.empty_cache()
+            get_warm_cache().put(f"video:{self.model_id}", self.pipe)
+            self.pipe = None
+            self.policy.empty_cache()
 
     def run_inference(self, user_prompt: str, settings: dict) -> str:
         """
         Runs video generation inference with user-defined settings.
 
+        Clips longer than chunk_frames are generated as overlapping chunks; the
+        overlapping frames are crossfaded so the chunks join into one file. Frames
+        are encoded on a writer thread as each chunk finishes, so memory is bounded
+        by the chunk size rather than the clip length.
+
+        The text-to-video pipeline can't start from given frames, so each chunk is
+        a separate generation from the same prompt (with seed + chunk index). A
+        clip longer than one chunk is therefore a series of shots joined by
+        dissolves, not one continuous take.
+
         Args:
             user_prompt (str): The text prompt for video generation.
             settings (dict): A dictionary of user-defined settings.
@@ -33,18 +72,49 @@ class VideoDiffusorPlugin:
             raise ValueError("Model is not loaded. Call load_model() first.")
 
         # Get settings with default values
-        num_frames = settings.get("num_frames", 16)
+        num_frames = int(settings.get("num_frames", 16))
         num_inference_steps = settings.get("num_inference_steps", 25)
         guidance_scale = settings.get("guidance_scale", 9.0)
+        seed = int(settings.get("seed", -1))
+        if seed < 0:
+            seed = random.randrange(2 ** 31)
+
+        chunk = max(2, min(self.chunk_frames, num_frames))
+        overlap = min(self.overlap_frames, chunk // 2) if num_frames > chunk else 0
+        chunks = 1 if num_frames <= chunk else math.ceil((num_frames - overlap) / (chunk - overlap))
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        output_path = unique_output_path(self.output_dir, user_prompt, ".mp4", "video")
+        written = 0
+        # The last `overlap` frames of the previous chunk, held back to crossfade into the next
+        tail = []
+        with StreamingVideoWriter(output_path, fps=self.fps, max_buffered=self.max_buffered_frames) as writer:
+            for index in range(chunks):
+                # Run inference with the provided settings
+                with span("generate frames", "inference", chunk=index, frames=chunk):
+                    frames = self.pipe(
+                        prompt=user_prompt,
+                        num_frames=chunk,
+                        num_inference_steps=num_inference_steps,
+                        guidance_scale=guidance_scale,
+                        generator=torch.Generator(device="cpu").manual_seed(seed + index),
+                    ).frames[0]
+                frames = [to_uint8(frame) for frame in frames]
+
+                for position, (previous, current) in enumerate(zip(tail, frames)):
+                    weight = (position + 1) / (len(tail) + 1)
+                    frames[position] = (previous * (1 - weight) + current * weight + 0.5).astype("uint8")
+
+                is_last = index == chunks - 1
+                emit = frames if is_last else frames[:len(frames) - overlap]
+                tail = [] if is_last else frames[len(frames) - overlap:]
+                with span("queue frames", "save", chunk=index):
+                    for frame in emit[:num_frames - written]:
+                        writer.write(frame)
+                written = min(num_frames, written + len(emit))
+                del frames, emit
 
-        # Run inference with the provided settings
-        video_frames = self.pipe(
-            prompt=user_prompt,
-            num_frames=num_frames,
-            num_inference_steps=num_inference_steps,
-            guidance_scale=guidance_scale
-        ).frames
+                if self.progress_callback:
+                    self.progress_callback(written, num_frames, output_path)
 
-        output_path = "generated_video.mp4"
-        imageio.mimwrite(output_path, video_frames, fps=8)
         return output_path
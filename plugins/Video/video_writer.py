@@ -0,0 +1,81 @@
+# plugins/video_diffusor_plugin/video_writer.py
+
+import queue
+import threading
+
+import numpy as np
+import imageio
+
+_CLOSE = object()
+
+
+def to_uint8(frame) -> np.ndarray:
+    """Pipelines return float frames in [0, 1] (or PIL images); the encoder wants uint8 arrays."""
+    frame = np.asarray(frame)
+    if frame.dtype != np.uint8:
+        frame = (np.clip(frame, 0.0, 1.0) * 255 + 0.5).astype(np.uint8)
+    return frame
+
+
+class StreamingVideoWriter:
+    """
+    Encodes frames on a background thread as they are produced.
+
+    Frames wait in a queue of at most max_buffered frames; write() blocks while it
+    is full, so a slow encoder holds back generation instead of letting frames
+    pile up in memory. Use as a context manager, or call close() to finish the file.
+    """
+
+    def __init__(self, path: str, fps: int = 8, max_buffered: int = 32):
+        self.path = path
+        self.frames_written = 0
+        self._queue = queue.Queue(maxsize=max(1, max_buffered))
+        self._error = None
+        try:
+            self._writer = imageio.get_writer(path, fps=fps)
+        except (ImportError, ValueError, RuntimeError) as e:
+            # imageio needs its ffmpeg plugin for mp4; without it the error doesn't say so
+            raise IOError(f"Cannot write '{path}': encoding video needs the imageio-ffmpeg package "
+                          f"(pip install imageio-ffmpeg). {e}")
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is _CLOSE:
+                return
+            if self._error is not None:
+                # Keep draining so producers never block on a dead encoder
+                continue
+            try:
+                self._writer.append_data(frame)
+                self.frames_written += 1
+            except Exception as e:
+                self._error = e
+
+    def write(self, frame) -> None:
+        if self._error is not None:
+            raise IOError(f"Video encoding failed: {self._error}")
+        self._queue.put(to_uint8(frame))
+
+    def close(self) -> None:
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._writer.close()
+        if self._error is not None:
+            raise IOError(f"Video encoding failed: {self._error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Don't let an encoder error hide the original exception
+            try:
+                self.close()
+            except IOError:
+                pass
+        return False
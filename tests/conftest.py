@@ -0,0 +1,25 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def add_plugin_path(plugin_dir: str) -> None:
+    """Plugins import their sibling modules by bare name, as the plugin manager sets them up."""
+    path = os.path.join(PROJECT_ROOT, "plugins", plugin_dir)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(autouse=True)
+def no_warm_cache(monkeypatch):
+    """Every test starts with the process-wide warm weight cache turned off."""
+    from core import weights
+
+    monkeypatch.setattr(weights, "_warm_cache", weights.WarmCache(budget_mb=0))
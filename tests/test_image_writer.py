@@ -0,0 +1,51 @@
+# tests/test_image_writer.py
+
+import threading
+
+import pytest
+
+from core.image_writer import ImageWriteBehind
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def writer():
+    writer = ImageWriteBehind(image_format="png", max_pending=4, workers=2, fsync_batch=1)
+    yield writer
+    writer.close()
+
+
+def test_unique_names_avoid_queued_and_existing_files(writer, tmp_path):
+    image = Image.new("RGB", (8, 8))
+    paths = [writer.submit(image, str(tmp_path / "out.jpg"), {"seed": 1}, unique=True) for _ in range(3)]
+    assert writer.flush(timeout=10)
+
+    assert paths == [str(tmp_path / name) for name in ("out.png", "out_1.png", "out_2.png")]
+    with Image.open(paths[0]) as saved:
+        assert saved.text["seed"] == "1"
+    assert writer.stats()["written"] == 3
+
+
+def test_flush_waits_for_batches_another_flush_is_fsyncing(tmp_path, monkeypatch):
+    writer = ImageWriteBehind(image_format="png", fsync_batch=100)
+    started, release = threading.Event(), threading.Event()
+    real_sync = writer._sync
+
+    def slow_sync(paths):
+        started.set()
+        release.wait(10)
+        real_sync(paths)
+
+    writer.submit(Image.new("RGB", (8, 8)), str(tmp_path / "a.png"))
+    monkeypatch.setattr(writer, "_sync", slow_sync)
+    first = threading.Thread(target=writer.flush)
+    first.start()
+    assert started.wait(10)
+
+    # Nothing is pending or unsynced any more, but the first flush's fsync hasn't finished
+    assert not writer.flush(timeout=0.1)
+    release.set()
+    assert writer.flush(timeout=10)
+    first.join(10)
+    writer.close()
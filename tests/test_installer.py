@@ -0,0 +1,81 @@
+# tests/test_installer.py
+
+import os
+import json
+
+from core.installer import PACKAGES_MANIFEST, DependencyInstaller, ResolvedPackage
+
+NUMPY = ResolvedPackage("numpy", "1.26.4", "https://example.invalid/numpy.whl", "ab" * 32)
+PILLOW = ResolvedPackage("Pillow", "10.0.0", "https://example.invalid/pillow.whl", "cd" * 32)
+TORCH = ResolvedPackage("torch", "2.1.0", "https://example.invalid/torch.whl", "ef" * 32)
+
+
+class OfflineInstaller(DependencyInstaller):
+    """Resolves from a table and "installs" by writing a module file, so pip is never run."""
+
+    def __init__(self, root, resolutions):
+        super().__init__(str(root), wheel_dir="", max_workers=2)
+        self.resolutions = resolutions
+        self.installed = []
+
+    def resolve(self, requirements_path):
+        return self.resolutions[requirements_path]
+
+    def _install_to_store(self, package):
+        target = os.path.join(self.store_dir, package.store_key)
+        os.makedirs(os.path.join(target, package.name.lower()), exist_ok=True)
+        with open(os.path.join(target, package.name.lower(), "__init__.py"), "w") as f:
+            f.write(f"__version__ = {package.version!r}\n")
+        # Both packages contribute to a shared namespace directory
+        os.makedirs(os.path.join(target, "bin"), exist_ok=True)
+        open(os.path.join(target, "bin", package.name.lower()), "w").close()
+        self.installed.append(package.store_key)
+        return target
+
+
+def test_store_key_is_normalized_and_content_addressed():
+    assert NUMPY.store_key == f"numpy-1.26.4-{'ab' * 8}"
+    unhashed = ResolvedPackage("typing-extensions", "4.0", "https://example.invalid/a.whl")
+    assert unhashed.store_key.startswith("typing_extensions-4.0-")
+    assert unhashed.store_key != ResolvedPackage("typing-extensions", "4.0", "https://example.invalid/b.whl").store_key
+
+
+def test_shared_packages_are_installed_once_and_linked_per_plugin(tmp_path):
+    installer = OfflineInstaller(tmp_path, {"a.txt": [NUMPY, PILLOW], "b.txt": [NUMPY, TORCH]})
+    results = installer.install({"Image": "a.txt", "Video": "b.txt"})
+
+    assert results == {"Image": None, "Video": None}
+    assert sorted(installer.installed) == sorted([NUMPY.store_key, PILLOW.store_key, TORCH.store_key])
+    for name, packages in (("Image", [NUMPY, PILLOW]), ("Video", [NUMPY, TORCH])):
+        folder = tmp_path / name
+        assert os.path.islink(folder / "numpy")
+        assert os.path.realpath(folder / "numpy") == os.path.join(installer.store_dir, NUMPY.store_key, "numpy")
+        # bin/ exists in both packages, so it is a real directory of links
+        assert not os.path.islink(folder / "bin")
+        assert sorted(os.listdir(folder / "bin")) == sorted(p.name.lower() for p in packages)
+        assert json.loads((folder / PACKAGES_MANIFEST).read_text()) == [p.store_key for p in packages]
+
+
+def test_reinstall_skips_packages_already_in_the_store(tmp_path):
+    installer = OfflineInstaller(tmp_path, {"a.txt": [NUMPY]})
+    installer.install({"Image": "a.txt"})
+    installer.installed.clear()
+    assert installer.install({"Image": "a.txt"}) == {"Image": None}
+    assert installer.installed == []
+
+
+def test_failed_resolution_is_reported_per_plugin(tmp_path):
+    installer = OfflineInstaller(tmp_path, {"a.txt": [NUMPY]})
+    results = installer.install({"Image": "a.txt", "Broken": "missing.txt"})
+    assert results["Image"] is None
+    assert results["Broken"].startswith("Failed to resolve requirements")
+
+
+def test_prune_store_removes_unreferenced_entries(tmp_path):
+    installer = OfflineInstaller(tmp_path, {"a.txt": [NUMPY, PILLOW], "b.txt": [NUMPY]})
+    installer.install({"Image": "a.txt"})
+    installer.install({"Image": "b.txt"})
+
+    assert installer.prune_store() == 1
+    assert sorted(os.listdir(installer.store_dir)) == [NUMPY.store_key]
+    assert os.path.exists(tmp_path / "Image" / "numpy" / "__init__.py")
@@ -0,0 +1,81 @@
+# tests/test_jobs.py
+
+import json
+
+from core.jobs import Job, JobScheduler, DONE, LOADING, QUEUED, RUNNING, PRIORITY_HIGH, PRIORITY_LOW
+
+
+class FakeResidency:
+    def __init__(self, resident=()):
+        self.resident = set(resident)
+        self.plugin_manager = None
+
+    def is_resident(self, hotkey):
+        return hotkey in self.resident
+
+
+def make_scheduler(tmp_path, resident=()):
+    return JobScheduler(FakeResidency(resident), persist_path=str(tmp_path / "jobs.json"))
+
+
+def test_higher_priority_runs_first(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    normal = scheduler.submit(Job("1", "a"))
+    high = scheduler.submit(Job("2", "b", priority=PRIORITY_HIGH))
+    low = scheduler.submit(Job("1", "c", priority=PRIORITY_LOW))
+    assert scheduler.snapshot() == [high, normal, low]
+
+
+def test_loaded_model_then_resident_model_are_preferred(tmp_path):
+    scheduler = make_scheduler(tmp_path, resident={"3"})
+    scheduler._current_hotkey = "2"
+    cold = scheduler.submit(Job("1", "a"))
+    resident = scheduler.submit(Job("3", "b"))
+    loaded = scheduler.submit(Job("2", "c"))
+    assert scheduler._next_job() is loaded
+    assert scheduler.snapshot() == [loaded, resident, cold]
+
+
+def test_equal_jobs_keep_submission_order(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    first = scheduler.submit(Job("1", "a"))
+    second = scheduler.submit(Job("1", "b"))
+    second.created_at = first.created_at + 1
+    assert scheduler.snapshot() == [first, second]
+
+
+def test_running_job_is_listed_first(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    queued = scheduler.submit(Job("1", "a", priority=PRIORITY_HIGH))
+    running = scheduler.submit(Job("2", "b", priority=PRIORITY_LOW))
+    running.state = RUNNING
+    assert scheduler.snapshot() == [running, queued]
+    assert scheduler._next_job() is queued
+
+
+def test_restart_requeues_interrupted_jobs_and_drops_loads(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    interrupted = scheduler.submit(Job("1", "a"))
+    scheduler.submit(Job("1", kind="load"))
+    finished = scheduler.submit(Job("2", "b"))
+    interrupted.state = LOADING
+    interrupted.started_at = 1.0
+    scheduler._set_state(finished, DONE)
+
+    restarted = make_scheduler(tmp_path)
+    jobs = {job.id: job for job in restarted.snapshot()}
+    assert set(jobs) == {interrupted.id, finished.id}
+    assert jobs[interrupted.id].state == QUEUED and jobs[interrupted.id].started_at is None
+    assert jobs[finished.id].state == DONE
+
+
+def test_cancel_only_affects_queued_jobs(tmp_path):
+    scheduler = make_scheduler(tmp_path)
+    queued = scheduler.submit(Job("1", "a"))
+    running = scheduler.submit(Job("1", "b"))
+    running.state = RUNNING
+    assert scheduler.cancel(queued.id)
+    assert not scheduler.cancel(running.id)
+
+    saved = {entry["id"]: entry for entry in json.loads((tmp_path / "jobs.json").read_text())}
+    assert saved[queued.id]["error"] == "Cancelled"
@@ -0,0 +1,100 @@
+# tests/test_llm_session.py
+
+import sys
+import types
+
+import pytest
+
+from conftest import add_plugin_path
+
+add_plugin_path("LLM")
+
+from llm_session import ChatSession, PrefixStateCache, decode_state, encode_state
+
+
+def test_render_uses_llama2_separators_and_system_prompt():
+    session = ChatSession("Be brief.")
+    session.add_user("Hi")
+    session.add_assistant("Hello.")
+    session.add_user("How are you?")
+
+    assert session.render() == (
+        "[INST] <<SYS>>\nBe brief.\n<</SYS>>\n\nHi [/INST] Hello. </s>"
+        "<s>[INST] How are you? [/INST]"
+    )
+
+
+def test_rendered_history_is_a_prefix_of_the_next_prompt():
+    session = ChatSession()
+    session.add_user("One")
+    session.add_assistant("Two")
+    before = session.render()
+    session.add_user("Three")
+    assert session.render().startswith(before)
+
+
+def test_drop_oldest_exchange_keeps_the_last_user_turn():
+    session = ChatSession()
+    session.add_user("a")
+    session.add_assistant("b")
+    session.add_user("c")
+    assert session.drop_oldest_exchange()
+    assert session.turns == [{"role": "user", "content": "c"}]
+    assert not session.drop_oldest_exchange()
+
+
+def test_prefix_key_depends_on_model_and_history():
+    session = ChatSession()
+    session.add_user("a")
+    key = session.prefix_key("model.gguf")
+    assert key == session.prefix_key("model.gguf")
+    assert key != session.prefix_key("other.gguf")
+    session.add_assistant("b")
+    assert key != session.prefix_key("model.gguf")
+
+
+def test_evicted_states_spill_to_disk_and_come_back(tmp_path):
+    cache = PrefixStateCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put("first", b"state one")
+    cache.put("second", b"state two")
+
+    assert (tmp_path / "first.state").exists()
+    cache.clear_memory()
+    assert cache.get("first") == b"state one"
+    assert cache.get("missing") is None
+
+
+def test_unreadable_state_files_are_discarded(tmp_path):
+    (tmp_path / "old.state").write_bytes(b"\x80\x04not our format")
+    cache = PrefixStateCache(disk_dir=str(tmp_path))
+    assert cache.get("old") is None
+    assert not (tmp_path / "old.state").exists()
+
+
+def test_llama_state_fields_round_trip_without_pickle(monkeypatch):
+    np = pytest.importorskip("numpy")
+
+    class LlamaState:
+        def __init__(self, input_ids, scores, n_tokens, llama_state, llama_state_size):
+            self.input_ids = input_ids
+            self.scores = scores
+            self.n_tokens = n_tokens
+            self.llama_state = llama_state
+            self.llama_state_size = llama_state_size
+
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.SimpleNamespace(LlamaState=LlamaState))
+    state = LlamaState(np.arange(4, dtype=np.intc), np.ones((4, 3), dtype=np.single), 4, b"\x00kv\x01", 4)
+
+    data = encode_state(state)
+    assert b"pickle" not in data and not data.startswith(b"\x80")
+    restored = decode_state(data)
+
+    assert isinstance(restored, LlamaState)
+    assert np.array_equal(restored.input_ids, state.input_ids) and restored.input_ids.dtype == np.intc
+    assert np.array_equal(restored.scores, state.scores) and restored.scores.shape == (4, 3)
+    assert (restored.n_tokens, restored.llama_state, restored.llama_state_size) == (4, b"\x00kv\x01", 4)
+
+
+def test_truncated_state_is_rejected():
+    with pytest.raises(ValueError):
+        decode_state(encode_state(b"abc")[:5])
@@ -0,0 +1,20 @@
+# tests/test_outputs.py
+
+import os
+
+from core.outputs import unique_output_path
+
+
+def test_names_come_from_the_prompt_and_never_overwrite(tmp_path):
+    first = unique_output_path(str(tmp_path), "A cat, on a Mat!", ".wav")
+    assert os.path.dirname(first) == str(tmp_path)
+    assert first.endswith("_a_cat_on_a_mat.wav")
+
+    open(first, "w").close()
+    second = unique_output_path(str(tmp_path), "A cat, on a Mat!", ".wav")
+    assert second == first[:-len(".wav")] + "_1.wav"
+
+
+def test_prompts_without_words_use_the_fallback(tmp_path):
+    assert unique_output_path(str(tmp_path), "!!!", ".mp4", "video").endswith("_video.mp4")
+    assert len(os.path.basename(unique_output_path(str(tmp_path), "x" * 200, ".png"))) < 70
@@ -0,0 +1,103 @@
+# tests/test_plugin_worker.py
+
+from collections import namedtuple
+
+import pytest
+
+from core.plugin_worker import SHARED_MEMORY_THRESHOLD, RemoteLogic, SharedBuffer, decode_result, encode_result
+
+Result = namedtuple("Result", "image caption")
+
+LOGIC_SOURCE = '''
+class CountingLogic:
+    def __init__(self, plugin_path):
+        self.progress_callback = None
+        self.label = "counted"
+
+    def run_inference(self, prompt, settings):
+        total = int(prompt)
+        for step in range(1, total + 1):
+            if self.progress_callback:
+                self.progress_callback(step, total)
+        return total, self.label
+
+    def stream(self, total):
+        for step in range(total):
+            if self.progress_callback:
+                self.progress_callback(step, total)
+            yield step
+'''
+
+
+def test_namedtuples_and_containers_round_trip():
+    np = pytest.importorskip("numpy")
+    array = np.arange(SHARED_MEMORY_THRESHOLD, dtype=np.uint8)
+    value = [Result(array, "big"), (1, 2), {"small": np.zeros(3)}]
+
+    encoded = encode_result(value)
+    assert isinstance(encoded[0], Result) and isinstance(encoded[0].image, SharedBuffer)
+    decoded = decode_result(encoded)
+
+    assert isinstance(decoded[0], Result) and decoded[0].caption == "big"
+    assert np.array_equal(decoded[0].image, array)
+    assert decoded[1] == (1, 2) and np.array_equal(decoded[2]["small"], np.zeros(3))
+
+
+@pytest.mark.parametrize("mode", ["P", "RGBA"])
+def test_images_keep_their_palette_and_info(mode):
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new(mode, (256, 256))
+    if mode == "P":
+        image.putpalette([value for index in range(256) for value in (index, 255 - index, 7)])
+        image.info["transparency"] = 3
+    image.info["parameters"] = "a cat, 20 steps"
+
+    restored = decode_result(encode_result(image))
+
+    assert restored.mode == mode and restored.info["parameters"] == "a cat, 20 steps"
+    if mode == "P":
+        assert restored.getpalette() == image.getpalette()
+        assert restored.info["transparency"] == 3
+
+
+@pytest.fixture
+def remote(tmp_path):
+    plugin_dir = tmp_path / "counting"
+    plugin_dir.mkdir()
+    (plugin_dir / "counting_logic.py").write_text(LOGIC_SOURCE)
+    plugin_info = {"plugin_path": str(plugin_dir), "logic_file": "counting_logic.py", "logic_class": "CountingLogic"}
+    logic = RemoteLogic("t", plugin_info, None, str(tmp_path))
+    yield logic
+    logic.shutdown()
+
+
+def test_callbacks_set_on_the_proxy_are_called_from_the_worker(remote):
+    calls = []
+    remote.progress_callback = lambda step, total: calls.append((step, total))
+
+    result = remote.run_inference("3", {})
+
+    assert calls == [(1, 3), (2, 3), (3, 3)]
+    assert result == (3, "counted")
+
+
+def test_callbacks_fire_while_streaming_and_can_be_cleared(remote):
+    calls = []
+    remote.progress_callback = lambda step, total: calls.append(step)
+    assert list(remote.stream(3)) == [0, 1, 2]
+    assert calls == [0, 1, 2]
+
+    remote.progress_callback = None
+    assert remote.progress_callback is None
+    remote.run_inference("2", {})
+    assert calls == [0, 1, 2]
+
+
+def test_a_failing_callback_does_not_break_the_call(remote):
+    def fail(step, total):
+        raise RuntimeError("pane is gone")
+
+    remote.progress_callback = fail
+    remote.label = "still works"
+    assert remote.run_inference("2", {}) == (2, "still works")
+    assert remote.run_inference("1", {}) == (1, "still works")
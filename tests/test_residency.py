@@ -0,0 +1,90 @@
+# tests/test_residency.py
+
+import pytest
+
+from core import residency
+from core.residency import ModelResidencyManager
+
+
+class FakeLogic:
+    def __init__(self):
+        self.loaded = False
+        self.loads = 0
+
+    def load_model(self):
+        self.loaded = True
+        self.loads += 1
+
+    def unload_model(self):
+        self.loaded = False
+
+
+class FakePluginManager:
+    def __init__(self, sizes: dict):
+        self.plugins = {hotkey: {"ram_mb": ram_mb, "vram_mb": 0} for hotkey, ram_mb in sizes.items()}
+        self.loaded_plugins = {hotkey: FakeLogic() for hotkey in sizes}
+
+    def get_plugin_logic(self, hotkey):
+        return self.loaded_plugins.get(hotkey)
+
+
+@pytest.fixture(autouse=True)
+def no_measured_memory(monkeypatch):
+    # Footprints come from the manifests alone, not from this process's RSS
+    monkeypatch.setattr(residency, "_current_ram_mb", lambda: 0.0)
+    monkeypatch.setattr(residency, "_current_vram_mb", lambda: 0.0)
+
+
+def test_models_stay_resident_within_budget():
+    manager = ModelResidencyManager(FakePluginManager({"1": 100, "2": 100}), ram_budget_mb=250, vram_budget_mb=0)
+    manager.acquire("1")
+    manager.acquire("2")
+    assert manager.stats()["resident"] == ["1", "2"]
+    assert manager.evictions == 0
+
+
+def test_make_room_evicts_least_recently_used():
+    plugins = FakePluginManager({"1": 100, "2": 100, "3": 100})
+    manager = ModelResidencyManager(plugins, ram_budget_mb=250, vram_budget_mb=0)
+    manager.acquire("1")
+    manager.acquire("2")
+    # Using "1" again makes "2" the least recently used
+    manager.acquire("1")
+    manager.acquire("3")
+
+    assert manager.stats()["resident"] == ["1", "3"]
+    assert not plugins.loaded_plugins["2"].loaded
+    assert manager.evictions == 1
+    assert (manager.hits, manager.misses) == (1, 3)
+
+
+def test_make_room_skips_pinned_models():
+    plugins = FakePluginManager({"1": 100, "2": 100, "3": 100})
+    manager = ModelResidencyManager(plugins, ram_budget_mb=250, vram_budget_mb=0)
+    manager.acquire("1")
+    manager.acquire("2")
+    manager.pin("1")
+    manager.acquire("3")
+    assert manager.stats()["resident"] == ["1", "3"]
+
+    manager.unpin("1")
+    manager.acquire("2")
+    assert manager.stats()["resident"] == ["3", "2"]
+
+
+def test_model_larger_than_budget_still_loads_alone():
+    plugins = FakePluginManager({"1": 100, "2": 500})
+    manager = ModelResidencyManager(plugins, ram_budget_mb=250, vram_budget_mb=0)
+    manager.acquire("1")
+    assert manager.acquire("2") is plugins.loaded_plugins["2"]
+    assert manager.stats()["resident"] == ["2"]
+
+
+def test_release_all_unloads_everything():
+    plugins = FakePluginManager({"1": 100, "2": 100})
+    manager = ModelResidencyManager(plugins, ram_budget_mb=0, vram_budget_mb=0)
+    manager.acquire("1")
+    manager.acquire("2")
+    manager.release_all()
+    assert manager.stats()["resident"] == []
+    assert not any(logic.loaded for logic in plugins.loaded_plugins.values())
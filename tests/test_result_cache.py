@@ -0,0 +1,124 @@
+# tests/test_result_cache.py
+
+import os
+
+import pytest
+
+from core.result_cache import ResultCache, run_inference
+
+PLUGIN = {"model_type": "Diffusor", "cacheable": True, "seed_setting": "seed"}
+
+
+class FakeLogic:
+    model_id = "test-model"
+    model_path = None
+
+    def __init__(self):
+        self.runs = 0
+
+    def run_inference(self, prompt, settings):
+        self.runs += 1
+        return f"{prompt} #{self.runs}"
+
+
+class FakePluginManager:
+    def __init__(self, plugin_info):
+        self.plugins = {"1": plugin_info}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(root=str(tmp_path / "results"), max_size_mb=1, enabled=True)
+
+
+def key(cache, settings, prompt="a cat", plugin_info=PLUGIN, logic=None):
+    return cache.key_for("1", plugin_info, logic or FakeLogic(), prompt, settings)
+
+
+def test_equivalent_settings_share_a_key(cache):
+    base = key(cache, {"seed": 1, "steps": 20, "guidance": 7})
+    assert base is not None
+    assert key(cache, {"guidance": 7.0, "steps": 20, "seed": 1}) == base
+    assert key(cache, {"seed": "1", "steps": " 20 ", "guidance": "7.0"}) == base
+    assert key(cache, {"seed": 1, "steps": 20, "guidance": 7, "batch_size": 4}) == base
+
+
+def test_different_requests_get_different_keys(cache):
+    base = key(cache, {"seed": 1, "steps": 20})
+    assert key(cache, {"seed": 2, "steps": 20}) != base
+    assert key(cache, {"seed": 1, "steps": 20}, prompt="a dog") != base
+    assert key(cache, {"seed": 1, "sampler": "1.5"}) != key(cache, {"seed": 1, "sampler": "1.5x"})
+
+    other_model = FakeLogic()
+    other_model.model_id = "other-model"
+    assert key(cache, {"seed": 1, "steps": 20}, logic=other_model) != base
+
+
+@pytest.mark.parametrize("seed", [-1, "-1", "random", None])
+def test_random_seeds_bypass_the_cache(cache, seed):
+    settings = {} if seed is None else {"seed": seed}
+    assert key(cache, settings) is None
+
+
+def test_uncacheable_plugins_and_directory_inputs_bypass_the_cache(cache, tmp_path):
+    assert key(cache, {"seed": 1}, plugin_info={"cacheable": False}) is None
+    assert key(cache, {"seed": 1}, prompt=str(tmp_path)) is None
+    assert ResultCache(root=str(tmp_path / "off"), enabled=False).key_for("1", PLUGIN, FakeLogic(), "a", {}) is None
+
+
+def test_file_inputs_are_keyed_by_content(cache, tmp_path):
+    first, second = tmp_path / "a.png", tmp_path / "b.png"
+    first.write_bytes(b"same")
+    second.write_bytes(b"same")
+    assert key(cache, {"seed": 1}, prompt=str(first)) == key(cache, {"seed": 1}, prompt=str(second))
+    second.write_bytes(b"different")
+    assert key(cache, {"seed": 1}, prompt=str(first)) != key(cache, {"seed": 1}, prompt=str(second))
+
+
+def test_results_round_trip(cache, tmp_path):
+    np = pytest.importorskip("numpy")
+    artifact = tmp_path / "out" / "result.txt"
+    artifact.parent.mkdir()
+    artifact.write_text("written by the plugin")
+    result = ["caption", 3, {"score": 0.5}, np.arange(6).reshape(2, 3), str(artifact)]
+
+    assert cache.put("ab" * 32, "1", result)
+    artifact.unlink()
+    hit, restored = cache.get("ab" * 32)
+
+    assert hit
+    assert restored[:3] == ["caption", 3, {"score": 0.5}]
+    assert np.array_equal(restored[3], result[3])
+    assert restored[4] == str(artifact) and artifact.read_text() == "written by the plugin"
+
+
+def test_unstorable_results_are_not_cached(cache):
+    assert not cache.put("cd" * 32, "1", object())
+    assert cache.get("cd" * 32) == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    blob = "x" * (400 * 1024)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    cache.put(keys[0], "1", blob)
+    cache.put(keys[1], "1", blob)
+    # Touch the oldest so the middle one is now least recently used
+    assert cache.get(keys[0])[0]
+    cache.put(keys[2], "1", blob)
+
+    assert cache.evictions == 1
+    assert cache.get(keys[1]) == (False, None)
+    assert cache.get(keys[0])[0] and cache.get(keys[2])[0]
+    assert not os.path.exists(cache._entry_dir(keys[1]))
+
+
+def test_run_inference_reuses_results_and_counts_bypasses(cache, monkeypatch):
+    from core import result_cache
+
+    monkeypatch.setattr(result_cache, "get_result_cache", lambda: cache)
+    manager, logic = FakePluginManager(PLUGIN), FakeLogic()
+
+    assert run_inference(manager, "1", logic, "a cat", {"seed": 5}) == "a cat #1"
+    assert run_inference(manager, "1", logic, "a cat", {"seed": "5"}) == "a cat #1"
+    assert run_inference(manager, "1", logic, "a cat", {"seed": -1}) == "a cat #2"
+    assert (cache.hits, cache.misses, cache.bypassed, logic.runs) == (1, 1, 1, 2)
@@ -0,0 +1,93 @@
+# tests/test_settings.py
+
+import os
+import json
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from core.settings import Setting, SettingsError, SettingsForm, SettingsSchema
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFINITIONS = [
+    {"key": "steps", "widget": "steps_input", "type": "int", "default": 50, "min": 1, "max": 500},
+    {"key": "guidance", "type": "float", "default": 7.5, "min": 0},
+    {"key": "upscale_type", "widget": "upscale_type_radio", "type": "choice",
+     "choices": ["upscale", "face_restore"], "default": "upscale"},
+    {"key": "tiled", "type": "bool", "default": False},
+    {"key": "negative_prompt", "default": ""},
+]
+
+
+def radio(label):
+    button = None if label is None else SimpleNamespace(label=SimpleNamespace(plain=label))
+    return SimpleNamespace(pressed_button=button)
+
+
+def form(steps="20", guidance="7", upscale="Face Restore", tiled="yes", negative="blurry"):
+    schema = SettingsSchema(DEFINITIONS, "Test")
+    widgets = (SimpleNamespace(value=steps), SimpleNamespace(value=guidance), radio(upscale),
+               SimpleNamespace(value=tiled), SimpleNamespace(value=negative))
+    return SettingsForm(schema, widgets)
+
+
+def test_collect_parses_every_type():
+    settings = form().collect()
+    assert dict(settings) == {"steps": 20, "guidance": 7.0, "upscale_type": "face_restore", "tiled": True,
+                              "negative_prompt": "blurry"}
+    assert settings["steps"] == settings.get("steps") == 20
+    assert list(settings) == ["steps", "guidance", "upscale_type", "tiled", "negative_prompt"]
+
+
+def test_collect_names_every_bad_field():
+    with pytest.raises(SettingsError) as error:
+        form(steps="0", guidance="lots", upscale=None, tiled="maybe").collect()
+    message = str(error.value)
+    assert message.startswith("Invalid Test settings:")
+    assert "steps: must be at least 1" in message
+    assert "guidance:" in message
+    assert "upscale_type: no value" in message
+    assert "tiled: expected true or false" in message
+    assert "negative_prompt" not in message
+
+
+@pytest.mark.parametrize("raw, error", [("501", "must be at most 500"), ("2.5", "invalid literal"), (None, "no value")])
+def test_int_setting_bounds_and_parse_errors(raw, error):
+    with pytest.raises(ValueError, match=error):
+        Setting(DEFINITIONS[0]).parse(raw)
+
+
+def test_choice_rejects_labels_outside_its_choices():
+    with pytest.raises(ValueError, match="must be one of upscale, face_restore"):
+        Setting(DEFINITIONS[2]).parse("Colorize")
+
+
+@pytest.mark.parametrize("definitions, error", [
+    ([{"key": "a", "type": "complex"}], "unknown type"),
+    ([{"key": "a", "type": "choice"}], "without any choices"),
+    ([{"key": "a"}, {"key": "a"}], "declares a setting twice"),
+    ([{"key": "a", "type": "int", "default": "many"}], "invalid literal"),
+])
+def test_invalid_schemas_are_rejected(definitions, error):
+    with pytest.raises(ValueError, match=error):
+        SettingsSchema(definitions)
+
+
+def test_new_settings_hold_defaults_and_survive_pickling():
+    schema = SettingsSchema(DEFINITIONS)
+    settings = schema.new()
+    assert dict(settings) == {"steps": 50, "guidance": 7.5, "upscale_type": "upscale", "tiled": False,
+                              "negative_prompt": ""}
+    assert Setting({"key": "prompt"}).widget == "prompt_input"
+    assert dict(pickle.loads(pickle.dumps(settings))) == dict(settings)
+
+
+def test_every_plugin_manifest_declares_a_valid_schema():
+    plugins_dir = os.path.join(PROJECT_ROOT, "plugins")
+    for name in sorted(os.listdir(plugins_dir)):
+        manifest_path = os.path.join(plugins_dir, name, "plugin.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                SettingsSchema.from_manifest(json.load(f)).new()
@@ -0,0 +1,34 @@
+# tests/test_sound_resample.py
+
+import pytest
+
+from conftest import add_plugin_path
+
+np = pytest.importorskip("numpy")
+signal = pytest.importorskip("scipy.signal")
+add_plugin_path("Sound")
+
+from sound_resample import StreamingResampler
+
+
+@pytest.mark.parametrize("from_rate, to_rate", [(32000, 44100), (32000, 16000), (32000, 48000), (44100, 22050)])
+def test_chunked_stream_matches_resampling_the_whole_clip(from_rate, to_rate):
+    audio = np.random.default_rng(0).standard_normal(from_rate * 2 + 321).astype(np.float32)
+    resampler = StreamingResampler(from_rate, to_rate)
+
+    pieces, start = [], 0
+    for size in (from_rate // 3, 7, from_rate, len(audio)):
+        pieces.append(resampler.feed(audio[start:start + size]))
+        start += size
+    pieces.append(resampler.finish())
+    streamed = np.concatenate(pieces)
+
+    whole = signal.resample_poly(audio, resampler.up, resampler.down)
+    assert streamed.shape == whole.shape
+    assert np.allclose(streamed, whole, atol=1e-5)
+
+
+def test_short_pieces_are_held_back_until_their_filter_window_is_complete():
+    resampler = StreamingResampler(32000, 44100)
+    assert len(resampler.feed(np.ones(10))) == 0
+    assert len(resampler.finish()) == 14
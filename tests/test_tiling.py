@@ -0,0 +1,100 @@
+# tests/test_tiling.py
+
+import pytest
+
+from conftest import add_plugin_path
+
+np = pytest.importorskip("numpy")
+add_plugin_path("Image_Utilities")
+
+from image_utilities_tiling import TiledUpscaler, _ramp, _tile_starts, choose_tile_size
+
+
+class NearestUpscaler(TiledUpscaler):
+    """Stands in for the network with a nearest-neighbour 2x upscale of each tile."""
+
+    def __init__(self, tile_size, overlap):
+        super().__init__(model=None, net_scale=2, device=None, dtype=None, tile_size=tile_size, overlap=overlap,
+                         tile_pad=0, workers=2)
+
+    def _upscale_tile(self, source, box, outscale, max_range):
+        y0, y1, x0, x1 = box
+        tile = np.asarray(source[y0:y1, x0:x1], dtype=np.float32) / max_range
+        return tile.repeat(2, axis=0).repeat(2, axis=1)
+
+
+@pytest.mark.parametrize("length, tile, overlap", [(10, 16, 4), (16, 16, 4), (17, 16, 4), (100, 32, 8), (257, 64, 0)])
+def test_tile_starts_cover_the_whole_length(length, tile, overlap):
+    starts = _tile_starts(length, tile, overlap)
+    assert starts[0] == 0
+    assert min(length, starts[-1] + tile) == length
+    assert starts == sorted(set(starts))
+    for previous, start in zip(starts, starts[1:]):
+        # Neighbours always overlap by at least the requested amount, so there are no gaps
+        assert previous + tile - start >= overlap
+
+
+def test_ramp_rises_inside_zero_to_one():
+    ramp = _ramp(8)
+    assert 0 < ramp[0] < ramp[-1] < 1
+    assert np.all(np.diff(ramp) > 0)
+
+
+def test_tile_size_shrinks_with_workers_and_grows_with_half_precision():
+    one = choose_tile_size(4096, workers=1, half=False, tile_pad=10)
+    two = choose_tile_size(4096, workers=2, half=False, tile_pad=10)
+    half = choose_tile_size(4096, workers=2, half=True, tile_pad=10)
+    assert two < one and two < half
+    assert one % 8 == 0 and two % 8 == 0
+    assert choose_tile_size(1, workers=8, half=False, tile_pad=10) == 64
+
+
+@pytest.mark.parametrize("channels", [None, 3, 4])
+def test_tiled_output_has_no_seams(channels):
+    rng = np.random.default_rng(0)
+    shape = (70, 90) if channels is None else (70, 90, channels)
+    source = rng.integers(0, 256, size=shape, dtype=np.uint8)
+
+    output = NearestUpscaler(tile_size=32, overlap=8).upscale(source, None, outscale=2)
+
+    expected = source.repeat(2, axis=0).repeat(2, axis=1)
+    # Overlaps blend identical values, so only rounding can differ
+    assert output.shape == expected.shape and output.dtype == np.uint8
+    assert np.abs(output.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_blend_feathers_into_the_left_neighbour():
+    output = np.zeros((4, 12), dtype=np.uint8)
+    upscaler = NearestUpscaler(tile_size=8, overlap=4)
+    upscaler._blend(output, np.zeros((4, 8), dtype=np.float32), (0, 4, 0, 8), 1, 255.0, None, None)
+    upscaler._blend(output, np.ones((4, 8), dtype=np.float32), (0, 4, 4, 12), 1, 255.0, (0, 4, 0, 8), None)
+
+    row = output[0].astype(int)
+    assert list(row[:4]) == [0, 0, 0, 0]
+    assert list(row[8:]) == [255] * 4
+    # Across the overlap the new tile fades in instead of cutting over
+    assert np.all(np.diff(row[4:8]) > 0) and 0 < row[4] < row[7] < 255
+
+
+def test_upscale_writes_a_memory_mapped_result(tmp_path):
+    source = np.arange(40 * 40, dtype=np.uint16).reshape(40, 40)
+    output = NearestUpscaler(tile_size=16, overlap=4).upscale(source, str(tmp_path / "out.npy"), outscale=2)
+    assert isinstance(output, np.memmap)
+    assert np.array_equal(np.load(tmp_path / "out.npy"), source.repeat(2, axis=0).repeat(2, axis=1))
+
+
+@pytest.mark.parametrize("shape", [(50, 40), (50, 40, 3), (50, 40, 4)])
+def test_tiff_is_decoded_into_the_memmap_as_bgr(tmp_path, shape):
+    tifffile = pytest.importorskip("tifffile")
+    from image_utilities_tiling import decode_to_memmap
+
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 65536, size=shape, dtype=np.uint16)
+    path = str(tmp_path / "input.tif")
+    tifffile.imwrite(path, image, rowsperstrip=8, photometric="minisblack" if len(shape) == 2 else "rgb")
+
+    mapped = decode_to_memmap(path, str(tmp_path))
+
+    expected = image if len(shape) == 2 else np.concatenate([image[:, :, 2::-1], image[:, :, 3:]], axis=2)
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, expected)
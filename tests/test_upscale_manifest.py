@@ -0,0 +1,76 @@
+# tests/test_upscale_manifest.py
+
+import os
+
+from conftest import add_plugin_path
+
+add_plugin_path("Image_Utilities")
+
+from image_utilities_batch import MANIFEST_NAME, UpscaleManifest, list_images, output_name
+
+SETTINGS = {"scale_factor": 4, "model": "RealESRGAN_x4plus"}
+
+
+def make_batch(tmp_path):
+    source_dir, output_dir = tmp_path / "in", tmp_path / "out"
+    source_dir.mkdir()
+    output_dir.mkdir()
+    source = source_dir / "photo.jpg"
+    source.write_bytes(b"jpeg")
+    return str(source), str(output_dir / "photo_x4.png")
+
+
+def test_output_names_and_image_listing(tmp_path):
+    assert output_name("dir/photo.jpg", 4) == "photo_x4.png"
+    assert output_name("photo.jpg", 2.5) == "photo_x2.5.png"
+    assert output_name("photo.jpg", 4, "face") == "photo_face.png"
+
+    for name in ("b.PNG", "a.jpg", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "nested.png").mkdir()
+    assert list_images(str(tmp_path)) == ["a.jpg", "b.PNG"]
+
+
+def test_recorded_output_is_up_to_date_after_reload(tmp_path):
+    source, output = make_batch(tmp_path)
+    manifest = UpscaleManifest(os.path.dirname(output))
+    assert not manifest.is_up_to_date(source, output, SETTINGS)
+
+    open(output, "wb").close()
+    manifest.record(source, output, SETTINGS)
+    assert UpscaleManifest(os.path.dirname(output)).is_up_to_date(source, output, SETTINGS)
+
+
+def test_changed_settings_source_or_missing_output_are_redone(tmp_path):
+    source, output = make_batch(tmp_path)
+    open(output, "wb").close()
+    manifest = UpscaleManifest(os.path.dirname(output))
+    manifest.record(source, output, SETTINGS)
+
+    assert not manifest.is_up_to_date(source, output, dict(SETTINGS, scale_factor=2))
+
+    with open(source, "ab") as f:
+        f.write(b" edited")
+    assert not manifest.is_up_to_date(source, output, SETTINGS)
+
+    manifest.record(source, output, SETTINGS)
+    os.remove(output)
+    assert not manifest.is_up_to_date(source, output, SETTINGS)
+
+
+def test_untracked_output_is_trusted_only_when_newer_than_its_source(tmp_path):
+    source, output = make_batch(tmp_path)
+    open(output, "wb").close()
+    manifest = UpscaleManifest(os.path.dirname(output))
+
+    os.utime(output, ns=(2_000_000_000, 2_000_000_000))
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    assert manifest.is_up_to_date(source, output, SETTINGS)
+
+    os.utime(source, ns=(3_000_000_000, 3_000_000_000))
+    assert not manifest.is_up_to_date(source, output, SETTINGS)
+
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    (tmp_path / MANIFEST_NAME).write_text("{not json")
+    assert UpscaleManifest(str(tmp_path)).entries == {}